@@ -0,0 +1,428 @@
+# alert_dispatcher.py
+# PostureAnalyzerV4.get_events() 이벤트를 큐에 넣고 채널별 백그라운드 스레드로 전송하는 알림 모듈
+
+import abc
+import json
+import queue
+import smtplib
+import threading
+import time
+import urllib.request
+from email.message import EmailMessage
+
+from config import (
+    ALERT_METHODS,
+    FIREBASE_CONFIG,
+    FIREBASE_AUTH_TOKEN,
+    EMAIL_RECIPIENT,
+    EMAIL_SENDER,
+    EMAIL_SMTP_HOST,
+    EMAIL_SMTP_PORT,
+    EMAIL_SMTP_USER,
+    EMAIL_SMTP_PASSWORD,
+    EMAIL_SMTP_STARTTLS,
+    ALERT_QUEUE_SIZE,
+    ALERT_BATCH_WINDOW,
+    ALERT_REPEAT_WINDOW,
+    ALERT_BATCH_MAX,
+    ALERT_MAX_RETRIES,
+    ALERT_BACKOFF_BASE,
+    ALERT_BACKOFF_MAX,
+    ALERT_SEND_TIMEOUT,
+)
+from posture_analyzer import COOL_DOWN
+
+# RFC 2606 예시 도메인: 설정 예시 수신자로만 쓰이므로 미설정으로 취급
+_EXAMPLE_DOMAINS = ("example.com", "example.org", "example.net")
+
+
+def _is_set(value):
+    """설정값이 비어 있거나 "<YOUR_...>" 같은 예시값이 아니면 True."""
+    if not value:
+        return False
+    return not (isinstance(value, str) and value.startswith("<"))
+
+
+def _alert_key(ev):
+    return ev.get("type"), ev.get("camera"), ev.get("track_id")
+
+
+def _merge(alert, ev):
+    """ev를 alert에 합칩니다. alert가 None이면 ev로 새 알림을 만듭니다."""
+    if alert is None:
+        alert = dict(ev)
+        alert["count"] = 1
+    else:
+        alert["count"] += 1
+    alert["last_timestamp"] = ev.get("timestamp")
+    return alert
+
+
+def coalesce(events):
+    """
+    같은 (type, camera, track_id) 이벤트를 하나로 합칩니다.
+    합친 알림은 첫 이벤트 dict에 count / last_timestamp를 더한 것입니다.
+    :param events: [event dict, ...] (도착 순서)
+    :return: [alert dict, ...] (첫 등장 순서)
+    """
+    merged = {}
+    for ev in events:
+        key = _alert_key(ev)
+        merged[key] = _merge(merged.get(key), ev)
+    return list(merged.values())
+
+
+def format_alert(alert):
+    """알림 한 건을 사람이 읽는 한 줄 문자열로 만듭니다."""
+    where = f"[{alert['camera']}]" if alert.get("camera") is not None else ""
+    who = f"#{alert['track_id']} " if alert.get("track_id") is not None else ""
+    repeat = f" (x{alert['count']}, 마지막 {alert['last_timestamp']})" if alert.get("count", 1) > 1 else ""
+    return f"{where}[{alert.get('timestamp')}] {who}{alert.get('type')}: {alert.get('message')}{repeat}"
+
+
+# ────────────── 채널 ────────────── #
+
+class AlertChannel(abc.ABC):
+    """
+    알림 전송 채널 인터페이스. send(alerts)는 실패 시 예외를 던져야 재시도됩니다.
+    configured()가 False인 채널은 build_channels()에서 제외됩니다.
+    """
+    name = "base"
+
+    def configured(self):
+        return True
+
+    @abc.abstractmethod
+    def send(self, alerts):
+        """알림 묶음(coalesce() 결과)을 전송합니다."""
+
+
+class ConsoleChannel(AlertChannel):
+    name = "console"
+
+    def send(self, alerts):
+        for alert in alerts:
+            print(f"[ALERT] {format_alert(alert)}")
+
+
+class FirebaseChannel(AlertChannel):
+    """
+    Firebase Realtime Database REST API로 알림 묶음을 POST합니다. (urllib, 외부 패키지 없음)
+    url을 주면 그 주소로 보내므로 로컬 HTTP 서버로 대체해 시험할 수 있습니다.
+    """
+    name = "firebase"
+
+    def __init__(self, url=None, config=FIREBASE_CONFIG, path="alerts",
+                 auth_token=FIREBASE_AUTH_TOKEN, timeout=ALERT_SEND_TIMEOUT):
+        """
+        :param url: 전송 URL (None이면 config의 databaseURL/path.json?auth=auth_token)
+        :param config: FIREBASE_CONFIG 형식 dict
+        :param path: 데이터베이스 경로
+        :param auth_token: 데이터베이스 비밀 또는 Firebase ID 토큰 (None이면 인증 없이 전송)
+        :param timeout: 요청 타임아웃(초)
+        """
+        self._configured = url is not None or _is_set(config.get("databaseURL"))
+        if url is None:
+            base = (config.get("databaseURL") or "").rstrip("/")
+            url = f"{base}/{path}.json"
+            if _is_set(auth_token):
+                url += f"?auth={auth_token}"
+        self.url = url
+        self.timeout = timeout
+
+    def configured(self):
+        return self._configured
+
+    def send(self, alerts):
+        body = json.dumps({"alerts": alerts, "sent_at": time.time()}, ensure_ascii=False,
+                          default=str).encode("utf-8")
+        req = urllib.request.Request(self.url, data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            if resp.status >= 300:
+                raise RuntimeError(f"HTTP {resp.status}")
+
+
+class EmailChannel(AlertChannel):
+    """
+    smtplib로 알림 묶음을 메일 한 통으로 보냅니다. host/port로 로컬 SMTP 대체 서버를 지정할 수 있습니다.
+    """
+    name = "email"
+
+    def __init__(self,
+                 recipient=EMAIL_RECIPIENT,
+                 sender=EMAIL_SENDER,
+                 host=EMAIL_SMTP_HOST,
+                 port=EMAIL_SMTP_PORT,
+                 user=EMAIL_SMTP_USER,
+                 password=EMAIL_SMTP_PASSWORD,
+                 starttls=EMAIL_SMTP_STARTTLS,
+                 timeout=ALERT_SEND_TIMEOUT):
+        self.recipient = recipient
+        self.sender = sender
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def configured(self):
+        if not (_is_set(self.recipient) and _is_set(self.host)):
+            return False
+        domain = self.recipient.rsplit("@", 1)[-1].lower()
+        return not any(domain == d or domain.endswith("." + d) for d in _EXAMPLE_DOMAINS)
+
+    def build_message(self, alerts):
+        msg = EmailMessage()
+        types = sorted({a.get("type") for a in alerts})
+        msg["Subject"] = f"[AI Caregiver] {', '.join(types)} ({len(alerts)}건)"
+        msg["From"] = self.sender
+        msg["To"] = self.recipient
+        msg.set_content("\n".join(format_alert(a) for a in alerts))
+        return msg
+
+    def send(self, alerts):
+        msg = self.build_message(alerts)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            smtp.send_message(msg)
+
+
+CHANNELS = {
+    "console": ConsoleChannel,
+    "firebase": FirebaseChannel,
+    "email": EmailChannel,
+}
+
+
+def build_channels(methods=ALERT_METHODS):
+    """
+    ALERT_METHODS 이름 목록으로 기본 설정 채널들을 생성합니다.
+    설정이 비어 있거나 예시값인 채널은 한 번 경고하고 제외합니다. (매 알림마다 실패·재시도하지 않도록)
+    """
+    channels = []
+    for name in methods:
+        factory = CHANNELS.get(name)
+        if factory is None:
+            print(f"[AlertDispatcher] 알 수 없는 알림 방식: {name}")
+            continue
+        channel = factory()
+        if not channel.configured():
+            print(f"[AlertDispatcher] {name} 설정이 없어 이 알림 방식은 사용하지 않습니다.")
+            continue
+        channels.append(channel)
+    return channels
+
+
+# ────────────── 전송기 ────────────── #
+
+class _ChannelWorker:
+    """채널 하나의 대기 큐, 전송 스레드, 통계."""
+    def __init__(self, channel, queue_size):
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.sent = 0        # 전송 성공한 이벤트 수 (병합 전 기준)
+        self.batches = 0     # 전송 성공한 묶음 수
+        self.coalesced = 0   # 병합으로 줄어든 건수
+        self.retries = 0
+        self.failed = 0      # 재시도 후에도 실패해 버린 이벤트 수
+        self.overflow = 0    # 큐가 가득 차 버린 이벤트 수
+        self.repeat_until = {}  # 알림 key -> 반복 병합 구간 끝 (monotonic)
+        self.held = {}          # 알림 key -> 구간 안에서 모은 반복 알림
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize(),
+            "sent": self.sent,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "failed": self.failed,
+            "overflow": self.overflow,
+            "held": len(self.held),
+        }
+
+
+class AlertDispatcher:
+    """
+    프레임 루프에서 submit(event)만 호출하고, 실제 전송은 채널별 백그라운드 스레드가 합니다.
+    - submit()은 블로킹 없음: 채널 큐가 가득 차면 버리고 overflow로 집계
+    - 첫 이벤트 후 batch_window초 동안(최대 batch_max개) 모아 한 번에 전송.
+      같은 (type, camera, track_id)는 coalesce()로 병합
+    - 같은 (type, camera, track_id) 알림은 첫 전송 후 repeat_window초 동안 보류했다가
+      구간이 끝나면 한 건(count 포함)으로 보냄. 분석기 COOL_DOWN마다 반복되는 지속 낙상 알림을 줄임
+    - 전송 실패 시 backoff_base * 2^n초(최대 backoff_max) 대기 후 max_retries회까지 재시도
+    - 채널마다 스레드가 따로라 느린/실패 채널이 다른 채널을 막지 않음
+    """
+    def __init__(self,
+                 channels=None,
+                 queue_size: int = ALERT_QUEUE_SIZE,
+                 batch_window: float = ALERT_BATCH_WINDOW,
+                 repeat_window: float = ALERT_REPEAT_WINDOW,
+                 batch_max: int = ALERT_BATCH_MAX,
+                 max_retries: int = ALERT_MAX_RETRIES,
+                 backoff_base: float = ALERT_BACKOFF_BASE,
+                 backoff_max: float = ALERT_BACKOFF_MAX):
+        """
+        :param channels: AlertChannel 리스트 (None이면 build_channels(ALERT_METHODS))
+        :param queue_size: 채널별 대기 큐 최대 길이
+        :param batch_window: 묶음 수집 시간(초)
+        :param repeat_window: 같은 알림 반복을 모으는 시간(초). 0이면 반복도 바로 전송
+        :param batch_max: 묶음 최대 이벤트 수
+        :param max_retries: 전송 재시도 횟수
+        :param backoff_base: 첫 재시도 대기(초)
+        :param backoff_max: 재시도 대기 최대(초)
+        """
+        if channels is None:
+            channels = build_channels()
+        self.batch_window = batch_window
+        self.repeat_window = repeat_window
+        if 0 < repeat_window <= COOL_DOWN:
+            print(f"[AlertDispatcher] repeat_window({repeat_window}초)가 분석기 COOL_DOWN({COOL_DOWN}초) "
+                  f"이하라 반복 알림이 병합되지 않습니다.")
+        self.batch_max = max(1, batch_max)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._workers = [_ChannelWorker(ch, queue_size) for ch in channels]
+        self._stop = threading.Event()
+        self._started = False
+        self.submitted = 0
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        for w in self._workers:
+            w.thread = threading.Thread(target=self._worker_loop, args=(w,),
+                                        name=f"AlertDispatcher-{w.channel.name}", daemon=True)
+            w.thread.start()
+
+    def submit(self, event):
+        """
+        이벤트 하나를 모든 채널 큐에 넣습니다. 블로킹하지 않습니다.
+        :return: 모든 채널에 들어갔으면 True
+        """
+        self.submitted += 1
+        ok = True
+        for w in self._workers:
+            try:
+                w.queue.put_nowait(event)
+            except queue.Full:
+                w.overflow += 1
+                ok = False
+        return ok
+
+    def submit_many(self, events):
+        for ev in events:
+            self.submit(ev)
+
+    def _collect_batch(self, w):
+        """첫 이벤트를 기다린 뒤 batch_window 동안 추가 이벤트를 모읍니다."""
+        try:
+            first = w.queue.get(timeout=0.1)
+        except queue.Empty:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop.is_set():
+                break
+            try:
+                batch.append(w.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _hold_repeats(self, w, events, now):
+        """
+        반복 병합 구간 안에 있는 알림은 w.held에 모으고, 바로 보낼 이벤트만 반환합니다.
+        바로 보내는 알림마다 새 구간을 엽니다.
+        """
+        fresh = []
+        for ev in events:
+            key = _alert_key(ev)
+            if now < w.repeat_until.get(key, 0.0):
+                w.held[key] = _merge(w.held.get(key), ev)
+            else:
+                fresh.append(ev)
+                if self.repeat_window > 0:
+                    w.repeat_until[key] = now + self.repeat_window
+        return fresh
+
+    def _due_repeats(self, w, now, flush=False):
+        """구간이 끝난(flush면 전부) 보류 알림을 꺼냅니다. 보낸 key는 새 구간을 엽니다."""
+        due = []
+        for key, until in list(w.repeat_until.items()):
+            if not flush and now < until:
+                continue
+            alert = w.held.pop(key, None)
+            if alert is None:
+                del w.repeat_until[key]
+                continue
+            due.append(alert)
+            w.repeat_until[key] = now + self.repeat_window
+        return due
+
+    def _send_with_retry(self, w, alerts):
+        """
+        :param alerts: coalesce() 형식 알림 리스트 (count = 합쳐진 이벤트 수)
+        """
+        events = sum(a["count"] for a in alerts)
+        for attempt in range(self.max_retries + 1):
+            try:
+                w.channel.send(alerts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    w.failed += events
+                    print(f"[AlertDispatcher] {w.channel.name} 전송 실패, {events}건 폐기: {e}")
+                    return False
+                w.retries += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                print(f"[AlertDispatcher] {w.channel.name} 전송 실패 ({e}), {delay:.1f}초 후 재시도")
+                # 종료 요청 중이면 대기 없이 마지막까지 시도
+                self._stop.wait(delay)
+                continue
+            w.sent += events
+            w.batches += 1
+            w.coalesced += events - len(alerts)
+            return True
+        return False
+
+    def _worker_loop(self, w):
+        # 종료 요청 후에도 큐에 남은 이벤트는 모두 보냄
+        while not (self._stop.is_set() and w.queue.empty()):
+            batch = self._collect_batch(w)
+            now = time.monotonic()
+            alerts = self._due_repeats(w, now)
+            if batch:
+                alerts += coalesce(self._hold_repeats(w, batch, now))
+            if alerts:
+                self._send_with_retry(w, alerts)
+        # 종료 시 보류 중인 반복 알림도 보냄
+        alerts = self._due_repeats(w, time.monotonic(), flush=True)
+        if alerts:
+            self._send_with_retry(w, alerts)
+
+    def stop(self, timeout: float = 5.0):
+        """
+        남은 이벤트 전송을 마치고(최대 timeout초) 스레드를 종료합니다.
+        """
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for w in self._workers:
+            if w.thread is not None:
+                w.thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "channels": {w.channel.name: w.stats() for w in self._workers},
+        }
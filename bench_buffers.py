@@ -0,0 +1,162 @@
+# bench_buffers.py
+# 프레임당 메모리 할당 측정: 버퍼 재사용(dst/풀) 전후의 캡처·전처리·움직임 게이트·포즈 크롭·z 정규화 비교
+# 사용: python bench_buffers.py [동영상 경로]  (경로가 없으면 합성 동영상을 만들어 사용)
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from config import FRAME_WIDTH, FRAME_HEIGHT
+from input_handler import InputHandler
+from motion_gate import MotionGate
+from preprocessor import Preprocessor
+
+WARMUP = 20
+FRAMES = 200
+
+
+# ────────────── 비교용 이전 구현 (pose_extractor에서 제거됨) ────────────── #
+
+def pad_to_square(img, pad_color=(0, 0, 0)):
+    h, w = img.shape[:2]
+    side = max(h, w)
+    dh, dw = side - h, side - w
+    top, bottom = dh // 2, dh - dh // 2
+    left, right = dw // 2, dw - dw // 2
+    return cv2.copyMakeBorder(img, top, bottom, left, right,
+                              cv2.BORDER_CONSTANT, value=pad_color)
+
+
+def normalize_z_roi(landmarks, bbox):
+    """
+    ROI 높이 기준으로 z값 정규화
+    """
+    x1, y1, x2, y2 = bbox
+    roi_height = y2 - y1 if (y2 - y1) != 0 else 1
+    return [(x, y, z / roi_height, v) for (x, y, z, v) in landmarks]
+
+
+def normalize_z_relative(landmarks):
+    """
+    어깨 평균 z를 기준으로 상대값 변환
+    """
+    z_ref = (landmarks[11][2] + landmarks[12][2]) / 2
+    return [(x, y, z - z_ref, v) for (x, y, z, v) in landmarks]
+
+
+def make_video(path, frames=WARMUP + FRAMES + 10, size=(FRAME_WIDTH, FRAME_HEIGHT)):
+    """움직이는 사각형이 있는 합성 동영상을 만듭니다."""
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (w, h))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (h, w, 3), dtype=np.uint8)
+    for i in range(frames):
+        frame = base.copy()
+        x = 50 + (i * 5) % (w - 200)
+        cv2.rectangle(frame, (x, 100), (x + 120, 400), (200, 200, 200), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def measure(name, step, frames=FRAMES, warmup=WARMUP):
+    """
+    step()을 warmup회 실행한 뒤 frames회 실행하며 추적 메모리 최고치 증가량을 잽니다.
+    매 프레임 새 배열을 만들면 최고치가 최소 프레임 한 장 크기만큼 오르고, 재사용하면 0에 가깝습니다.
+    """
+    for _ in range(warmup):
+        step()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+    for _ in range(frames):
+        step()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<40} {elapsed / frames * 1e3:8.3f} ms/frame  "
+          f"peak +{peak - base:>10,} B  retained +{current - base:>8,} B")
+
+
+def bench_capture(path):
+    for label, kwargs in (("InputHandler (할당)", {}),
+                          ("InputHandler pool_size=2", {"pool_size": 2})):
+        handler = InputHandler(path, **kwargs)
+        measure(label, handler.get_frame)
+        handler.release()
+
+    handler = InputHandler(path)
+    dst = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+    measure("InputHandler get_frame(dst=...)", lambda: handler.get_frame(dst=dst))
+    handler.release()
+
+
+def bench_preprocess(frame):
+    def legacy():
+        # 재사용 이전 구현과 같은 연산 (단계마다 새 배열)
+        resized = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        return cv2.GaussianBlur(rgb, (5, 5), 0)
+
+    pre = Preprocessor()
+    dst = np.empty((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+    assert np.array_equal(pre.preprocess(frame, dst=dst), legacy())
+    measure("Preprocessor (단계별 할당)", legacy)
+    measure("Preprocessor preprocess(dst=...)", lambda: pre.preprocess(frame, dst=dst))
+    reuse = Preprocessor(reuse_output=True)
+    measure("Preprocessor reuse_output=True", lambda: reuse.preprocess(frame))
+
+    gate = MotionGate()
+    measure("MotionGate.check", lambda: gate.check(frame))
+
+
+def bench_crop(frame):
+    try:
+        from pose_extractor import SquareCropper, normalize_z
+    except ImportError as e:
+        print(f"포즈 크롭 측정 생략 (mediapipe 없음: {e})")
+        return
+    boxes = [(100 + i % 5, 50, 220 + i % 7, 330 + i % 3) for i in range(FRAMES)]
+    it = iter(range(10 ** 9))
+
+    def legacy():
+        x1, y1, x2, y2 = boxes[next(it) % len(boxes)]
+        return cv2.cvtColor(pad_to_square(frame[y1:y2, x1:x2]), cv2.COLOR_BGR2RGB)
+
+    cropper = SquareCropper()
+    measure("pad_to_square + cvtColor", legacy)
+    measure("SquareCropper.crop", lambda: cropper.crop(frame, boxes[next(it) % len(boxes)]))
+
+    landmarks = np.random.default_rng(0).random((33, 4)).astype(np.float32)
+    bbox = boxes[0]
+    expected = normalize_z_relative(normalize_z_roi(landmarks.tolist(), bbox))
+    assert np.allclose(normalize_z(landmarks.copy(), bbox), expected, atol=1e-6)
+    measure("normalize_z_roi + normalize_z_relative",
+            lambda: normalize_z_relative(normalize_z_roi(landmarks.tolist(), bbox)))
+    measure("normalize_z (제자리)", lambda: normalize_z(landmarks, bbox))
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    with tempfile.TemporaryDirectory() as tmp:
+        if path is None:
+            path = os.path.join(tmp, "bench.avi")
+            make_video(path)
+        bench_capture(path)
+
+        handler = InputHandler(path)
+        frame = handler.get_frame()
+        handler.release()
+    if frame is None:
+        print("프레임을 읽을 수 없습니다.")
+        return
+    bench_preprocess(frame)
+    bench_crop(frame)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# clip_recorder.py
+# 최근 N초 프레임을 축소·JPEG로 메모리 링에 보관하다가 낙상/엎드림 이벤트 시 전후 구간을 영상 파일로 저장
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from config import (
+    CLIP_DIR,
+    CLIP_EVENT_TYPES,
+    CLIP_PRE_SECONDS,
+    CLIP_POST_SECONDS,
+    CLIP_FPS,
+    CLIP_SCALE,
+    CLIP_JPEG_QUALITY,
+    CLIP_MAX_BYTES,
+)
+
+
+class _ClipJob:
+    """저장 대기 중인 클립: 이벤트 목록, JPEG 프레임 [(ts, bytes)], 녹화 종료 시각."""
+    def __init__(self, events, frames, end_ts):
+        self.events = events
+        self.frames = frames
+        self.end_ts = end_ts
+        self.nbytes = sum(len(b) for _, b in frames)
+
+
+class ClipRecorder:
+    """
+    이벤트 전후 영상 기록기.
+    - push(): 프레임 루프에서 호출. fps 간격에 맞는 프레임 참조만 큐에 넣음 (축소/인코딩 없음)
+    - 인코딩 스레드: 축소 → JPEG → 링(pre_seconds) 추가. 링 바이트 합계는 max_bytes로 제한
+    - trigger(): 링에서 이벤트 pre_seconds 전부터의 프레임(이벤트 이후 이미 인코딩된 프레임 포함)으로
+      클립을 열고, 이후 post_seconds 동안 프레임을 이어 붙임
+      (진행 중 클립이 있으면 이벤트를 합치고 종료 시각만 연장)
+    - 저장 스레드: JPEG 디코드 후 cv2.VideoWriter로 clip_dir에 기록 (프레임 루프와 무관)
+    - push()한 프레임은 이후 수정하지 않아야 함 (버퍼를 재사용하는 호출자는 copy=True)
+    """
+    def __init__(self,
+                 clip_dir: str = CLIP_DIR,
+                 camera_id=None,
+                 pre_seconds: float = CLIP_PRE_SECONDS,
+                 post_seconds: float = CLIP_POST_SECONDS,
+                 fps: float = CLIP_FPS,
+                 scale: float = CLIP_SCALE,
+                 jpeg_quality: int = CLIP_JPEG_QUALITY,
+                 max_bytes: int = CLIP_MAX_BYTES,
+                 event_types=CLIP_EVENT_TYPES,
+                 copy: bool = False):
+        """
+        :param clip_dir: 클립 저장 디렉터리
+        :param camera_id: 파일 이름에 넣을 카메라 식별자
+        :param pre_seconds: 이벤트 이전 보관 시간(초)
+        :param post_seconds: 이벤트 이후 녹화 시간(초)
+        :param fps: 링에 넣는 최대 프레임률
+        :param scale: 저장 해상도 배율
+        :param jpeg_quality: JPEG 품질 (0~100)
+        :param max_bytes: 링 최대 메모리. 진행 중 클립과 저장 대기 클립(최대 2개)도 각각 이 값까지
+        :param event_types: 클립을 남길 이벤트 종류 (should_record()에서 사용)
+        :param copy: True면 push()에서 프레임을 복사 (재사용 버퍼 대응)
+        """
+        self.clip_dir = clip_dir
+        self.camera_id = camera_id
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.fps = fps
+        self.scale = scale
+        self.jpeg_quality = jpeg_quality
+        self.max_bytes = max_bytes
+        self.event_types = set(event_types)
+        self.copy = copy
+
+        self._ring = deque()        # (ts, jpeg bytes)
+        self.ring_bytes = 0
+        self._next_push = None      # 다음 push 가능 시각
+        self._latest_ts = None
+        self._incoming = queue.Queue(maxsize=4)
+        self._triggers = deque()    # (event, ts)
+        self._active = None         # 녹화 중인 _ClipJob
+        self._jobs = queue.Queue(maxsize=2)  # 저장 대기 클립 (각각 max_bytes 이하)
+
+        self._stop = threading.Event()
+        self._encoder = None
+        self._writer = None
+
+        # 통계
+        self.frames_encoded = 0
+        self.frames_dropped = 0     # 인코딩 스레드가 밀려 버린 프레임
+        self.frames_evicted = 0     # 메모리 상한으로 링에서 밀려난 프레임
+        self.clips_written = 0
+        self.clips_dropped = 0
+        self.last_clip = None
+
+    def start(self):
+        if self._encoder is not None:
+            return
+        self._encoder = threading.Thread(target=self._encode_loop, name="ClipRecorder-encode",
+                                         daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, name="ClipRecorder-write",
+                                        daemon=True)
+        self._encoder.start()
+        self._writer.start()
+
+    # ────────────── 호출 쪽 ────────────── #
+
+    def push(self, frame, ts=None):
+        """
+        :param frame: BGR 이미지
+        :param ts: 프레임 monotonic 시각 (기본 time.monotonic())
+        """
+        ts = time.monotonic() if ts is None else ts
+        due = self._next_push
+        if due is not None and ts < due:
+            return
+        # 다음 시각을 일정 간격으로 잡아 프레임 시각이 흔들려도 fps 유지 (공백 뒤에는 다시 시작)
+        if due is not None and ts - due < self.interval:
+            self._next_push = due + self.interval
+        else:
+            self._next_push = ts + self.interval
+        try:
+            self._incoming.put_nowait((ts, frame.copy() if self.copy else frame))
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def should_record(self, event):
+        return event.get("type") in self.event_types
+
+    def trigger(self, event, ts=None):
+        """
+        이벤트 클립을 요청합니다. ts(기본: 마지막 push 시각) 이전 pre_seconds와 이후 post_seconds를 저장합니다.
+        """
+        self._triggers.append((event, ts))
+
+    # ────────────── 인코딩 스레드 ────────────── #
+
+    def _encode(self, frame):
+        if self.scale != 1.0:
+            frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale,
+                               interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return buf.tobytes() if ok else None
+
+    def _encode_loop(self):
+        while not self._stop.is_set():
+            try:
+                ts, frame = self._incoming.get(timeout=0.1)
+            except queue.Empty:
+                self._handle_triggers()
+                continue
+            data = self._encode(frame)
+            if data is None:
+                continue
+            self.frames_encoded += 1
+            self._latest_ts = ts
+            self._append_ring(ts, data)
+            self._handle_triggers()
+            self._append_active(ts, data)
+            self._finish_active(ts)
+        # 종료 시 진행 중 클립은 지금까지 받은 프레임으로 저장
+        self._handle_triggers()
+        if self._active is not None:
+            self._queue_job(self._active)
+            self._active = None
+
+    def _append_ring(self, ts, data):
+        self._ring.append((ts, data))
+        self.ring_bytes += len(data)
+        cutoff = ts - self.pre_seconds
+        while self._ring and (self._ring[0][0] < cutoff or self.ring_bytes > self.max_bytes):
+            old_ts, old = self._ring.popleft()
+            self.ring_bytes -= len(old)
+            if old_ts >= cutoff:
+                self.frames_evicted += 1
+
+    def _handle_triggers(self):
+        while self._triggers:
+            event, ts = self._triggers.popleft()
+            ts = ts if ts is not None else (self._latest_ts or time.monotonic())
+            end_ts = ts + self.post_seconds
+            if self._active is not None:
+                self._active.events.append(event)
+                self._active.end_ts = max(self._active.end_ts, end_ts)
+                continue
+            # 트리거가 늦게 처리돼도 이벤트 이후 이미 링에 들어온 프레임까지 포함해 공백이 없도록 함
+            start = ts - self.pre_seconds
+            frames = [(t, b) for t, b in self._ring if t >= start]
+            self._active = _ClipJob([event], frames, end_ts)
+
+    def _append_active(self, ts, data):
+        job = self._active
+        if job is None or (job.frames and ts <= job.frames[-1][0]):
+            return
+        if job.nbytes + len(data) > self.max_bytes:
+            # 클립별 메모리 상한: 더 받지 않고 바로 저장
+            job.end_ts = ts
+            return
+        job.frames.append((ts, data))
+        job.nbytes += len(data)
+
+    def _finish_active(self, ts):
+        if self._active is None or ts < self._active.end_ts:
+            return
+        self._queue_job(self._active)
+        self._active = None
+
+    def _queue_job(self, job):
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            # 저장이 밀려 있으면 메모리 상한을 지키기 위해 버림
+            self.clips_dropped += 1
+            print(f"[ClipRecorder] 저장 대기 초과로 클립 폐기: {job.events[0].get('type')}")
+
+    # ────────────── 저장 스레드 ────────────── #
+
+    def _clip_path(self, job):
+        ev = job.events[0]
+        wall = ev.get("wall_ts") or time.time()
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(wall))
+        cam = f"{self.camera_id}_" if self.camera_id is not None else ""
+        return os.path.join(self.clip_dir, f"{cam}{stamp}_{ev.get('type', 'event')}.mp4")
+
+    def _write_loop(self):
+        while True:
+            try:
+                job = self._jobs.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set() and not (self._encoder and self._encoder.is_alive()):
+                    return
+                continue
+            try:
+                self._write_clip(job)
+            except Exception as e:
+                print(f"[ClipRecorder] 클립 저장 실패: {e}")
+
+    def _clip_fps(self, frames):
+        """
+        클립 프레임 시각으로 실제 프레임률을 계산합니다.
+        처리 지연·인코딩 드롭으로 설정 fps보다 듬성하게 들어온 클립도 실제 시간 길이로 재생되도록 함
+        """
+        if len(frames) > 1:
+            span = frames[-1][0] - frames[0][0]
+            if span > 0:
+                return (len(frames) - 1) / span
+        return self.fps or 10
+
+    def _write_clip(self, job):
+        if not job.frames:
+            return
+        os.makedirs(self.clip_dir, exist_ok=True)
+        path = self._clip_path(job)
+        fps = self._clip_fps(job.frames)
+        writer = None
+        try:
+            for _, data in job.frames:
+                frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if writer is None:
+                    h, w = frame.shape[:2]
+                    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"),
+                                             fps, (w, h))
+                writer.write(frame)
+        finally:
+            if writer is not None:
+                writer.release()
+        self.clips_written += 1
+        self.last_clip = path
+        types = ", ".join(sorted({ev.get("type") for ev in job.events}))
+        print(f"[ClipRecorder] 클립 저장: {path} ({len(job.frames)} frames, {fps:.1f} fps, {types})")
+
+    # ────────────── 종료 / 통계 ────────────── #
+
+    def close(self, timeout: float = 10.0):
+        """
+        인코딩을 멈추고 진행 중/대기 중 클립을 저장한 뒤 종료합니다.
+        """
+        self._stop.set()
+        if self._encoder is not None:
+            self._encoder.join(timeout=timeout)
+        if self._writer is not None:
+            self._writer.join(timeout=timeout)
+
+    def stats(self):
+        ring = list(self._ring)
+        return {
+            "ring_frames": len(ring),
+            "ring_bytes": self.ring_bytes,
+            "ring_seconds": ring[-1][0] - ring[0][0] if len(ring) > 1 else 0.0,
+            "max_bytes": self.max_bytes,
+            "frames_encoded": self.frames_encoded,
+            "frames_dropped": self.frames_dropped,
+            "frames_evicted": self.frames_evicted,
+            "recording": self._active is not None,
+            "pending_clips": self._jobs.qsize(),
+            "clips_written": self.clips_written,
+            "clips_dropped": self.clips_dropped,
+        }
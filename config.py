@@ -11,9 +11,22 @@ YOLO_FURNITURE_CLASSES = [56, 59]  # COCO 기준 chair=56, bed=59
 YOLO_CONF_THRESHOLD = 0.5  # 탐지 신뢰도 임계값
 YOLO_IOU_THRESHOLD = 0.4  # NMS(IOU) 임계값
 
+# 사람 추적(PersonTracker) 설정
+DETECT_STRIDE = 5               # YOLO 실행 간격(프레임). 사이 프레임은 추적으로 박스 전파
+TRACK_IOU_THRESHOLD = 0.3       # 검출 박스-트랙 매칭 최소 IoU
+TRACK_MAX_MISSES = 3            # 연속 미매칭 검출 횟수 초과 시 트랙 삭제
+TRACK_MIN_CONFIDENCE = 0.5      # 트랙 신뢰도가 이 값 미만이면 다음 프레임에 즉시 YOLO 실행
+TRACK_MOTION_DECAY = 0.85       # 움직임 예측만으로 전파할 때 프레임당 신뢰도 감소율
+TRACK_LANDMARK_DECAY = 0.97     # 랜드마크 기반 박스로 전파할 때 프레임당 신뢰도 감소율
+
 # MediaPipe Pose 설정
 MP_DETECT_CONFIDENCE = 0.5  # Pose 탐지 최소 신뢰도
 MP_TRACK_CONFIDENCE = 0.5   # 랜드마크 추적 최소 신뢰도
+MP_MODEL_COMPLEXITY = 1     # Pose 모델 복잡도 (0, 1, 2)
+POSE_POOL_SIZE = 4          # 사람(트랙)별 Pose 인스턴스 최대 개수
+POSE_IDLE_TIMEOUT = 5.0     # 사용되지 않은 Pose 인스턴스 해제 시간(초)
+POSE_CROP_QUANTUM = 16      # 정사각형 크롭 한 변을 이 배수로 올림 (크기별 RGB 버퍼 재사용률 향상)
+POSE_CROP_BUFFERS = 4       # 재사용할 크롭 RGB 버퍼(크기별) 최대 개수
 
 # 자세 분류 임계값 (랜드마크 상대 위치 기준)
 SHOULDER_HIP_DIFF_THRESHOLD = 0.1  # 어깨-엉덩이 높이 차이 (누움 판단)
@@ -30,14 +43,78 @@ NO_MOVEMENT_TIME_THRESHOLD = 30.0  # 움직임 없음 경고 시간(초)
 FALL_TRANSITION_TIME = 2.0         # 낙상 전이 최대 허용 시간(초)
 TILT_DURATION = 10.0               # 기울어진 자세 유지시간(초)
 
+# 움직임 게이트(motion_gate.py) 설정: 장면이 정지해 있으면 YOLO 생략, 직전 박스 재사용
+MOTION_GATE_ENABLED = True
+MOTION_GATE_SIZE = (160, 120)      # 비교용 축소 크기 (W, H)
+MOTION_GATE_PIXEL_DELTA = 15       # 변화로 볼 픽셀 밝기 차이
+MOTION_GATE_THRESHOLD = 0.01       # 변화 픽셀 비율이 이 값 이상이면 움직임 있음
+MOTION_GATE_MAX_SKIP = 150         # 연속 생략 최대 프레임 수 (초과 시 강제 검출)
+
+# 사람별 분석 상태(track_state.py) 설정
+TRACK_STATE_TIMEOUT = 10.0   # 이 시간(초) 이상 보이지 않은 트랙의 분석기/스무딩 창 삭제
+TRACK_STATE_MAX = 8          # 동시에 유지할 최대 트랙 수 (초과 시 가장 오래 안 보인 트랙 삭제)
+
+# 파이프라인(pipeline.py) 설정
+PIPELINE_QUEUE_SIZE = 2               # 스테이지 사이 큐 최대 길이
+PIPELINE_DROP_POLICY = "drop_oldest"  # 'drop_oldest' | 'skip_detection'
+
+# 부하 제어(load_controller.py) 설정: 지연이 목표를 넘으면 단계적으로 품질을 낮춤
+LOAD_CONTROL_ENABLED = True
+LOAD_TARGET_LATENCY = 0.5     # 목표 종단 지연(초): 캡처 → 분석 완료
+LOAD_CHECK_INTERVAL = 1.0     # 단계 조정 판단 주기(초)
+LOAD_RECOVER_RATIO = 0.5      # 평균 지연이 목표의 이 비율 미만이면 한 단계 복구
+LOAD_RISK_HOLD = 30.0         # 위험 자세/낙상 감지 후 최고 품질을 유지하는 시간(초)
+
+# 메트릭 HTTP 엔드포인트(metrics_server.py) 설정
+METRICS_HOST = "127.0.0.1"   # 외부 수집기에 열려면 "0.0.0.0"
+METRICS_PORT = None          # None이면 엔드포인트 비활성 (예: 9108)
+
+# 다중 카메라(multi_camera.py) 설정
+MULTI_CAM_WORKERS = None  # 추론 워커 프로세스 수 (None이면 CPU 코어 수, 카메라 수 이하). 카메라는 워커에 고정 배정
+                          # 워커마다 YOLO/MediaPipe를 따로 올리므로 메모리가 부족하면 줄임.
+                          # 워커 수가 적을수록 워커당 카메라가 늘어 배치가 커짐 (코어 병렬성과 교환)
+FRAME_RING_SLOTS = 4      # 카메라별 공유 메모리 프레임 링 슬롯 수
+BATCH_MAX_SIZE = 4        # 워커 안 카메라 간 배치 YOLO 추론 최대 배치 크기
+BATCH_MAX_WAIT = 0.010    # 배치를 채우기 위해 첫 프레임 후 기다리는 최대 시간(초)
+WORKER_STATS_INTERVAL = 5.0  # 추론 워커가 RSS/모델 로드 시간을 감독 프로세스로 보고하는 주기(초)
+
+# 랜드마크 녹화(landmark_recorder.py) 설정
+# 레코드당 568바이트. 트랙별 0.1초(10fps)면 한 사람 하루 약 490MB (30fps 전부 기록 시 약 1.5GB)
+LANDMARK_RECORD_INTERVAL = 0.1   # 같은 트랙의 최소 기록 간격(초). 0이면 모든 프레임 기록
+LANDMARK_RECORD_DIR = None       # 디렉터리를 지정하면 Pipeline이 포즈 결과를 녹화 (None이면 녹화 안 함)
+
 # 관심 영역(ROI) 기본값 (x1, y1, x2, y2)
 DEFAULT_ROI = (100, 200, 500, 600)
 
 # 로깅 설정
 LOG_CSV_PATH = "logs/posture_log.csv"  # 자세/이벤트 로그 CSV 파일 경로
 LOG_CONSOLE = True                     # 콘솔 출력 여부
+LOG_FLUSH_INTERVAL = 1.0               # 버퍼를 파일로 내보내는 주기(초)
+LOG_MAX_BYTES = 10 * 1024 * 1024       # 로그 파일 최대 크기 (초과 시 교체)
+LOG_ROTATE_DAILY = True                # 날짜가 바뀌면 로그 파일 교체
+LOG_COMPRESS = True                    # 교체된 로그 파일 gzip 압축
+LOG_CONSOLE_INTERVAL = 1.0             # 같은 종류 콘솔 출력 최소 간격(초)
+LOG_BUFFER_MAX = 100000                # 메모리 버퍼 최대 레코드 수 (초과 시 오래된 것부터 버림)
+
+# 이벤트 DB(event_store.py) 설정
+EVENT_STORE_ENABLED = True
+EVENT_DB_PATH = "logs/events.db"       # SQLite 파일 경로 (WAL 모드)
+EVENT_STORE_FLUSH_INTERVAL = 0.5       # 쓰기 스레드 트랜잭션 주기(초)
+EVENT_STORE_BATCH = 1000               # 트랜잭션 한 번의 최대 레코드 수
+EVENT_STORE_SUMMARY_INTERVAL = 60.0    # 자세 요약 구간 길이(초)
 
-# 알림 관리자 설정
+# 이벤트 영상(clip_recorder.py) 설정: 최근 프레임을 JPEG로 메모리에 두었다가 이벤트 시 클립 저장
+CLIP_ENABLED = True
+CLIP_DIR = "logs/clips"
+CLIP_EVENT_TYPES = ("fall_detected", "prone_warning")
+CLIP_PRE_SECONDS = 10.0           # 이벤트 이전 구간(초)
+CLIP_POST_SECONDS = 5.0           # 이벤트 이후 구간(초)
+CLIP_FPS = 10                     # 링에 넣는 최대 프레임률
+CLIP_SCALE = 0.5                  # 저장 해상도 배율
+CLIP_JPEG_QUALITY = 70
+CLIP_MAX_BYTES = 32 * 1024 * 1024 # 링 버퍼 최대 메모리 (JPEG 바이트 합계)
+
+# 알림 관리자 설정 (설정이 비어 있거나 예시값인 채널은 경고 후 제외)
 ALERT_METHODS = ["console", "firebase", "email"]
 
 # Firebase 연동 설정 (예시)
@@ -47,15 +124,35 @@ FIREBASE_CONFIG = {
     "databaseURL": "<YOUR_DATABASE_URL>",
     "storageBucket": "<YOUR_STORAGE_BUCKET>"
 }
+# Realtime Database REST 인증값 (데이터베이스 비밀 또는 ID 토큰). 웹 apiKey로는 인증되지 않음
+FIREBASE_AUTH_TOKEN = None
 
-# 이메일 알림 설정
+# 이메일 알림 설정 (example.com 등 예시 도메인 수신자, SMTP 서버 미지정이면 사용하지 않음)
 EMAIL_RECIPIENT = "caregiver@example.com"
+EMAIL_SENDER = "ai-caregiver@localhost"
+EMAIL_SMTP_HOST = None        # 예: "smtp.gmail.com"
+EMAIL_SMTP_PORT = 25
+EMAIL_SMTP_USER = None        # 인증이 필요하면 계정/비밀번호 설정
+EMAIL_SMTP_PASSWORD = None
+EMAIL_SMTP_STARTTLS = False
+
+# 알림 전송기(alert_dispatcher.py) 설정
+ALERT_QUEUE_SIZE = 256        # 채널별 대기 큐 최대 길이 (초과분은 버리고 overflow로 집계)
+ALERT_BATCH_WINDOW = 1.0      # 첫 알림 후 같이 보낼 알림을 모으는 시간(초)
+ALERT_REPEAT_WINDOW = 60.0    # 같은 (종류, 카메라, 트랙) 알림은 첫 전송 후 이 시간 동안 모아 한 건으로 보냄(초).
+                              # 분석기 COOL_DOWN(5초)보다 길어야 지속되는 낙상이 쿨다운마다 알림을 보내지 않음
+ALERT_BATCH_MAX = 20          # 한 번에 보낼 최대 알림 수 (병합 전)
+ALERT_MAX_RETRIES = 3         # 전송 실패 시 재시도 횟수
+ALERT_BACKOFF_BASE = 1.0      # 재시도 대기 시작값(초), 시도마다 2배
+ALERT_BACKOFF_MAX = 30.0      # 재시도 대기 최대값(초)
+ALERT_SEND_TIMEOUT = 5.0      # 네트워크 전송 타임아웃(초)
 
 # --- 파일 맨 아래에 추가 ---
 # PostureAnalyzerV3 전용 임계값
 ANALYZER_TILT_THRESHOLD       = 0.1   # 어깨 y 변동 임계값 (px 단위)
 ANALYZER_MOTION_THRESHOLD     = 5.0   # 무동작 임계값 (평균 이동량, px 단위)
 ANALYZER_IRREGULAR_THRESHOLD  = 3     # 윈도우 내 posture 전이 횟수 임계값
+ANALYZER_MAX_FPS              = 30    # 이력 링 버퍼 용량 산정용 최대 분석 fps
 # POSE_Z_PRONE_THRESHOLD       = -0.3  # 이미 정의돼 있음
 # FALL_TRANSITION_TIME         = 2.0   # 이미 정의돼 있음
 # NO_MOVEMENT_TIME_THRESHOLD   = 30.0  # 이미 정의돼 있음
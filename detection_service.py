@@ -0,0 +1,124 @@
+# detection_service.py
+# 사람 + 가구를 YOLO 한 번의 추론으로 검출해 PersonDetector / ROIManager가 공유하는 모듈
+
+import threading
+import time
+from collections import namedtuple
+
+from ultralytics import YOLO
+from config import YOLO_MODEL_PATH, YOLO_FURNITURE_CLASSES
+from metrics import record_model_load
+
+PERSON_CLASS = 0  # COCO person 클래스
+
+# boxes 항목: ((x1, y1, x2, y2), conf)
+Detections = namedtuple("Detections", ["persons", "furniture"])
+
+_shared_services = {}
+
+
+def get_shared_service(model_path: str = YOLO_MODEL_PATH):
+    """
+    모델 경로별로 하나의 DetectionService만 생성해 공유합니다.
+    같은 프로세스 안의 PersonDetector / ROIManager는 가중치를 한 벌만 올립니다.
+    :param model_path: YOLOv8 가중치 파일 경로
+    :return: DetectionService
+    """
+    service = _shared_services.get(model_path)
+    if service is None:
+        service = DetectionService(model_path)
+        _shared_services[model_path] = service
+    return service
+
+
+class DetectionService:
+    """
+    YOLOv8 모델을 한 번만 로드하고, 프레임당 한 번만 추론합니다.
+    - classes=[0] + YOLO_FURNITURE_CLASSES 로 사람과 가구를 동시에 검출
+    - 같은 frame 객체(와 같은 key)로 다시 호출되면 직전 결과를 그대로 반환 (두 번째 forward 없음)
+    - 같은 배열 버퍼를 다음 프레임에 재사용하는 호출자는 읽기마다 달라지는 key(예: (카메라, seq))를
+      넘기거나 새 프레임마다 invalidate() 호출
+    - detect_batch(): 여러 프레임(여러 카메라)을 한 번의 model([...]) 호출로 추론
+    """
+    def __init__(self, model_path: str = YOLO_MODEL_PATH):
+        """
+        :param model_path: YOLOv8 가중치 파일 경로
+        """
+        start = time.perf_counter()
+        self.model = YOLO(model_path)
+        record_model_load("yolo", time.perf_counter() - start)
+        self.classes = [PERSON_CLASS] + list(YOLO_FURNITURE_CLASSES)
+
+        # 직전 호출 프레임 캐시 [(frame, key, Detections), ...] (동일 객체 판정용으로 참조 유지)
+        self._cache = []
+        # 여러 스레드(배치 스케줄러, ROI 갱신 등)가 모델을 공유하므로 추론 직렬화
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """
+        캐시를 비웁니다. 프레임 버퍼를 재사용할 때 새 내용이 들어오면 호출합니다.
+        """
+        with self._lock:
+            self._cache = []
+
+    def _cached(self, frame, key):
+        for f, k, det in self._cache:
+            if f is frame and k == key:
+                return det
+        return None
+
+    @staticmethod
+    def _parse(r):
+        """
+        ultralytics 결과 1장을 Detections로 변환합니다.
+        """
+        persons, furniture = [], []
+        xyxy = r.boxes.xyxy.cpu().numpy()
+        confs = r.boxes.conf.cpu().numpy()
+        clss = r.boxes.cls.cpu().numpy()
+        for box, conf, cls in zip(xyxy, confs, clss):
+            x1, y1, x2, y2 = map(int, box)
+            item = ((x1, y1, x2, y2), float(conf))
+            if int(cls) == PERSON_CLASS:
+                persons.append(item)
+            else:
+                furniture.append(item)
+        return Detections(persons, furniture)
+
+    def detect(self, frame, key=None):
+        """
+        프레임에서 사람/가구 바운딩 박스를 검출합니다.
+        신뢰도 필터링은 호출하는 쪽(PersonDetector, ROIManager)에서 각자 적용합니다.
+        :param frame: BGR 이미지 (numpy.ndarray)
+        :param key: 프레임 내용 식별자. 버퍼를 재사용하면 읽기마다 다른 값 (None이면 객체 동일성만 비교)
+        :return: Detections(persons=[(box, conf), ...], furniture=[(box, conf), ...])
+        """
+        with self._lock:
+            det = self._cached(frame, key)
+            if det is not None:
+                return det
+
+            results = self.model(frame, classes=self.classes, verbose=False)
+            det = self._parse(results[0]) if len(results) else Detections([], [])
+            self._cache = [(frame, key, det)]
+            return det
+
+    def detect_batch(self, frames, keys=None, append=False):
+        """
+        여러 프레임을 한 번의 배치 추론으로 검출합니다.
+        결과는 캐시되므로 이후 같은 프레임·key로 detect()를 호출하면 추가 추론이 없습니다.
+        :param frames: [BGR 이미지, ...]
+        :param keys: 프레임별 key 리스트 (None이면 모두 None)
+        :param append: True면 캐시를 교체하지 않고 덧붙임 (한 주기를 여러 배치로 나눠 추론할 때)
+        :return: [Detections, ...] (frames와 같은 순서)
+        """
+        if not frames:
+            return []
+        with self._lock:
+            results = self.model(list(frames), classes=self.classes, verbose=False)
+            dets = [self._parse(r) for r in results]
+            if keys is None:
+                keys = [None] * len(dets)
+            entries = list(zip(frames, keys, dets))
+            self._cache = self._cache + entries if append else entries
+            return dets
@@ -0,0 +1,248 @@
+# event_logger.py
+# 자세 레이블/이벤트를 메모리 버퍼에 모아 백그라운드 스레드가 LOG_CSV_PATH로 일괄 기록하는 로거
+
+import atexit
+import csv
+import gzip
+import os
+import shutil
+import threading
+import time
+from collections import deque
+
+from config import (
+    LOG_CSV_PATH,
+    LOG_CONSOLE,
+    LOG_FLUSH_INTERVAL,
+    LOG_MAX_BYTES,
+    LOG_ROTATE_DAILY,
+    LOG_COMPRESS,
+    LOG_CONSOLE_INTERVAL,
+    LOG_BUFFER_MAX,
+)
+from utils import get_timestamp
+
+CSV_HEADER = ["timestamp", "wall_ts", "kind", "camera", "track_id", "label", "message"]
+
+_shared_logger = None
+_shared_lock = threading.Lock()
+
+
+def get_event_logger():
+    """
+    프로세스 공용 EventLogger (처음 호출 시 생성·시작, 종료 시 자동 flush).
+    """
+    global _shared_logger
+    with _shared_lock:
+        if _shared_logger is None:
+            _shared_logger = EventLogger()
+            _shared_logger.start()
+            atexit.register(_shared_logger.close)
+        return _shared_logger
+
+
+class EventLogger:
+    """
+    호출 쪽(프레임 루프)은 deque.append 한 번만 하고, 파일 쓰기/콘솔 출력은 백그라운드 스레드가 합니다.
+    - posture(): 자세 레이블. (camera, track_id)별로 레이블이 바뀔 때만 CSV에 기록
+    - event(): 분석기 이벤트 dict. 항상 CSV에 기록, 콘솔에는 즉시 출력
+    - debug(): 콘솔 전용 진단값. 같은 key는 console_interval마다 최신값 1줄만 출력
+    - 파일은 max_bytes 초과 또는 날짜 변경 시 <이름>.<날짜>.<n>.csv로 교체하고 선택적으로 gzip 압축
+    """
+    def __init__(self,
+                 path: str = LOG_CSV_PATH,
+                 console: bool = LOG_CONSOLE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL,
+                 max_bytes: int = LOG_MAX_BYTES,
+                 rotate_daily: bool = LOG_ROTATE_DAILY,
+                 compress: bool = LOG_COMPRESS,
+                 console_interval: float = LOG_CONSOLE_INTERVAL,
+                 buffer_max: int = LOG_BUFFER_MAX):
+        """
+        :param path: CSV 파일 경로
+        :param console: 콘솔 출력 여부
+        :param flush_interval: 파일 기록 주기(초)
+        :param max_bytes: 파일 최대 크기 (0이면 크기 교체 없음)
+        :param rotate_daily: 날짜 변경 시 파일 교체
+        :param compress: 교체된 파일 gzip 압축
+        :param console_interval: debug()/자세 콘솔 출력 최소 간격(초)
+        :param buffer_max: 메모리 버퍼 최대 레코드 수
+        """
+        self.path = path
+        self.console = console
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.console_interval = console_interval
+
+        # (kind, wall_ts, camera, track_id, label, message) 튜플. append/popleft는 스레드 안전
+        self._buffer = deque(maxlen=buffer_max)
+
+        self._file = None
+        self._writer = None
+        self._file_day = None
+        self._last_label = {}      # (camera, track_id) -> 마지막 기록 레이블
+        self._console_last = {}    # key -> 마지막 출력 monotonic 시각
+        self._console_pending = {} # key -> (최신 메시지, 출력 보류 횟수)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._io_lock = threading.Lock()  # flush()를 직접 호출할 때 백그라운드 스레드와 직렬화
+        self.rows_written = 0
+        self.rotations = 0
+
+    # ────────────── 호출 쪽 (append만) ────────────── #
+
+    def posture(self, label, camera=None, track_id=None, wall_ts=None):
+        self._buffer.append(("posture", wall_ts or time.time(), camera, track_id, label, ""))
+
+    def event(self, ev, camera=None, track_id=None):
+        """
+        :param ev: PostureAnalyzerV4.get_events()의 이벤트 dict
+        """
+        self._buffer.append(("event", ev.get("wall_ts") or time.time(),
+                             ev.get("camera", camera), ev.get("track_id", track_id),
+                             ev.get("type"), ev.get("message", "")))
+
+    def debug(self, key, fmt, *args):
+        """
+        콘솔 전용 진단값. 문자열 포맷(fmt % args)은 백그라운드 스레드에서 합니다.
+        """
+        self._buffer.append(("debug", None, None, None, key, (fmt, args)))
+
+    # ────────────── 백그라운드 ────────────── #
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="EventLogger", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        버퍼에 쌓인 레코드를 처리합니다. 백그라운드 스레드가 주기적으로 호출합니다.
+        """
+        with self._io_lock:
+            rows = []
+            now = time.monotonic()
+            while True:
+                try:
+                    kind, wall_ts, camera, track_id, label, message = self._buffer.popleft()
+                except IndexError:
+                    break
+
+                if kind == "debug":
+                    if self.console:
+                        fmt, args = message
+                        self._console_rate_limited(label, fmt % args if args else fmt)
+                    continue
+                if kind == "posture":
+                    key = (camera, track_id)
+                    if self._last_label.get(key) == label:
+                        continue
+                    self._last_label[key] = label
+                    self._console_rate_limited(f"posture:{camera}:{track_id}",
+                                               f"#{track_id} {label}" if track_id is not None else label)
+                elif self.console:
+                    where = f"[{camera}]" if camera is not None else ""
+                    print(f"[EventLogger]{where}[{get_timestamp(wall_ts)}] {label}: {message}")
+                rows.append((wall_ts, kind, camera, track_id, label, message))
+
+            self._flush_console(now)
+            if rows:
+                self._write_rows(rows)
+
+    def _console_rate_limited(self, key, message):
+        if not self.console:
+            return
+        _, skipped = self._console_pending.get(key, (None, -1))
+        self._console_pending[key] = (message, skipped + 1)
+
+    def _flush_console(self, now):
+        """보류 중인 콘솔 메시지 중 간격이 지난 key만 최신값으로 1줄 출력."""
+        for key in list(self._console_pending):
+            if now - self._console_last.get(key, float("-inf")) < self.console_interval:
+                continue
+            message, skipped = self._console_pending.pop(key)
+            self._console_last[key] = now
+            suffix = f" (+{skipped})" if skipped else ""
+            print(f"[{key}] {message}{suffix}")
+
+    def _write_rows(self, rows):
+        for wall_ts, kind, camera, track_id, label, message in rows:
+            day = time.strftime("%Y-%m-%d", time.localtime(wall_ts))
+            self._ensure_file(day)
+            self._writer.writerow([get_timestamp(wall_ts), f"{wall_ts:.3f}", kind,
+                                   "" if camera is None else camera,
+                                   "" if track_id is None else track_id,
+                                   label, message])
+            self.rows_written += 1
+        self._file.flush()
+
+    # ────────────── 파일 / 교체 ────────────── #
+
+    def _ensure_file(self, day):
+        if self._file is not None:
+            day_changed = self.rotate_daily and day != self._file_day
+            too_big = self.max_bytes and self._file.tell() >= self.max_bytes
+            if not (day_changed or too_big):
+                return
+            self._rotate()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # 이전 실행에서 남은 파일이 다른 날짜거나 너무 크면 먼저 교체
+        if os.path.exists(self.path):
+            old_day = time.strftime("%Y-%m-%d", time.localtime(os.path.getmtime(self.path)))
+            if ((self.rotate_daily and old_day != day)
+                    or (self.max_bytes and os.path.getsize(self.path) >= self.max_bytes)):
+                self._file_day = old_day
+                self._rotate()
+
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, "a", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._file_day = day
+        if new:
+            self._writer.writerow(CSV_HEADER)
+
+    def _rotate(self):
+        """현재 파일을 <이름>.<날짜>.<n><확장자>로 옮기고 필요하면 압축합니다."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+        root, ext = os.path.splitext(self.path)
+        n = 1
+        while True:
+            target = f"{root}.{self._file_day}.{n}{ext}"
+            if not os.path.exists(target) and not os.path.exists(target + ".gz"):
+                break
+            n += 1
+        os.replace(self.path, target)
+        self.rotations += 1
+        if self.compress:
+            with open(target, "rb") as src, gzip.open(target + ".gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(target)
+
+    def close(self):
+        """
+        백그라운드 스레드를 멈추고 남은 레코드를 기록합니다.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.flush()
+        with self._io_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._writer = None
@@ -0,0 +1,265 @@
+# event_store.py
+# 분석기 이벤트와 주기별 자세 요약을 SQLite(WAL)에 일괄 저장하고 기간/종류별로 조회하는 모듈
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from config import (
+    EVENT_DB_PATH,
+    EVENT_STORE_FLUSH_INTERVAL,
+    EVENT_STORE_BATCH,
+    EVENT_STORE_SUMMARY_INTERVAL,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    camera TEXT NOT NULL DEFAULT '',
+    track_id INTEGER,
+    type TEXT NOT NULL,
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_camera_type_ts ON events (camera, type, ts);
+CREATE INDEX IF NOT EXISTS idx_events_type_ts ON events (type, ts);
+
+CREATE TABLE IF NOT EXISTS posture_summary (
+    id INTEGER PRIMARY KEY,
+    bucket_ts REAL NOT NULL,
+    camera TEXT NOT NULL DEFAULT '',
+    track_id INTEGER,
+    label TEXT NOT NULL,
+    frames INTEGER NOT NULL,
+    first_ts REAL NOT NULL,
+    last_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_posture_camera_label_ts ON posture_summary (camera, label, bucket_ts);
+"""
+
+
+def _where(camera=None, ev_type=None, start=None, end=None, track_id=None,
+           type_col="type", ts_col="ts"):
+    """조회 조건 WHERE 절과 파라미터. 인덱스 순서(camera, type, ts)대로 조건을 만듭니다."""
+    clauses, params = [], []
+    if camera is not None:
+        clauses.append("camera = ?")
+        params.append(str(camera))
+    if ev_type is not None:
+        clauses.append(f"{type_col} = ?")
+        params.append(ev_type)
+    if start is not None:
+        clauses.append(f"{ts_col} >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append(f"{ts_col} < ?")
+        params.append(end)
+    if track_id is not None:
+        clauses.append("track_id = ?")
+        params.append(track_id)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class EventStore:
+    """
+    SQLite 이벤트 저장소.
+    - event()/posture()는 deque.append만 하고, 쓰기 스레드가 flush_interval마다 한 트랜잭션으로 기록
+    - posture()는 (구간, 카메라, 트랙, 레이블)별 프레임 수로 집계해 구간이 끝나면 한 행으로 기록
+    - 조회 메서드는 호출마다 별도 연결을 써서 WAL 모드에서 쓰기와 동시에 읽음
+    - 시각은 이벤트의 wall_ts (epoch 초)
+    """
+    def __init__(self,
+                 path: str = EVENT_DB_PATH,
+                 flush_interval: float = EVENT_STORE_FLUSH_INTERVAL,
+                 batch_size: int = EVENT_STORE_BATCH,
+                 summary_interval: float = EVENT_STORE_SUMMARY_INTERVAL):
+        """
+        :param path: SQLite 파일 경로
+        :param flush_interval: 쓰기 주기(초)
+        :param batch_size: 트랜잭션 한 번의 최대 레코드 수
+        :param summary_interval: 자세 요약 구간 길이(초)
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.summary_interval = summary_interval
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._pending = deque()
+        # (bucket_ts, camera, track_id, label) -> [frames, first_ts, last_ts]
+        self._summary = {}
+        self._latest_ts = 0.0
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._write_conn = None
+        self.events_written = 0
+        self.summaries_written = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ────────────── 기록 (호출 쪽) ────────────── #
+
+    def event(self, ev, camera=None, track_id=None):
+        """
+        :param ev: PostureAnalyzerV4.get_events()의 이벤트 dict
+        """
+        self._pending.append(("event", ev.get("wall_ts") or time.time(),
+                              ev.get("camera", camera), ev.get("track_id", track_id),
+                              ev.get("type"), ev.get("message")))
+
+    def posture(self, label, camera=None, track_id=None, wall_ts=None):
+        self._pending.append(("posture", wall_ts or time.time(), camera, track_id, label, None))
+
+    # ────────────── 쓰기 스레드 ────────────── #
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="EventStore", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        self._write_conn = self._connect()
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self._drain()
+            self._drain(final=True)
+        finally:
+            self._write_conn.close()
+            self._write_conn = None
+
+    def _drain(self, final=False):
+        while True:
+            events = []
+            n = 0
+            while n < self.batch_size:
+                try:
+                    kind, ts, camera, track_id, label, message = self._pending.popleft()
+                except IndexError:
+                    break
+                n += 1
+                camera = "" if camera is None else str(camera)
+                if kind == "event":
+                    events.append((ts, camera, track_id, label, message))
+                    continue
+                bucket = ts - ts % self.summary_interval
+                entry = self._summary.get((bucket, camera, track_id, label))
+                if entry is None:
+                    self._summary[(bucket, camera, track_id, label)] = [1, ts, ts]
+                else:
+                    entry[0] += 1
+                    entry[1] = min(entry[1], ts)
+                    entry[2] = max(entry[2], ts)
+                if ts > self._latest_ts:
+                    self._latest_ts = ts
+
+            summaries = self._closed_summaries(final)
+            if events or summaries:
+                with self._write_conn:
+                    self._write_conn.executemany(
+                        "INSERT INTO events (ts, camera, track_id, type, message) VALUES (?, ?, ?, ?, ?)",
+                        events)
+                    self._write_conn.executemany(
+                        "INSERT INTO posture_summary (bucket_ts, camera, track_id, label, frames, "
+                        "first_ts, last_ts) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        summaries)
+                self.events_written += len(events)
+                self.summaries_written += len(summaries)
+            if n < self.batch_size:
+                return
+
+    def _closed_summaries(self, final):
+        """현재 구간 이전의 요약(또는 종료 시 전부)을 꺼내 INSERT 행으로 만듭니다."""
+        current = self._latest_ts - self._latest_ts % self.summary_interval
+        rows = []
+        for key in list(self._summary):
+            if final or key[0] < current:
+                frames, first, last = self._summary.pop(key)
+                rows.append(key + (frames, first, last))
+        return rows
+
+    def close(self):
+        """
+        남은 레코드와 진행 중인 자세 요약을 기록하고 쓰기 스레드를 종료합니다.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        elif self._pending or self._summary:
+            # start() 없이 쓴 경우 호출 스레드에서 기록
+            self._write_conn = self._connect()
+            try:
+                self._drain(final=True)
+            finally:
+                self._write_conn.close()
+                self._write_conn = None
+
+    # ────────────── 조회 ────────────── #
+
+    def _query(self, sql, params):
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def count(self, ev_type=None, camera=None, start=None, end=None, track_id=None):
+        """
+        조건에 맞는 이벤트 수. 예: count("prone_warning", camera="room3", start=week_ago)
+        :param start/end: epoch 초, [start, end)
+        """
+        where, params = _where(camera, ev_type, start, end, track_id)
+        return self._query(f"SELECT COUNT(*) FROM events{where}", params)[0][0]
+
+    def counts_by_type(self, camera=None, start=None, end=None, track_id=None):
+        """
+        :return: {이벤트 종류: 횟수}
+        """
+        where, params = _where(camera, None, start, end, track_id)
+        rows = self._query(f"SELECT type, COUNT(*) FROM events{where} GROUP BY type", params)
+        return dict(rows)
+
+    def histogram(self, bucket_seconds, ev_type=None, camera=None, start=None, end=None,
+                  track_id=None):
+        """
+        이벤트 시간 히스토그램. 구간 시작 시각은 epoch 기준 bucket_seconds 배수입니다.
+        (지역 시간 기준 일별 집계는 bucket_seconds=86400 대신 조회 후 변환 필요)
+        :return: [(구간 시작 epoch 초, 횟수), ...] (이벤트가 있는 구간만, 시간순)
+        """
+        where, params = _where(camera, ev_type, start, end, track_id)
+        sql = (f"SELECT CAST(ts / ? AS INTEGER) * ? AS bucket, COUNT(*) FROM events{where} "
+               f"GROUP BY bucket ORDER BY bucket")
+        return [(float(b), n) for b, n in self._query(sql, [bucket_seconds, bucket_seconds] + params)]
+
+    def events(self, ev_type=None, camera=None, start=None, end=None, track_id=None, limit=100):
+        """
+        최근 이벤트 목록 (최신순).
+        :return: [{"ts", "camera", "track_id", "type", "message"}, ...]
+        """
+        where, params = _where(camera, ev_type, start, end, track_id)
+        rows = self._query(f"SELECT ts, camera, track_id, type, message FROM events{where} "
+                           f"ORDER BY ts DESC LIMIT ?", params + [limit])
+        return [dict(zip(("ts", "camera", "track_id", "type", "message"), r)) for r in rows]
+
+    def posture_frames(self, camera=None, start=None, end=None, track_id=None):
+        """
+        기간 내 자세 레이블별 프레임 수 (요약 구간 단위로 포함 여부 판정).
+        :return: {레이블: 프레임 수}
+        """
+        where, params = _where(camera, None, start, end, track_id, ts_col="bucket_ts")
+        rows = self._query(f"SELECT label, SUM(frames) FROM posture_summary{where} GROUP BY label",
+                           params)
+        return dict(rows)
@@ -0,0 +1,180 @@
+# frame_history.py
+# PostureAnalyzerV4용 고정 용량 NumPy 링 버퍼 (프레임별 namedtuple/랜드마크 리스트 대체)
+
+from collections import namedtuple
+
+import numpy as np
+from config import FRAME_WIDTH, FRAME_HEIGHT
+
+NUM_LANDMARKS = 33
+
+# posture 레이블 <-> 정수 코드. 목록에 없는 레이블은 encode_label()에서 뒤에 추가
+POSTURE_LABELS = [
+    "unknown",
+    "standing",
+    "sitting",
+    "kneeling",
+    "lying_supine",
+    "lying_prone",
+    "irregular",
+]
+_LABEL_CODES = {label: code for code, label in enumerate(POSTURE_LABELS)}
+
+AnalyzedFrame = namedtuple(
+    "AnalyzedFrame",
+    ["monotonic_ts", "wall_ts", "label", "shoulder_y", "landmarks", "in_roi"]
+)
+
+# 프레임 픽셀 좌표(points)가 없을 때 쓰는 픽셀 단위 이동량 스케일 (calculate_euclidean_distance와 동일)
+# 크롭 기준 정규화 좌표에 곱하므로 근사값임
+_PIXEL_SCALE = np.array([FRAME_WIDTH, FRAME_HEIGHT], dtype=np.float32)
+
+
+def encode_label(label):
+    """
+    레이블 문자열을 정수 코드로 변환합니다.
+    """
+    code = _LABEL_CODES.get(label)
+    if code is None:
+        code = len(POSTURE_LABELS)
+        POSTURE_LABELS.append(label)
+        _LABEL_CODES[label] = code
+    return code
+
+
+def decode_label(code):
+    """
+    정수 코드를 레이블 문자열로 변환합니다.
+    """
+    return POSTURE_LABELS[int(code)]
+
+
+class FrameHistory:
+    """
+    분석 프레임 이력을 미리 할당한 병렬 배열에 저장하는 링 버퍼.
+    - landmarks: float32 [capacity, 33, 4]
+    - points: float32 [capacity, 33, 2] 프레임 픽셀 좌표 (이동량 계산용, 없으면 has_points=False)
+    - label: int16 코드, monotonic/wall 타임스탬프: float64, ROI 여부: bool
+    - shoulder_y: float32 (랜드마크 없으면 NaN)
+    - append()는 기존 슬롯에 값을 복사만 하며, 가득 차면 호출 측에서 popleft() 후 추가
+    - 인덱스 i는 deque와 같이 0이 가장 오래된 프레임, -1이 최신 프레임
+    """
+    def __init__(self, capacity):
+        """
+        :param capacity: 최대 보관 프레임 수 (윈도우 길이(초) × 최대 fps 이상 권장)
+        """
+        self.capacity = max(2, int(capacity))
+        self.monotonic_ts = np.zeros(self.capacity, dtype=np.float64)
+        self.wall_ts = np.zeros(self.capacity, dtype=np.float64)
+        self.label = np.zeros(self.capacity, dtype=np.int16)
+        self.shoulder_y = np.full(self.capacity, np.nan, dtype=np.float32)
+        self.landmarks = np.zeros((self.capacity, NUM_LANDMARKS, 4), dtype=np.float32)
+        self.has_landmarks = np.zeros(self.capacity, dtype=bool)
+        self.points = np.zeros((self.capacity, NUM_LANDMARKS, 2), dtype=np.float32)
+        self.has_points = np.zeros(self.capacity, dtype=bool)
+        self.in_roi = np.zeros(self.capacity, dtype=bool)
+
+        self.head = 0   # 가장 오래된 프레임 슬롯
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def is_full(self):
+        return self.size == self.capacity
+
+    @property
+    def nbytes(self):
+        """미리 할당된 배열 전체 메모리(바이트)."""
+        return (self.monotonic_ts.nbytes + self.wall_ts.nbytes + self.label.nbytes +
+                self.shoulder_y.nbytes + self.landmarks.nbytes +
+                self.has_landmarks.nbytes + self.points.nbytes + self.has_points.nbytes +
+                self.in_roi.nbytes)
+
+    def slot(self, i):
+        """
+        논리 인덱스(0=가장 오래됨, -1=최신)를 배열 슬롯 번호로 변환합니다.
+        """
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("FrameHistory index out of range")
+        return (self.head + i) % self.capacity
+
+    def append(self, monotonic_ts, wall_ts, label_code, landmarks, in_roi, points=None):
+        """
+        프레임 한 장을 복사해 넣습니다. 가득 찬 상태면 IndexError.
+        :param landmarks: [(x, y, z, v), ...] 또는 (33, 4) 배열, 없으면 None
+        :param points: 프레임 픽셀 좌표 (33, 2 이상) 배열 (x, y만 사용), 없으면 None
+        :return: 기록된 슬롯 번호
+        """
+        if self.size == self.capacity:
+            raise IndexError("FrameHistory is full")
+        s = (self.head + self.size) % self.capacity
+        self.monotonic_ts[s] = monotonic_ts
+        self.wall_ts[s] = wall_ts
+        self.label[s] = label_code
+        self.in_roi[s] = in_roi
+        if landmarks is not None and len(landmarks):
+            self.landmarks[s] = landmarks
+            self.has_landmarks[s] = True
+            self.shoulder_y[s] = (self.landmarks[s, 11, 1] + self.landmarks[s, 12, 1]) / 2
+        else:
+            self.has_landmarks[s] = False
+            self.shoulder_y[s] = np.nan
+        if points is not None and len(points):
+            self.points[s] = points[:, :2]
+            self.has_points[s] = True
+        else:
+            self.has_points[s] = False
+        self.size += 1
+        return s
+
+    def popleft(self):
+        """
+        가장 오래된 프레임을 제거하고 그 슬롯 번호를 반환합니다. (데이터는 덮어쓸 때까지 유지)
+        """
+        if self.size == 0:
+            raise IndexError("pop from an empty FrameHistory")
+        s = self.head
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+        return s
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+
+    def motion_between(self, prev_slot, curr_slot):
+        """
+        두 슬롯 랜드마크 사이 이동량 합계(픽셀 단위). 33개 점을 한 번에 계산합니다.
+        두 슬롯 모두 프레임 픽셀 좌표(points)가 있으면 그것을, 아니면 크롭 좌표 × 프레임 크기를 사용합니다.
+        """
+        if self.has_points[prev_slot] and self.has_points[curr_slot]:
+            d = self.points[curr_slot] - self.points[prev_slot]
+        else:
+            d = (self.landmarks[curr_slot, :, :2] - self.landmarks[prev_slot, :, :2]) * _PIXEL_SCALE
+        return float(np.sqrt((d * d).sum(axis=1)).sum())
+
+    def ordered(self, name):
+        """
+        이름에 해당하는 배열을 오래된 순서대로 반환합니다. (벡터화된 윈도우 질의용)
+        링이 끝을 넘어 감겨 있지 않으면 복사 없이 view를 반환합니다.
+        :param name: 'monotonic_ts', 'wall_ts', 'label', 'shoulder_y', 'landmarks',
+                     'has_landmarks', 'points', 'has_points', 'in_roi'
+        """
+        arr = getattr(self, name)
+        end = self.head + self.size
+        if end <= self.capacity:
+            return arr[self.head:end]
+        return np.concatenate((arr[self.head:], arr[:end - self.capacity]))
+
+    def frame(self, i):
+        """
+        논리 인덱스 i의 프레임을 AnalyzedFrame으로 반환합니다. (디버깅/호환용, 복사 발생)
+        """
+        s = self.slot(i)
+        sh_y = None if np.isnan(self.shoulder_y[s]) else float(self.shoulder_y[s])
+        lms = [tuple(p) for p in self.landmarks[s].tolist()] if self.has_landmarks[s] else None
+        return AnalyzedFrame(float(self.monotonic_ts[s]), float(self.wall_ts[s]),
+                             decode_label(self.label[s]), sh_y, lms, bool(self.in_roi[s]))
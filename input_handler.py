@@ -1,30 +1,64 @@
 # input_handler.py
 # 각종 영상 정보 소스를 통일된 인터페이스로 뽑아주는 모듈
 
+import threading
+import time
+
 import cv2
+import numpy as np
 from config import FRAME_WIDTH, FRAME_HEIGHT
 
 # Picamera2 지원 시도
 try:
-    from picamera2 import Picamera2
+    from picamera2 import Picamera2, MappedArray
     HAVE_PICAMERA2 = True
 except ImportError:
     HAVE_PICAMERA2 = False
 
+
+class _BufferPool:
+    """
+    같은 모양의 프레임 버퍼를 돌려 가며 재사용하는 풀.
+    버퍼는 처음 채울 때(모양을 알 때) 만들어지므로 처음 size장 이후로는 할당이 없습니다.
+    """
+    def __init__(self, size):
+        self._buffers = [None] * size
+        self._index = 0
+
+    def next(self):
+        """다음 차례 버퍼 (아직 없으면 None)와 그 번호."""
+        i = self._index
+        self._index = (i + 1) % len(self._buffers)
+        return self._buffers[i], i
+
+    def store(self, i, frame):
+        """번호 i 자리에 실제로 채워진 배열을 기록 (모양이 달라 새로 할당된 경우 교체)."""
+        self._buffers[i] = frame
+
+
 class InputHandler:
-    def __init__(self, source=0, width=FRAME_WIDTH, height=FRAME_HEIGHT):
+    def __init__(self, source=0, width=FRAME_WIDTH, height=FRAME_HEIGHT, threaded=False,
+                 pool_size=0):
         """
         영상 소스 초기화
         :param source: int(웹캠 인덱스), str(동영상 파일 경로), 또는 "picam2"
+        :param threaded: True면 백그라운드 스레드가 계속 캡처하고 최신 프레임 하나만 유지
+                         (처리가 느려도 드라이버 버퍼에 밀린 오래된 프레임을 분석하지 않음)
+        :param pool_size: 0보다 크면 get_frame()이 미리 채운 pool_size개 버퍼를 돌려 가며 반환
+                          (프레임마다 새 배열 할당 없음). 반환된 프레임은 이후 pool_size-1번의
+                          get_frame()까지만 유효하므로, 프레임을 큐/캐시에 더 오래 잡아 두는 호출자
+                          (Pipeline, DetectionService의 프레임 동일성 캐시 등)는 0으로 둬야 함
         """
         self.use_picam2 = False
+        self.is_file = isinstance(source, str) and source != "picam2"
         # Picamera2 분기
         if HAVE_PICAMERA2 and source == "picam2":
             print("[InputHandler] Picamera2 모드 진입")
             self.picam2 = Picamera2()
+            # libcamera의 "RGB888"은 메모리상 B, G, R 순서 → OpenCV/YOLO가 쓰는 BGR 그대로 (변환 불필요)
             cfg = self.picam2.create_preview_configuration({
                 "size": (width, height),
-                "format": "XRGB8888"
+                "format": "RGB888"
             })
             self.picam2.configure(cfg)
             self.picam2.start()
@@ -38,28 +72,183 @@ class InputHandler:
             self.cap.set(cv2.CAP_PROP_FRAME_WIDTH,  width)
             self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
 
+        # 마지막으로 반환한 프레임의 캡처 시각 (time.monotonic 기준)
+        self.frame_ts = None
+        # 처리되지 못하고 더 새 프레임으로 덮어써진 프레임 수 (threaded 모드)
+        self.dropped_frames = 0
+
+        # 반환용 버퍼 풀. threaded 모드에서는 캡처 스레드용 이중 버퍼를 따로 두고
+        # get_frame()이 최신 프레임을 반환용 버퍼로 복사 (캡처 스레드가 반환한 버퍼를 덮어쓰지 않도록)
+        self._pool = _BufferPool(pool_size) if pool_size > 0 else None
+        self._grab_bufs = [None, None] if pool_size > 0 and threaded else None
+
+        self.threaded = threaded
+        if threaded:
+            self._cond = threading.Condition()
+            self._latest = None
+            self._latest_ts = None
+            self._seq = 0            # 캡처된 프레임 번호
+            self._consumed_seq = 0   # 마지막으로 반환한 프레임 번호
+            self._running = True
+            self._thread = threading.Thread(target=self._grab_loop,
+                                            name="InputHandlerGrabber",
+                                            daemon=True)
+            self._thread.start()
+
     def is_opened(self):
         if self.use_picam2:
             return True
         return self.cap.isOpened()
 
-    def get_frame(self):
+    def _read(self, dst=None):
         """
-        한 프레임을 읽어서 반환합니다.
-        읽기 실패 시 None을 반환합니다.
+        소스에서 프레임 한 장을 동기식으로 읽습니다.
+        :param dst: 프레임을 쓸 배열. 모양이 맞으면 새로 할당하지 않고 여기에 씀
         :return: BGR 이미지(np.ndarray) 또는 None
         """
         if self.use_picam2:
-            img = self.picam2.capture_array()
-            # RGB->BGR 변환
-            return cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-        success, frame = self.cap.read()
+            if dst is None:
+                return self.picam2.capture_array()
+            # 카메라 버퍼를 매핑해 dst로 한 번만 복사 (capture_array()의 새 배열 할당 없음)
+            with self.picam2.captured_request() as request:
+                with MappedArray(request, "main") as m:
+                    if m.array.shape != dst.shape:
+                        return m.array.copy()
+                    np.copyto(dst, m.array)
+            return dst
+        if dst is None:
+            success, frame = self.cap.read()
+        else:
+            success, frame = self.cap.read(dst)
         return frame if success else None
 
+    def _read_pooled(self, pool):
+        buf, i = pool.next()
+        frame = self._read(buf)
+        if frame is not None and frame is not buf:
+            pool.store(i, frame)
+        return frame
+
+    def _output(self, frame, dst=None):
+        """(threaded 모드) 캡처 스레드 버퍼의 프레임을 dst 또는 반환용 풀 버퍼로 복사합니다."""
+        i = None
+        if dst is None:
+            if self._pool is None:
+                return frame
+            dst, i = self._pool.next()
+        if dst is None or dst.shape != frame.shape:
+            dst = frame.copy()
+        else:
+            np.copyto(dst, frame)
+        if i is not None:
+            self._pool.store(i, dst)
+        return dst
+
+    def _grab_read(self):
+        """(threaded + 풀) 현재 _latest가 아닌 쪽 이중 버퍼에 읽습니다. 캡처 스레드에서만 호출."""
+        bufs = self._grab_bufs
+        i = 1 if self._latest is not None and self._latest is bufs[0] else 0
+        frame = self._read(bufs[i])
+        if frame is not None:
+            bufs[i] = frame
+        return frame
+
+    def _grab_loop(self):
+        """
+        백그라운드 캡처 루프: 최신 프레임 하나만 보관하고 나머지는 버립니다.
+        """
+        while self._running:
+            frame = self._grab_read() if self._grab_bufs is not None else self._read()
+            ts = time.monotonic()
+            if frame is None:
+                # 동영상 파일 끝 또는 카메라 종료 → 스레드 종료
+                if self.is_file or not self.is_opened():
+                    break
+                time.sleep(0.005)
+                continue
+
+            with self._cond:
+                if self._seq > self._consumed_seq:
+                    self.dropped_frames += 1
+                self._latest = frame
+                self._latest_ts = ts
+                self._seq += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def get_frame(self, timeout=None, dst=None):
+        """
+        한 프레임을 읽어서 반환합니다.
+        읽기 실패 시 None을 반환합니다.
+        threaded 모드에서는 아직 반환하지 않은 새 프레임이 올 때까지 대기합니다.
+        :param timeout: threaded 모드 최대 대기 시간(초). None이면 무기한 대기
+        :param dst: 프레임을 쓸 배열 (모양이 같으면 할당 없음). None이면 pool_size 설정을 따름
+        :return: BGR 이미지(np.ndarray) 또는 None
+        """
+        if not self.threaded:
+            if dst is not None:
+                frame = self._read(dst)
+            elif self._pool is not None:
+                frame = self._read_pooled(self._pool)
+            else:
+                frame = self._read()
+            self.frame_ts = time.monotonic()
+            return frame
+
+        with self._cond:
+            has_new = self._cond.wait_for(
+                lambda: self._seq > self._consumed_seq or not self._running,
+                timeout
+            )
+            if not has_new or self._seq == self._consumed_seq:
+                return None
+            return self._take_latest(dst)
+
+    def get_latest(self, dst=None):
+        """
+        (threaded 모드) 대기 없이 가장 최근 캡처된 프레임을 반환합니다.
+        이미 반환한 프레임일 수도 있으며, 아직 캡처된 프레임이 없으면 None입니다.
+        non-threaded 모드에서는 get_frame()과 같습니다.
+        :param dst: get_frame()과 같음
+        :return: BGR 이미지(np.ndarray) 또는 None
+        """
+        if not self.threaded:
+            return self.get_frame(dst=dst)
+        with self._cond:
+            if self._latest is None:
+                return None
+            return self._take_latest(dst)
+
+    def _take_latest(self, dst=None):
+        # self._cond 잡은 상태에서 호출 (캡처 스레드는 _latest가 아닌 버퍼에만 쓰고,
+        # _latest 교체는 이 잠금을 잡아야 하므로 복사 중에 덮어써지지 않음)
+        self._consumed_seq = self._seq
+        self.frame_ts = self._latest_ts
+        if self._grab_bufs is None and dst is None:
+            return self._latest
+        return self._output(self._latest, dst)
+
+    def latency(self):
+        """
+        마지막으로 반환한 프레임의 캡처 시각부터 현재까지 경과 시간(초).
+        처리 시작 시각이 아닌 캡처 시각 기준이므로 큐/버퍼 대기까지 포함됩니다.
+        """
+        if self.frame_ts is None:
+            return 0.0
+        return time.monotonic() - self.frame_ts
+
     def release(self):
         """
         캡처 리소스를 해제합니다.
         """
+        if self.threaded:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+            self._thread.join(timeout=1.0)
         if self.use_picam2:
             self.picam2.stop()
         else:
@@ -0,0 +1,276 @@
+# landmark_recorder.py
+# PoseExtractor 결과(시각, 트랙 ID, bbox, 33x4 랜드마크, 크롭 변환)를 컬럼형 바이너리로 저장/메모리맵 재생
+
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from config import LANDMARK_RECORD_INTERVAL
+
+NUM_LANDMARKS = 33
+FORMAT_VERSION = 2
+
+# 컬럼 이름 -> (파일명, dtype, 레코드당 shape)
+COLUMNS = {
+    "timestamp": ("timestamp.f64", np.float64, ()),
+    "track_id": ("track_id.i32", np.int32, ()),
+    "bbox": ("bbox.i32", np.int32, (4,)),
+    "landmarks": ("landmarks.f32", np.float32, (NUM_LANDMARKS, 4)),
+    # 크롭 정규화 좌표 → 프레임 픽셀 좌표 변환 (ox, oy, side). side=0이면 없음 (버전 1 녹화에는 파일 없음)
+    "crop": ("crop.i32", np.int32, (3,)),
+}
+
+RecordSlice = namedtuple("RecordSlice", ["timestamp", "track_id", "bbox", "landmarks", "crop"])
+
+
+def crop_points(landmarks, crop):
+    """
+    크롭 정규화 랜드마크를 프레임 픽셀 좌표 (33, 2)로 바꿉니다. (PoseExtractor의 frame_landmarks x, y)
+    :param crop: (ox, oy, side). None이거나 side가 0이면 None 반환
+    """
+    if crop is None or crop[2] <= 0:
+        return None
+    ox, oy, side = (int(v) for v in crop)
+    points = landmarks[:, :2] * np.float32(side)
+    points += (ox, oy)
+    return points
+
+
+class LandmarkRecorder:
+    """
+    프레임 레코드를 컬럼별 파일(디렉터리)에 이어 붙이는 기록기.
+    - 레코드당 568바이트 (float64 시각 + int32 트랙 + int32 bbox 4개 + float32 33x4 + int32 크롭 3개)
+    - 트랙별로 interval초보다 촘촘한 레코드는 버림 (샘플링 간격은 meta.json의 record_interval)
+    - record()는 미리 할당한 버퍼에 복사만 하고, buffer_size개가 모이면 한 번에 write
+    - timestamp는 단조 증가 순서로 기록해야 LandmarkReader의 시간 범위 검색이 동작함
+    """
+    def __init__(self, path, buffer_size=256, rois=None, interval=LANDMARK_RECORD_INTERVAL):
+        """
+        :param path: 기록 디렉터리 (없으면 생성, 기존 파일이 있으면 이어서 기록)
+        :param buffer_size: 한 번에 디스크로 내보낼 레코드 수
+        :param rois: 녹화 당시 가구 ROI 목록 (meta.json에 저장, 재생 시 LandmarkReader.rois)
+        :param interval: 같은 트랙의 최소 기록 간격(초). 0이면 모든 프레임 기록
+        """
+        self.path = path
+        self.interval = max(0.0, interval)
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.json")
+        meta = {"version": FORMAT_VERSION, "num_landmarks": NUM_LANDMARKS}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+        meta["record_interval"] = self.interval
+        self._write_meta(meta)
+        if rois is not None:
+            self.set_rois(rois)
+
+        self.buffer_size = max(1, buffer_size)
+        self._buffers = {
+            name: np.zeros((self.buffer_size,) + shape, dtype=dtype)
+            for name, (_, dtype, shape) in COLUMNS.items()
+        }
+        self._files = {
+            name: open(os.path.join(path, fname), "ab")
+            for name, (fname, _, _) in COLUMNS.items()
+        }
+        self._count = 0
+        self._next_ts = {}  # 트랙 ID -> 다음 기록 가능 시각
+        self.total_records = 0
+        self.skipped = 0    # 기록 간격보다 촘촘해 버린 레코드 수
+
+    def _write_meta(self, meta):
+        with open(self._meta_path, "w") as f:
+            json.dump(meta, f)
+
+    def set_rois(self, rois):
+        """
+        녹화 ROI를 meta.json에 기록합니다. (ROI가 바뀔 때만 호출)
+        :param rois: [(x1, y1, x2, y2), ...]
+        """
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        meta["rois"] = [[int(v) for v in roi] for roi in rois]
+        self._write_meta(meta)
+
+    def record(self, timestamp, track_id, bbox, landmarks, crop=None):
+        """
+        레코드 한 개를 버퍼에 복사합니다.
+        :param timestamp: 프레임 시각 (epoch 초)
+        :param track_id: 사람 식별자 (없으면 -1)
+        :param bbox: (x1, y1, x2, y2)
+        :param landmarks: [(x, y, z, v), ...] 또는 (33, 4) 배열 (크롭 기준 정규화 좌표)
+        :param crop: PoseExtractor.extract()의 "crop" (ox, oy, side). 재생 시 프레임 픽셀 좌표 복원용
+        :return: 기록했으면 True, 기록 간격 안이라 버렸으면 False
+        """
+        tid = -1 if track_id is None else track_id
+        due = self._next_ts.get(tid)
+        if due is not None and timestamp < due:
+            self.skipped += 1
+            return False
+        # 다음 기록 시각을 일정 간격으로 잡아 프레임 시각이 흔들려도 평균 간격 유지 (공백 뒤에는 다시 시작)
+        if due is not None and timestamp - due < self.interval:
+            self._next_ts[tid] = due + self.interval
+        else:
+            self._next_ts[tid] = timestamp + self.interval
+
+        i = self._count
+        b = self._buffers
+        b["timestamp"][i] = timestamp
+        b["track_id"][i] = tid
+        b["bbox"][i] = bbox
+        b["landmarks"][i] = landmarks
+        b["crop"][i] = (0, 0, 0) if crop is None else crop
+        self._count += 1
+        self.total_records += 1
+        if self._count == self.buffer_size:
+            self.flush()
+        return True
+
+    def record_result(self, timestamp, track_id, result):
+        """
+        PoseExtractor.extract() 결과 dict를 그대로 기록합니다.
+        frame_landmarks는 landmarks와 crop으로 복원되므로 크롭 변환 3개 값만 저장합니다.
+        """
+        return self.record(timestamp, track_id, result["bbox"], result["landmarks"], result.get("crop"))
+
+    def flush(self):
+        """
+        버퍼에 모인 레코드를 컬럼 파일에 기록합니다.
+        """
+        n = self._count
+        if n == 0:
+            return
+        for name, f in self._files.items():
+            f.write(self._buffers[name][:n].tobytes())
+            f.flush()
+        self._count = 0
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkReader:
+    """
+    LandmarkRecorder 디렉터리를 np.memmap으로 열어 복사 없이 슬라이싱하는 읽기기.
+    - time_range(): 시간 범위 → 연속 구간 view (복사 없음)
+    - select(..., track_id=...): 트랙 필터링 (해당 레코드만 복사)
+    - records(): replay.replay()에 바로 넣을 수 있는 (timestamp, landmarks, bbox, points, track_id) 반복자
+    - rois: 녹화 당시 ROI (replay.replay(reader.records(), rois=reader.rois)).
+      여러 사람 녹화도 replay()가 track_id별로 분석 상태를 나눔
+    """
+    def __init__(self, path):
+        """
+        :param path: LandmarkRecorder로 기록한 디렉터리
+        """
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        # 이전 버전 녹화에 없는 컬럼(crop)은 None
+        columns = {name: spec for name, spec in COLUMNS.items()
+                   if os.path.exists(os.path.join(path, spec[0]))}
+
+        # 기록 중단 등으로 컬럼 길이가 다르면 가장 짧은 컬럼 기준
+        sizes = {}
+        for name, (fname, dtype, shape) in columns.items():
+            rec_bytes = np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+            sizes[name] = os.path.getsize(os.path.join(path, fname)) // rec_bytes
+        self.count = min(sizes.values())
+
+        self._columns = dict.fromkeys(COLUMNS)
+        for name, (fname, dtype, shape) in columns.items():
+            if self.count == 0:
+                self._columns[name] = np.zeros((0,) + shape, dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(os.path.join(path, fname), dtype=dtype,
+                                                mode="r", shape=(self.count,) + shape)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def record_interval(self):
+        """기록 당시 트랙별 최소 기록 간격(초). 기록되지 않은 이전 녹화면 None."""
+        return self.meta.get("record_interval")
+
+    @property
+    def rois(self):
+        """녹화 당시 ROI 목록 [(x1, y1, x2, y2), ...]. 기록되지 않았으면 None."""
+        rois = self.meta.get("rois")
+        return None if rois is None else [tuple(r) for r in rois]
+
+    @property
+    def timestamps(self):
+        return self._columns["timestamp"]
+
+    @property
+    def track_ids(self):
+        return self._columns["track_id"]
+
+    @property
+    def bboxes(self):
+        return self._columns["bbox"]
+
+    @property
+    def landmarks(self):
+        return self._columns["landmarks"]
+
+    @property
+    def crops(self):
+        """(N, 3) 크롭 변환. 이전 버전 녹화면 None."""
+        return self._columns["crop"]
+
+    def _slice(self, index):
+        c = self._columns
+        crop = c["crop"][index] if c["crop"] is not None else None
+        return RecordSlice(c["timestamp"][index], c["track_id"][index],
+                           c["bbox"][index], c["landmarks"][index], crop)
+
+    def time_range(self, start=None, end=None):
+        """
+        [start, end) 시간 범위 레코드를 복사 없이 반환합니다.
+        :return: RecordSlice (각 필드는 memmap view)
+        """
+        ts = self.timestamps
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = self.count if end is None else int(np.searchsorted(ts, end, side="left"))
+        return self._slice(slice(lo, hi))
+
+    def select(self, start=None, end=None, track_id=None):
+        """
+        시간 범위 + 트랙 ID로 레코드를 고릅니다.
+        track_id가 없으면 time_range()와 같이 view를, 있으면 해당 레코드 복사본을 반환합니다.
+        """
+        part = self.time_range(start, end)
+        if track_id is None:
+            return part
+        mask = part.track_id == track_id
+        return RecordSlice(part.timestamp[mask], part.track_id[mask],
+                           part.bbox[mask], part.landmarks[mask],
+                           part.crop[mask] if part.crop is not None else None)
+
+    def track_list(self):
+        """기록된 트랙 ID 목록."""
+        return np.unique(self.track_ids).tolist()
+
+    def records(self, start=None, end=None, track_id=None):
+        """
+        (timestamp, landmarks[33,4], bbox, points, track_id) 반복자. replay.replay()의 입력 형식입니다.
+        points는 크롭 변환으로 복원한 프레임 픽셀 좌표 (33, 2) (크롭 정보가 없으면 None)
+        track_id를 주지 않으면 모든 트랙이 시간순으로 섞여 나오므로 트랙별로 구분해 사용합니다.
+        """
+        part = self.select(start, end, track_id)
+        crops = part.crop if part.crop is not None else [None] * len(part.timestamp)
+        for ts, tid, bbox, lms, crop in zip(part.timestamp, part.track_id, part.bbox,
+                                            part.landmarks, crops):
+            yield float(ts), lms, tuple(int(v) for v in bbox), crop_points(lms, crop), int(tid)
@@ -0,0 +1,176 @@
+# load_controller.py
+# 스테이지 지연을 보고 포즈 모델 복잡도 / YOLO 간격 / 분석 빈도를 단계적으로 조절하는 부하 제어 모듈
+
+import time
+
+from config import (
+    LOAD_TARGET_LATENCY,
+    LOAD_CHECK_INTERVAL,
+    LOAD_RECOVER_RATIO,
+    LOAD_RISK_HOLD,
+    MP_MODEL_COMPLEXITY,
+    DETECT_STRIDE,
+)
+
+# 부하 단계: (포즈 모델 복잡도, YOLO 간격 배수, 분석 간격)
+# 복잡도 None은 기본값(base_complexity) 유지, 분석 간격 N은 N프레임 중 1프레임만 포즈·분석
+LOAD_LEVELS = (
+    (None, 1, 1),   # 0: 최고 품질
+    (0, 1, 1),      # 1: 포즈 경량 모델
+    (0, 2, 1),      # 2: + YOLO 간격 2배
+    (0, 2, 2),      # 3: + 분석 1/2
+    (0, 3, 3),      # 4: + YOLO 간격 3배, 분석 1/3
+)
+
+
+class LoadController:
+    """
+    캡처→분석 종단 지연을 목표(target_latency)와 비교해 부하 단계를 한 칸씩 조정합니다.
+    - check_interval마다 구간 평균 지연이 목표 초과면 한 단계 낮추고(품질↓),
+      목표 * recover_ratio 미만이면 한 단계 복구
+    - 위험 상황(ROI 밖 lying, fall_detected)이 보고되면 즉시 0단계로 복구하고
+      risk_hold초 동안 유지
+    - 적용 대상: pose_extractor.set_model_complexity(), tracker.detect_stride,
+      should_analyze()로 노출되는 분석 간격
+    """
+    def __init__(self,
+                 pose_extractor=None,
+                 tracker=None,
+                 target_latency: float = LOAD_TARGET_LATENCY,
+                 check_interval: float = LOAD_CHECK_INTERVAL,
+                 recover_ratio: float = LOAD_RECOVER_RATIO,
+                 risk_hold: float = LOAD_RISK_HOLD,
+                 base_complexity: int = MP_MODEL_COMPLEXITY,
+                 base_stride: int = DETECT_STRIDE,
+                 levels=LOAD_LEVELS):
+        """
+        :param pose_extractor: set_model_complexity()를 제공하는 PoseExtractor (None이면 조정 안 함)
+        :param tracker: detect_stride 속성을 가진 PersonTracker (None이면 조정 안 함)
+        :param target_latency: 목표 종단 지연(초)
+        :param check_interval: 단계 조정 판단 주기(초)
+        :param recover_ratio: 복구 판단 비율
+        :param risk_hold: 위험 보고 후 최고 품질 유지 시간(초)
+        :param base_complexity: 0단계 포즈 모델 복잡도
+        :param base_stride: 0단계 YOLO 간격(프레임)
+        :param levels: 부하 단계 정의 (LOAD_LEVELS 형식)
+        """
+        self.pose_extractor = pose_extractor
+        self.tracker = tracker
+        self.target_latency = target_latency
+        self.check_interval = check_interval
+        self.recover_ratio = recover_ratio
+        self.risk_hold = risk_hold
+        self.base_complexity = base_complexity
+        self.base_stride = base_stride
+        self.levels = levels
+
+        self.level = 0
+        self.analyze_every = 1
+        self._risk_until = 0.0
+        self._last_check = None
+
+        # 이번 판단 구간의 종단 지연 합계/개수, 스테이지별 지수평균 지연
+        self._lat_sum = 0.0
+        self._lat_count = 0
+        self.last_latency = 0.0
+        self.stage_latency = {}
+        self.level_changes = 0
+
+    # ────────────── 측정 ────────────── #
+
+    def record_stage(self, name, seconds, alpha=0.2):
+        """
+        스테이지 처리 시간(초)을 지수평균으로 기록합니다. (판단에는 쓰지 않는 진단용)
+        """
+        prev = self.stage_latency.get(name)
+        self.stage_latency[name] = seconds if prev is None else prev + alpha * (seconds - prev)
+
+    def record_latency(self, seconds):
+        """
+        프레임 한 장의 캡처→분석 완료 지연(초)을 기록합니다.
+        """
+        self._lat_sum += seconds
+        self._lat_count += 1
+
+    def note_risk(self, now=None):
+        """
+        위험 상황을 보고합니다. 즉시 최고 품질로 복구하고 risk_hold초 동안 유지합니다.
+        """
+        now = time.monotonic() if now is None else now
+        self._risk_until = max(self._risk_until, now + self.risk_hold)
+        if self.level != 0:
+            self._set_level(0)
+
+    def note_events(self, events, now=None):
+        """
+        분석기 이벤트 중 fall_detected가 있으면 위험으로 보고합니다.
+        """
+        if any(ev["type"] == "fall_detected" for ev in events):
+            self.note_risk(now)
+
+    def in_risk(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now < self._risk_until
+
+    # ────────────── 판단 / 적용 ────────────── #
+
+    def should_analyze(self, seq):
+        """
+        프레임 일련번호 seq를 포즈 추출·분석할지 반환합니다.
+        """
+        return self.analyze_every <= 1 or seq % self.analyze_every == 0
+
+    def update(self, now=None):
+        """
+        check_interval이 지났으면 구간 평균 지연으로 단계를 조정합니다.
+        :return: 단계가 바뀌었으면 True
+        """
+        now = time.monotonic() if now is None else now
+        if self._last_check is None:
+            self._last_check = now
+            return False
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        if self._lat_count:
+            self.last_latency = self._lat_sum / self._lat_count
+        self._lat_sum, self._lat_count = 0.0, 0
+
+        if self.in_risk(now):
+            target = 0
+        elif self.last_latency > self.target_latency:
+            target = min(self.level + 1, len(self.levels) - 1)
+        elif self.last_latency < self.target_latency * self.recover_ratio:
+            target = max(self.level - 1, 0)
+        else:
+            target = self.level
+
+        if target == self.level:
+            return False
+        self._set_level(target)
+        return True
+
+    def _set_level(self, level):
+        complexity, stride_mult, analyze_every = self.levels[level]
+        self.level = level
+        self.level_changes += 1
+        self.analyze_every = analyze_every
+        if self.pose_extractor is not None:
+            self.pose_extractor.set_model_complexity(
+                self.base_complexity if complexity is None else complexity)
+        if self.tracker is not None:
+            self.tracker.detect_stride = max(1, self.base_stride * stride_mult)
+        print(f"[LoadController] level {level} (latency {self.last_latency:.3f}s, "
+              f"target {self.target_latency:.3f}s)")
+
+    def stats(self):
+        return {
+            "level": self.level,
+            "level_changes": self.level_changes,
+            "latency": self.last_latency,
+            "target_latency": self.target_latency,
+            "analyze_every": self.analyze_every,
+            "in_risk": self.in_risk(),
+            "stage_latency": dict(self.stage_latency),
+        }
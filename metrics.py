@@ -0,0 +1,248 @@
+# metrics.py
+# 스테이지별 지연 히스토그램(HDR 방식), 카운터, 처리율, 게이지를 모으는 경량 계측 모듈
+
+import threading
+import time
+from collections import Counter, deque
+
+# 히스토그램 정밀도: 값(µs)을 상위 SUB_BITS 비트로 양자화 → 상대 오차 < 1/2^(SUB_BITS-1)
+SUB_BITS = 7
+_SUB_COUNT = 1 << SUB_BITS        # 128
+_SUB_HALF = _SUB_COUNT >> 1       # 64
+
+# 프로세스 전역 모델 로드 시간(초): 모델 이름 -> 마지막 로드 소요 시간
+MODEL_LOAD_TIMES = {}
+
+
+def record_model_load(name, seconds):
+    """
+    모델(YOLO 가중치, MediaPipe Pose 등) 로드 소요 시간을 기록합니다.
+    """
+    MODEL_LOAD_TIMES[name] = seconds
+
+
+def _bucket_index(v):
+    """정수 µs 값의 버킷 번호 (128 미만은 1µs 단위, 이후 2배 구간마다 64칸)."""
+    if v < _SUB_COUNT:
+        return v
+    shift = v.bit_length() - SUB_BITS
+    return shift * _SUB_HALF + (v >> shift)
+
+
+def _bucket_value(idx):
+    """버킷 번호의 대표값(µs, 구간 중앙)."""
+    if idx < _SUB_COUNT:
+        return float(idx)
+    shift = idx // _SUB_HALF - 1
+    mant = idx - shift * _SUB_HALF
+    return (mant << shift) + ((1 << shift) - 1) / 2
+
+
+class LatencyHistogram:
+    """
+    HDR 방식 지연 히스토그램. 기록은 O(1) (정수 연산 + 리스트 증가)이고
+    분위수는 snapshot 시점에 누적 합으로 계산합니다.
+    - 해상도: 1µs ~ max_seconds, 상대 오차 약 1.6%
+    - 한 히스토그램에는 한 스레드만 기록한다고 가정 (읽기는 다른 스레드에서 해도 됨)
+    """
+    def __init__(self, max_seconds: float = 60.0):
+        self.max_us = int(max_seconds * 1e6)
+        self.counts = [0] * (_bucket_index(self.max_us) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def record(self, seconds):
+        """
+        지연(초)을 기록합니다. max_seconds를 넘는 값은 마지막 버킷에 넣습니다.
+        """
+        us = int(seconds * 1e6)
+        if us < 0:
+            us = 0
+        elif us > self.max_us:
+            us = self.max_us
+        self.counts[_bucket_index(us)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)):
+        """
+        분위수(초) 리스트를 반환합니다. 기록이 없으면 0.0
+        """
+        if self.count == 0:
+            return [0.0 for _ in qs]
+        counts = list(self.counts)  # 기록 중인 스레드와 무관하게 한 시점 기준으로 계산
+        n = sum(counts)
+        targets = sorted((q, i) for i, q in enumerate(qs))
+        out = [0.0] * len(qs)
+        cum, t = 0, 0
+        for idx, c in enumerate(counts):
+            if not c:
+                continue
+            cum += c
+            while t < len(targets) and cum >= targets[t][0] * n:
+                out[targets[t][1]] = _bucket_value(idx) / 1e6
+                t += 1
+            if t == len(targets):
+                break
+        return out
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def snapshot(self):
+        p50, p95, p99 = self.quantiles((0.5, 0.95, 0.99))
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min or 0.0,
+            "max": self.max,
+            "p50": p50,
+            "p95": p95,
+            "p99": p99,
+        }
+
+
+class RateMeter:
+    """
+    최근 window초 동안의 발생 빈도(회/초). fps 측정용.
+    """
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        self._times = deque()
+        self.total = 0
+
+    def mark(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._times.append(now)
+        self.total += 1
+        cutoff = now - self.window
+        while self._times[0] < cutoff:
+            self._times.popleft()
+
+    def rate(self, now=None):
+        now = time.monotonic() if now is None else now
+        times = list(self._times)
+        times = [t for t in times if t >= now - self.window]
+        if len(times) < 2:
+            return 0.0
+        span = now - times[0]
+        return (len(times) - 1) / span if span > 0 else 0.0
+
+
+class StageTimer:
+    """
+    with metrics.timer("pose"): ... 형태로 블록 실행 시간을 히스토그램에 기록합니다.
+    """
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, hist):
+        self._hist = hist
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.record(time.perf_counter() - self._start)
+        return False
+
+
+class Metrics:
+    """
+    이름별 지연 히스토그램 / 카운터 / 처리율 / 게이지 레지스트리.
+    - timer(name), observe(name, seconds): 스테이지 지연
+    - inc(name, n): 누적 카운터 (드롭 수 등)
+    - mark(name): 처리율 (fps)
+    - gauge(name, value_or_fn): 현재값. 함수를 주면 snapshot() 때 호출 (큐 길이, 생략 비율 등)
+    - count_event(ev_type): PostureAnalyzerV4.get_events() 이벤트 종류별 횟수
+    - set_process(rss_bytes, model_load): 다른 프로세스(추론 워커)가 보고한 RSS/모델 로드 시간
+    - snapshot(): 위 값 전체를 dict로 반환 (다른 스레드에서 호출 가능)
+    """
+    def __init__(self, labels=None, max_seconds: float = 60.0, rate_window: float = 5.0):
+        """
+        :param labels: 이 레지스트리를 구분하는 라벨 dict (예: {"camera": "0"})
+        :param max_seconds: 히스토그램 최대 기록 지연(초)
+        :param rate_window: 처리율 계산 구간(초)
+        """
+        self.labels = dict(labels or {})
+        self.max_seconds = max_seconds
+        self.rate_window = rate_window
+        self.histograms = {}
+        self.counters = {}
+        self.rates = {}
+        self.gauges = {}
+        self.events = Counter()
+        self.process = {}
+        self._lock = threading.Lock()  # 항목 생성만 보호 (기록 경로는 잠금 없음)
+
+    def histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self.histograms.setdefault(name, LatencyHistogram(self.max_seconds))
+        return hist
+
+    def timer(self, name):
+        return StageTimer(self.histogram(name))
+
+    def observe(self, name, seconds):
+        self.histogram(name).record(seconds)
+
+    def inc(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def mark(self, name, now=None):
+        meter = self.rates.get(name)
+        if meter is None:
+            with self._lock:
+                meter = self.rates.setdefault(name, RateMeter(self.rate_window))
+        meter.mark(now)
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+    def count_event(self, ev_type):
+        self.events[ev_type] += 1
+
+    def set_process(self, rss_bytes=None, model_load=None):
+        """
+        이 레지스트리가 나타내는 프로세스의 상태를 기록합니다.
+        :param rss_bytes: 프로세스 RSS(바이트), 모르면 None
+        :param model_load: {모델 이름: 로드 소요 시간(초)}
+        """
+        self.process = {"rss_bytes": rss_bytes, "model_load": dict(model_load or {})}
+
+    def snapshot(self):
+        """
+        :return: {"labels", "latency": {name: {...}}, "counters", "rates", "gauges", "events",
+                  "process"}
+        """
+        gauges = {}
+        for name, value in list(self.gauges.items()):
+            try:
+                gauges[name] = value() if callable(value) else value
+            except Exception as e:
+                print(f"[Metrics] 게이지 '{name}' 조회 실패: {e}")
+        return {
+            "labels": dict(self.labels),
+            "latency": {name: h.snapshot() for name, h in list(self.histograms.items())},
+            "counters": dict(self.counters),
+            "rates": {name: m.rate() for name, m in list(self.rates.items())},
+            "gauges": gauges,
+            "events": dict(self.events),
+            "process": dict(self.process),
+        }
@@ -0,0 +1,182 @@
+# metrics_server.py
+# Metrics 스냅샷을 Prometheus 텍스트 형식으로 내보내는 표준 라이브러리 HTTP 엔드포인트
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_HOST, METRICS_PORT
+from metrics import MODEL_LOAD_TIMES
+
+PREFIX = "caregiver"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+QUANTILES = (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99"))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(base, **extra):
+    items = dict(base)
+    items.update(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items.items()) + "}"
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() or c == "_" else "_" for c in name)
+
+
+def read_rss_bytes():
+    """
+    /proc/self/statm에서 현재 프로세스 RSS(바이트)를 읽습니다. 지원하지 않는 OS면 None
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def render_prometheus(snapshots, start_time=None):
+    """
+    Metrics.snapshot() 리스트를 Prometheus 텍스트 노출 형식으로 변환합니다.
+    :param snapshots: [Metrics.snapshot(), ...] (카메라별 labels로 구분)
+        모델 로드 시간/RSS는 이 프로세스 값(라벨 없음)과 snapshot의 "process" 값(라벨 포함)을 함께 출력
+    :param start_time: 프로세스 시작 시각(time.time()), 주면 uptime 출력
+    :return: str
+    """
+    # 메트릭 이름별로 HELP/TYPE을 한 번만 쓰도록 모아서 출력
+    families = {}
+
+    def add(name, mtype, help_text, line):
+        fam = families.setdefault(name, (mtype, help_text, []))
+        fam[2].append(line)
+
+    for snap in snapshots:
+        base = snap.get("labels", {})
+        for rate_name, value in snap["rates"].items():
+            add(f"{PREFIX}_fps", "gauge", "Frames per second over the recent window",
+                f"{PREFIX}_fps{_labels(base, stage=rate_name)} {value:.6g}")
+        for stage, h in snap["latency"].items():
+            name = f"{PREFIX}_stage_latency_seconds"
+            for q, key in QUANTILES:
+                add(name, "summary", "Per-stage latency",
+                    f"{name}{_labels(base, stage=stage, quantile=q)} {h[key]:.6g}")
+            add(name, "summary", "Per-stage latency",
+                f"{name}_sum{_labels(base, stage=stage)} {h['mean'] * h['count']:.6g}")
+            add(name, "summary", "Per-stage latency",
+                f"{name}_count{_labels(base, stage=stage)} {h['count']}")
+        for ev_type, count in snap.get("events", {}).items():
+            add(f"{PREFIX}_events_total", "counter", "Analyzer events by type",
+                f"{PREFIX}_events_total{_labels(base, type=ev_type)} {count}")
+        for counter, value in snap["counters"].items():
+            name = f"{PREFIX}_{_metric_name(counter)}_total"
+            add(name, "counter", counter, f"{name}{_labels(base)} {value}")
+        for gauge, value in snap["gauges"].items():
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            name = f"{PREFIX}_{_metric_name(gauge)}"
+            add(name, "gauge", gauge, f"{name}{_labels(base)} {value:.6g}")
+        # 추론 워커처럼 다른 프로세스가 보고한 값은 그 레지스트리 라벨(worker 등)을 붙여 출력
+        proc = snap.get("process") or {}
+        for model, seconds in proc.get("model_load", {}).items():
+            add(f"{PREFIX}_model_load_seconds", "gauge", "Model load time",
+                f"{PREFIX}_model_load_seconds{_labels(base, model=model)} {seconds:.6g}")
+        if proc.get("rss_bytes") is not None:
+            add("process_resident_memory_bytes", "gauge", "Resident memory size in bytes",
+                f"process_resident_memory_bytes{_labels(base)} {proc['rss_bytes']}")
+
+    for model, seconds in list(MODEL_LOAD_TIMES.items()):
+        add(f"{PREFIX}_model_load_seconds", "gauge", "Model load time",
+            f'{PREFIX}_model_load_seconds{_labels({}, model=model)} {seconds:.6g}')
+
+    rss = read_rss_bytes()
+    if rss is not None:
+        add("process_resident_memory_bytes", "gauge", "Resident memory size in bytes",
+            f"process_resident_memory_bytes {rss}")
+    if start_time is not None:
+        add(f"{PREFIX}_uptime_seconds", "gauge", "Seconds since the metrics server started",
+            f"{PREFIX}_uptime_seconds {time.time() - start_time:.3f}")
+
+    out = []
+    for name, (mtype, help_text, lines) in families.items():
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {mtype}")
+        out.extend(lines)
+    return "\n".join(out) + "\n"
+
+
+class MetricsServer:
+    """
+    /metrics 요청에 Prometheus 텍스트를 응답하는 데몬 스레드 HTTP 서버.
+    - 요청 처리는 별도 스레드에서 snapshot()만 읽으므로 프레임 루프를 막지 않음
+    - sources: Metrics 객체 리스트 또는 그 리스트를 반환하는 함수 (카메라 추가/제거 대응)
+    - port=0이면 임의 포트 (start() 후 self.port로 확인)
+    """
+    def __init__(self, sources, host: str = METRICS_HOST, port: int = METRICS_PORT or 0):
+        """
+        :param sources: [Metrics, ...] 또는 () -> [Metrics, ...]
+        :param host: 바인드 주소
+        :param port: 바인드 포트
+        """
+        self.sources = sources
+        self.host = host
+        self.port = port
+        self.start_time = time.time()
+        self._httpd = None
+        self._thread = None
+
+    def _collect(self):
+        sources = self.sources() if callable(self.sources) else self.sources
+        return [m.snapshot() for m in sources]
+
+    def render(self):
+        return render_prometheus(self._collect(), self.start_time)
+
+    def start(self):
+        if self._httpd is not None:
+            return
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                try:
+                    body = server.render().encode("utf-8")
+                except Exception as e:
+                    print(f"[MetricsServer] 메트릭 생성 실패: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, fmt, *args):
+                pass  # 스크레이프마다 stderr 로그를 남기지 않음
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="MetricsServer", daemon=True)
+        self._thread.start()
+        print(f"[MetricsServer] http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._httpd is None:
+            return
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join(timeout=1.0)
+        self._httpd = None
@@ -0,0 +1,111 @@
+# motion_gate.py
+# 축소·블러 프레임 차이로 장면 변화를 감지해, 정지 장면에서는 YOLO 검출을 생략하게 하는 게이트
+
+import cv2
+import numpy as np
+
+from config import (
+    MOTION_GATE_SIZE,
+    MOTION_GATE_PIXEL_DELTA,
+    MOTION_GATE_THRESHOLD,
+    MOTION_GATE_MAX_SKIP,
+)
+from preprocessor import Preprocessor
+
+
+class MotionGate:
+    """
+    마지막 검출 시점 프레임(기준)과 현재 프레임을 축소 그레이 이미지로 비교합니다.
+    - 변화 픽셀 비율이 threshold 미만이면 정지 장면으로 보고 검출 생략 (직전 박스 재사용)
+    - 기준은 검출을 허용할 때만 갱신하므로 느린 움직임도 누적되어 결국 검출을 엽니다
+    - max_skip 프레임 연속 생략하면 변화가 없어도 한 번 검출 (조명 변화·누락 보정)
+    - 포즈 추출/자세 분석은 게이트와 무관하게 매 프레임 실행되어야 함
+      (PostureAnalyzerV4의 danger_motionless 타이머는 게이트가 막지 않음)
+    """
+    def __init__(self,
+                 threshold: float = MOTION_GATE_THRESHOLD,
+                 pixel_delta: int = MOTION_GATE_PIXEL_DELTA,
+                 size=MOTION_GATE_SIZE,
+                 max_skip: int = MOTION_GATE_MAX_SKIP,
+                 blur_kernel=(5, 5)):
+        """
+        :param threshold: 변화 픽셀 비율 임계값 (0~1)
+        :param pixel_delta: 변화로 볼 그레이 밝기 차이
+        :param size: 비교용 축소 크기 (W, H)
+        :param max_skip: 연속 생략 최대 프레임 수
+        :param blur_kernel: 노이즈 억제용 Gaussian Blur 커널
+        """
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.max_skip = max_skip
+        # 전처리 결과는 바로 그레이로 변환하므로 출력 버퍼까지 재사용
+        self.preprocessor = Preprocessor(blur_kernel=blur_kernel, size=size, reuse_output=True)
+
+        # 축소 그레이 버퍼 2개를 번갈아 사용 (하나는 기준 프레임, 하나는 이번 프레임)
+        w, h = size
+        self._grays = [np.empty((h, w), dtype=np.uint8), np.empty((h, w), dtype=np.uint8)]
+        self._diff = np.empty((h, w), dtype=np.uint8)
+        self._reference = None   # 마지막 검출 시점 축소 그레이 프레임 (_grays 중 하나)
+        self.skipped_in_row = 0
+        self.last_change = 1.0   # 직전 check()의 변화 픽셀 비율
+
+        # 통계
+        self.checks = 0
+        self.skips = 0
+
+    def _small_gray(self, frame):
+        rgb = self.preprocessor.preprocess(frame)
+        # 기준 프레임이 아닌 버퍼에 씀
+        dst = self._grays[1] if self._reference is self._grays[0] else self._grays[0]
+        return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY, dst=dst)
+
+    def change_ratio(self, small):
+        """
+        기준 프레임 대비 변화 픽셀 비율. 기준이 없으면 1.0
+        """
+        if self._reference is None:
+            return 1.0
+        diff = cv2.absdiff(small, self._reference, dst=self._diff)
+        # diff > pixel_delta 를 같은 버퍼에 0/255로 기록 후 개수 집계 (bool 배열 할당 없음)
+        cv2.threshold(diff, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=diff)
+        return cv2.countNonZero(diff) / diff.size
+
+    def check(self, frame):
+        """
+        이번 프레임에 검출이 필요한지 판정합니다. True를 반환하면 이 프레임이 새 기준이 됩니다.
+        :param frame: BGR 이미지 (np.ndarray)
+        :return: True(검출 실행) / False(정지 장면, 검출 생략)
+        """
+        small = self._small_gray(frame)
+        self.checks += 1
+        self.last_change = self.change_ratio(small)
+
+        if self.last_change < self.threshold and self.skipped_in_row < self.max_skip:
+            self.skipped_in_row += 1
+            self.skips += 1
+            return False
+
+        self._reference = small
+        self.skipped_in_row = 0
+        return True
+
+    def reset(self):
+        """
+        기준 프레임을 버립니다. 다음 check()는 항상 True입니다.
+        """
+        self._reference = None
+        self.skipped_in_row = 0
+
+    def skip_ratio(self):
+        """
+        검출이 필요했던 프레임 중 게이트가 생략시킨 비율.
+        """
+        return self.skips / self.checks if self.checks else 0.0
+
+    def stats(self):
+        return {
+            "checks": self.checks,
+            "skips": self.skips,
+            "skip_ratio": self.skip_ratio(),
+            "last_change": self.last_change,
+        }
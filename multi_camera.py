@@ -0,0 +1,554 @@
+# multi_camera.py
+# 카메라별 캡처 프로세스 + 추론 워커 프로세스 풀을 공유 메모리 프레임 링으로 연결하는 다중 카메라 실행기
+
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from config import (
+    FRAME_WIDTH, FRAME_HEIGHT, MULTI_CAM_WORKERS, FRAME_RING_SLOTS, MOTION_GATE_ENABLED,
+    METRICS_PORT, EVENT_STORE_ENABLED, BATCH_MAX_SIZE, BATCH_MAX_WAIT, WORKER_STATS_INTERVAL,
+)
+from alert_dispatcher import AlertDispatcher
+from event_logger import get_event_logger
+from event_store import EventStore
+from metrics import MODEL_LOAD_TIMES, Metrics
+from metrics_server import MetricsServer, read_rss_bytes
+from posture_wrapper import PostureClassifierWrapper
+from track_state import TrackStateManager
+from utils import bbox_in_rois
+
+
+class SharedFrameRing:
+    """
+    공유 메모리에 고정 크기 프레임 슬롯을 두는 링 버퍼 (프로세스 간 pickling 없이 프레임 전달).
+    - 헤더: 슬롯별 seq(int64), 캡처 시각(float64)
+    - 쓰기: seq를 -1로 표시 → 픽셀 복사 → seq 기록
+    - 읽기: 복사 전후 seq가 같을 때만 유효 (그 사이 덮어써졌으면 None)
+    """
+    def __init__(self, shape, slots=FRAME_RING_SLOTS, name=None, create=True):
+        """
+        :param shape: 프레임 shape (H, W, 3)
+        :param slots: 슬롯 수
+        :param name: 기존 링에 붙을 때의 공유 메모리 이름
+        :param create: True면 새로 생성, False면 name에 연결
+        """
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        header_bytes = slots * 16
+        size = header_bytes + slots * frame_bytes
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self.owner = create
+
+        buf = self.shm.buf
+        self.seqs = np.ndarray((slots,), dtype=np.int64, buffer=buf, offset=0)
+        self.stamps = np.ndarray((slots,), dtype=np.float64, buffer=buf, offset=slots * 8)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buf,
+                                 offset=header_bytes)
+        if create:
+            self.seqs[:] = -1
+        self._next_seq = 0
+
+    def spec(self):
+        """다른 프로세스에서 attach()할 때 넘길 정보."""
+        return {"name": self.name, "shape": self.shape, "slots": self.slots}
+
+    @classmethod
+    def attach(cls, spec):
+        return cls(spec["shape"], spec["slots"], name=spec["name"], create=False)
+
+    def write(self, frame, ts):
+        """
+        프레임을 다음 슬롯에 복사합니다. (캡처 프로세스 전용)
+        :return: (slot, seq)
+        """
+        seq = self._next_seq
+        self._next_seq += 1
+        slot = seq % self.slots
+        self.seqs[slot] = -1
+        if frame.shape != self.shape:
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=self.frames[slot])
+        else:
+            self.frames[slot] = frame
+        self.stamps[slot] = ts
+        self.seqs[slot] = seq
+        return slot, seq
+
+    def read(self, slot, seq, out=None):
+        """
+        슬롯의 프레임을 복사해 반환합니다. 그 사이 덮어써졌으면 None.
+        :param out: 재사용할 출력 배열 (shape 동일)
+        :return: (frame, ts) 또는 None
+        """
+        if self.seqs[slot] != seq:
+            return None
+        if out is None:
+            out = np.empty(self.shape, dtype=np.uint8)
+        out[...] = self.frames[slot]
+        ts = float(self.stamps[slot])
+        if self.seqs[slot] != seq:
+            return None
+        return out, ts
+
+    def close(self):
+        # numpy view가 버퍼를 잡고 있으면 close가 실패하므로 먼저 해제
+        self.seqs = self.stamps = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# ────────────── 프로세스 진입점 (spawn 대응을 위해 모듈 최상위 함수) ────────────── #
+
+def _capture_process(cam_id, source, ring_spec, task_q, stop, counters):
+    """
+    카메라 하나를 읽어 공유 링에 쓰고, 담당 워커 큐에 (cam_id, slot, seq)만 전달합니다.
+    워커 큐가 가득 차면 그 프레임은 버리고 dropped 카운터를 올립니다.
+    """
+    from input_handler import InputHandler
+
+    ring = SharedFrameRing.attach(ring_spec)
+    # ring.write()가 바로 공유 메모리로 복사하므로 캡처 버퍼 하나를 계속 재사용
+    handler = InputHandler(source, pool_size=1)
+    captured, dropped = counters
+    try:
+        while not stop.is_set():
+            frame = handler.get_frame()
+            if frame is None:
+                if handler.is_file or not handler.is_opened():
+                    break
+                continue
+            slot, seq = ring.write(frame, handler.frame_ts)
+            with captured.get_lock():
+                captured.value += 1
+            try:
+                task_q.put_nowait((cam_id, slot, seq))
+            except queue.Full:
+                with dropped.get_lock():
+                    dropped.value += 1
+    finally:
+        handler.release()
+        ring.close()
+
+
+def _inference_process(worker_id, ring_specs, task_q, result_q, stop,
+                       max_batch=BATCH_MAX_SIZE, max_wait=BATCH_MAX_WAIT):
+    """
+    배정된 카메라들의 프레임을 공유 링에서 읽어 검출·추적·포즈 추출 후 결과만 보냅니다.
+    카메라별 PersonTracker / ROIManager를 유지하고, Pose 인스턴스는 (카메라, 트랙) 키로 분리합니다.
+    첫 작업 후 최대 max_wait초 동안 배정된 카메라들의 프레임을 모으고, YOLO가 필요한 프레임은
+    max_batch장씩 DetectionService.detect_batch()로 한 번에 추론합니다.
+    배치마다 (크기, 추론 시간, 첫 작업 도착 후 대기 시간)을 결과 info["batches"]로 보냅니다.
+    모델 로드 시간과 워커 RSS는 첫 결과와 이후 WORKER_STATS_INTERVAL초마다 info["process"]로 보냅니다.
+    YOLO/MediaPipe 모듈은 워커 프로세스에서만 import해 캡처/감독 프로세스에 모델을 올리지 않습니다.
+    """
+    from motion_gate import MotionGate
+    from person_detector import PersonDetector
+    from person_tracker import PersonTracker
+    from pose_extractor import PoseExtractor
+    from roi_manager import ROIManager
+
+    rings = {cam_id: SharedFrameRing.attach(spec) for cam_id, spec in ring_specs.items()}
+    buffers = {cam_id: np.empty(r.shape, dtype=np.uint8) for cam_id, r in rings.items()}
+    detector = PersonDetector()
+    trackers = {cam_id: PersonTracker(detector,
+                                      motion_gate=MotionGate() if MOTION_GATE_ENABLED else None)
+                for cam_id in rings}
+    roi_managers = {cam_id: ROIManager() for cam_id in rings}
+    # 결과는 랜드마크 배열만 감독 프로세스로 보내므로 시각화용 protobuf는 남기지 않음
+    pose_extractor = PoseExtractor(pool_size=max(4, 2 * len(rings)), keep_pose_landmarks=False)
+    stale = {cam_id: 0 for cam_id in rings}  # 처리 전에 더 새 프레임에 밀리거나 덮어써진 프레임 수
+    next_report = 0.0
+
+    try:
+        while not stop.is_set():
+            try:
+                task = task_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            first = time.monotonic()
+            deadline = first + max_wait
+            # 배정된 카메라가 모두 도착하거나 max_wait가 지날 때까지 모음
+            # 밀린 작업은 카메라별 최신 프레임만 남김
+            latest = {task[0]: task}
+            while True:
+                remaining = deadline - time.monotonic()
+                try:
+                    if len(latest) < len(rings) and remaining > 0:
+                        t = task_q.get(timeout=remaining)
+                    else:
+                        t = task_q.get_nowait()
+                except queue.Empty:
+                    break
+                if t[0] in latest:
+                    stale[t[0]] += 1
+                latest[t[0]] = t
+
+            frames = {}
+            for cam_id, slot, seq in latest.values():
+                got = rings[cam_id].read(slot, seq, out=buffers[cam_id])
+                if got is None:
+                    stale[cam_id] += 1
+                    continue
+                frames[cam_id] = (seq,) + got
+
+            # 카메라별 버퍼를 재사용하므로 검출 캐시는 (카메라, seq) key로 구분
+            # 이번에 YOLO가 필요한 카메라 프레임은 한 번의 배치 추론으로 처리 (tracker.update에서 캐시 사용)
+            # 정지 장면 카메라는 움직임 게이트가 제외
+            need = [c for c in frames if trackers[c].needs_detection(frames[c][1])]
+            batches, batch_share = [], {}
+            for i in range(0, len(need), max_batch):
+                chunk = need[i:i + max_batch]
+                wait = time.monotonic() - first
+                start = time.perf_counter()
+                detector.service.detect_batch([frames[c][1] for c in chunk],
+                                              keys=[(c, frames[c][0]) for c in chunk],
+                                              append=i > 0)
+                infer = time.perf_counter() - start
+                batches.append((len(chunk), infer, wait))
+                for c in chunk:
+                    batch_share[c] = infer / len(chunk)
+
+            tracked, timings = {}, {}
+            for cam_id, (seq, frame, ts) in frames.items():
+                start = time.perf_counter()
+                tracker = trackers[cam_id]
+                tracked[cam_id] = tracker.update(frame, frame_key=(cam_id, seq))
+                for tid in tracker.removed_ids:
+                    pose_extractor.release_track((cam_id, tid))
+                # 배치 추론 시간은 배치에 포함된 카메라 수로 나눠 각 카메라 검출 시간에 더함
+                timings[cam_id] = {"detect": time.perf_counter() - start
+                                   + batch_share.get(cam_id, 0.0)}
+
+            for cam_id, (seq, frame, ts) in frames.items():
+                # ROI 갱신은 배치 캐시를 다 쓴 뒤에 (주기 도래 시에만 추가 추론, 정지 장면이면 생략)
+                tracker = trackers[cam_id]
+                if not tracker.scene_static:
+                    roi_managers[cam_id].auto_update(frame, key=(cam_id, seq))
+                tracks = tracked[cam_id]
+
+                start = time.perf_counter()
+                persons = []
+                for t in tracks:
+                    res = pose_extractor.extract(frame, t.bbox, track_id=(cam_id, t.track_id))
+                    if not res:
+                        continue
+                    tracker.observe_landmarks(t.track_id, res["frame_landmarks"])
+                    persons.append((t.track_id, t.bbox, res["landmarks"], res["frame_landmarks"]))
+
+                timings[cam_id]["pose"] = time.perf_counter() - start
+
+                gate = tracker.motion_gate
+                info = {
+                    "worker": worker_id,
+                    "stale": stale[cam_id],
+                    "skip_ratio": gate.skip_ratio() if gate is not None else 0.0,
+                    "timings": timings[cam_id],
+                    "batches": batches,  # 이번 주기 배치 통계는 첫 결과에만 실음
+                }
+                batches = []
+                now = time.monotonic()
+                if now >= next_report:
+                    info["process"] = {"rss_bytes": read_rss_bytes(),
+                                       "model_load": dict(MODEL_LOAD_TIMES)}
+                    next_report = now + WORKER_STATS_INTERVAL
+                result_q.put((cam_id, seq, ts, persons, list(roi_managers[cam_id].rois), info))
+                stale[cam_id] = 0
+    finally:
+        pose_extractor.close()
+        for r in rings.values():
+            r.close()
+
+
+# ────────────── 감독(supervisor) ────────────── #
+
+class _ROIView:
+    """워커가 보내온 ROI 목록으로 is_bbox_in_roi()를 제공하는 카메라별 ROI 대리 객체."""
+    def __init__(self):
+        self.rois = []
+
+    def is_bbox_in_roi(self, bbox):
+        return bbox_in_rois(bbox, self.rois)
+
+
+class CameraState:
+    """
+    감독 프로세스가 카메라별로 유지하는 분류기, 트랙별 분석 상태와 통계.
+    """
+    def __init__(self, cam_id, source):
+        self.cam_id = cam_id
+        self.source = source
+        self.roi = _ROIView()
+        self.classifier = PostureClassifierWrapper()
+        self.track_states = TrackStateManager(roi_manager=self.roi)
+        self.frames_processed = 0
+        self.frames_stale = 0
+        self.last_latency = 0.0
+        self.skip_ratio = 0.0   # 워커 움직임 게이트의 검출 생략 비율
+        # 워커 스테이지(detect/pose) 및 감독 스테이지(classify/analyze) 지연, 처리율
+        self.metrics = Metrics(labels={"camera": str(cam_id)})
+        self.metrics.gauge("frames_stale", lambda: self.frames_stale)
+        self.metrics.gauge("detect_skip_ratio", lambda: self.skip_ratio)
+
+
+class MultiCameraSupervisor:
+    """
+    여러 카메라를 한 장비에서 감시하는 실행기.
+    - 카메라마다 캡처 프로세스 1개 (InputHandler)
+    - 프레임은 카메라별 SharedFrameRing으로 전달, 큐에는 (카메라, 슬롯, seq)만 보냄
+    - 추론 워커 프로세스 num_workers개. 카메라는 cam_index % num_workers 워커에 고정 배정되어
+      트래커/Pose 추적 상태가 유지됨. 같은 워커에 배정된 카메라 프레임은 한 번의 배치 추론으로 처리
+    - 분류기·분석기·이벤트는 감독 프로세스에서 카메라별로 유지
+    """
+    def __init__(self,
+                 sources,
+                 num_workers: int = None,
+                 ring_slots: int = FRAME_RING_SLOTS,
+                 batch_max_size: int = BATCH_MAX_SIZE,
+                 batch_max_wait: float = BATCH_MAX_WAIT,
+                 frame_size=(FRAME_WIDTH, FRAME_HEIGHT),
+                 on_event=None,
+                 on_result=None,
+                 event_logger=None,
+                 event_store=None):
+        """
+        :param sources: InputHandler 소스 리스트 또는 {camera_id: source}
+        :param num_workers: 추론 워커 프로세스 수 (카메라 수보다 많으면 카메라 수로 제한).
+            None이면 MULTI_CAM_WORKERS (그것도 None이면 CPU 코어 수)
+        :param ring_slots: 카메라별 프레임 링 슬롯 수
+        :param batch_max_size: 워커 한 번의 YOLO 배치 추론 최대 프레임 수
+        :param batch_max_wait: 배치를 채우기 위해 첫 프레임 후 기다리는 최대 시간(초)
+        :param frame_size: 공유 링 프레임 크기 (W, H). 다르면 캡처 프로세스에서 리사이즈
+        :param on_event: (camera_id, event dict) 콜백
+        :param on_result: (camera_id, ts, [(track_id, bbox, label), ...], {track_id: state}) 콜백
+        :param event_logger: 자세/이벤트 CSV 로거 (None이면 프로세스 공용 EventLogger)
+        :param event_store: 이벤트 SQLite 저장소. None이면 EVENT_STORE_ENABLED일 때 생성 (close()에서 닫음)
+        """
+        if not isinstance(sources, dict):
+            sources = {f"cam{i}": src for i, src in enumerate(sources)}
+        self.sources = sources
+        self.batch_max_size = max(1, batch_max_size)
+        self.batch_max_wait = batch_max_wait
+        if num_workers is None:
+            num_workers = MULTI_CAM_WORKERS or os.cpu_count() or 1
+        self.num_workers = max(1, min(num_workers, len(sources)))
+        self.on_event = on_event
+        self.on_result = on_result
+        self.event_logger = event_logger if event_logger is not None else get_event_logger()
+        self._owns_store = event_store is None and EVENT_STORE_ENABLED
+        if self._owns_store:
+            event_store = EventStore()
+            event_store.start()
+        self.event_store = event_store
+
+        self._ctx = mp.get_context("spawn")
+        self._stop = self._ctx.Event()
+        self._result_q = self._ctx.Queue()
+        self._task_qs = [self._ctx.Queue(maxsize=2 * len(sources)) for _ in range(self.num_workers)]
+
+        shape = (frame_size[1], frame_size[0], 3)
+        self.rings = {cam_id: SharedFrameRing(shape, ring_slots) for cam_id in sources}
+        self.cameras = {cam_id: CameraState(cam_id, src) for cam_id, src in sources.items()}
+        self._counters = {cam_id: (self._ctx.Value("q", 0), self._ctx.Value("q", 0))
+                          for cam_id in sources}
+        for cam_id, (captured, dropped) in self._counters.items():
+            metrics = self.cameras[cam_id].metrics
+            metrics.gauge("frames_captured", lambda v=captured: v.value)
+            metrics.gauge("frames_dropped", lambda v=dropped: v.value)
+        # 워커별 배치 추론 통계: 배치 크기/추론 시간/대기 시간과 처리율(프레임/초),
+        # 워커가 보고한 RSS/모델 로드 시간 (YOLO/MediaPipe는 워커 프로세스에서 로드됨)
+        self.batch_metrics = {w: Metrics(labels={"worker": str(w)}) for w in range(self.num_workers)}
+        self._batch_totals = {w: [0, 0.0] for w in range(self.num_workers)}  # [프레임 수, 추론 시간]
+        for w, metrics in self.batch_metrics.items():
+            metrics.gauge("batch_throughput",
+                          lambda t=self._batch_totals[w]: t[0] / t[1] if t[1] > 0 else 0.0)
+        self._procs = []
+        self._collector = None
+        self._closed = False
+
+    def _worker_of(self, index):
+        return index % self.num_workers
+
+    def start(self):
+        """
+        워커/캡처 프로세스와 결과 수집 스레드를 시작합니다.
+        """
+        cam_ids = list(self.sources)
+        for w in range(self.num_workers):
+            specs = {cam_id: self.rings[cam_id].spec()
+                     for i, cam_id in enumerate(cam_ids) if self._worker_of(i) == w}
+            p = self._ctx.Process(target=_inference_process, name=f"infer-{w}",
+                                  args=(w, specs, self._task_qs[w], self._result_q, self._stop,
+                                        self.batch_max_size, self.batch_max_wait),
+                                  daemon=True)
+            p.start()
+            self._procs.append(p)
+
+        for i, cam_id in enumerate(cam_ids):
+            p = self._ctx.Process(target=_capture_process, name=f"capture-{cam_id}",
+                                  args=(cam_id, self.sources[cam_id], self.rings[cam_id].spec(),
+                                        self._task_qs[self._worker_of(i)], self._stop,
+                                        self._counters[cam_id]),
+                                  daemon=True)
+            p.start()
+            self._procs.append(p)
+
+        self._collector = threading.Thread(target=self._collect_loop,
+                                           name="MultiCamera-collector", daemon=True)
+        self._collector.start()
+
+    def _collect_loop(self):
+        """워커 결과를 카메라별 분류기/분석기에 넣고 이벤트를 전달합니다."""
+        while not self._stop.is_set():
+            try:
+                cam_id, seq, ts, persons, rois, info = self._result_q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            cam = self.cameras[cam_id]
+            cam.roi.rois = rois
+            cam.frames_stale += info["stale"]
+            cam.skip_ratio = info["skip_ratio"]
+            for stage, sec in info["timings"].items():
+                cam.metrics.observe(stage, sec)
+            if info["batches"]:
+                self._record_batches(info["worker"], info["batches"])
+            if "process" in info:
+                self.batch_metrics[info["worker"]].set_process(**info["process"])
+
+            # 사람마다 자기 트랙의 스무딩 창/분석기로 분류·분석
+            labeled, events = [], []
+            for tid, bbox, landmarks, points in persons:
+                with cam.metrics.timer("classify"):
+                    label = cam.track_states.classify(tid, landmarks, cam.classifier)
+                with cam.metrics.timer("analyze"):
+                    events.extend(cam.track_states.analyze(tid, label, landmarks, bbox,
+                                                           points=points))
+                self.event_logger.posture(label, camera=cam_id, track_id=tid)
+                if self.event_store:
+                    self.event_store.posture(label, cam_id, tid)
+                labeled.append((tid, bbox, label))
+            cam.track_states.expire()
+            cam.frames_processed += 1
+            cam.last_latency = time.monotonic() - ts
+            cam.metrics.observe("end_to_end", cam.last_latency)
+            cam.metrics.mark("processed")
+
+            for ev in events:
+                ev["camera"] = cam_id
+                cam.metrics.count_event(ev["type"])
+                self.event_logger.event(ev)
+                if self.event_store:
+                    self.event_store.event(ev)
+                if self.on_event:
+                    self.on_event(cam_id, ev)
+            if self.on_result:
+                self.on_result(cam_id, ts, labeled, cam.track_states.get_states())
+
+    def _record_batches(self, worker, batches):
+        metrics, totals = self.batch_metrics[worker], self._batch_totals[worker]
+        for size, infer, wait in batches:
+            metrics.inc("batches")
+            metrics.inc("batch_frames", size)
+            metrics.observe("batch_infer", infer)
+            metrics.observe("batch_wait", wait)
+            totals[0] += size
+            totals[1] += infer
+
+    def run(self, duration=None):
+        """
+        start() 후 duration초 동안(또는 모든 캡처 프로세스가 끝날 때까지) 실행하고 정리합니다.
+        """
+        self.start()
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            while not self._stop.is_set():
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                captures = [p for p in self._procs if p.name.startswith("capture-")]
+                if not any(p.is_alive() for p in captures):
+                    # 남은 결과를 처리할 시간을 잠깐 준 뒤 종료
+                    time.sleep(0.5)
+                    break
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        """
+        모든 프로세스를 멈추고 공유 메모리를 해제합니다.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        for p in self._procs:
+            p.join(timeout=3.0)
+            if p.is_alive():
+                p.terminate()
+        if self._collector is not None:
+            self._collector.join(timeout=1.0)
+        for ring in self.rings.values():
+            ring.close()
+        if self._owns_store:
+            self.event_store.close()
+
+    def stats(self):
+        """
+        카메라별 통계 스냅샷. "batches"에는 워커별 배치 추론 통계와 RSS/모델 로드 시간이 들어갑니다.
+        """
+        out = {}
+        for cam_id, cam in self.cameras.items():
+            captured, dropped = self._counters[cam_id]
+            out[cam_id] = {
+                "frames_captured": captured.value,
+                "frames_dropped": dropped.value,
+                "frames_stale": cam.frames_stale,
+                "frames_processed": cam.frames_processed,
+                "latency": cam.last_latency,
+                "detect_skip_ratio": cam.skip_ratio,
+                "tracks": cam.track_states.stats(),
+                "metrics": cam.metrics.snapshot(),
+            }
+        out["batches"] = {w: m.snapshot() for w, m in self.batch_metrics.items()}
+        return out
+
+
+def main():
+    import sys
+
+    sources = [int(s) if s.isdigit() else s for s in sys.argv[1:]] or [0]
+    dispatcher = AlertDispatcher()
+    dispatcher.start()
+    # 이벤트에는 이미 "camera"가 들어 있으므로 그대로 알림 큐에 넣음
+    supervisor = MultiCameraSupervisor(sources, on_event=lambda cam_id, ev: dispatcher.submit(ev))
+    server = None
+    if METRICS_PORT is not None:
+        server = MetricsServer(lambda: [cam.metrics for cam in supervisor.cameras.values()]
+                               + list(supervisor.batch_metrics.values()),
+                               port=METRICS_PORT)
+        server.start()
+    try:
+        supervisor.run()
+    finally:
+        if server is not None:
+            server.stop()
+        dispatcher.stop()
+    print(supervisor.stats())
+    print(dispatcher.stats())
+
+
+if __name__ == "__main__":
+    main()
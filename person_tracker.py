@@ -0,0 +1,256 @@
+# person_tracker.py
+# PersonDetector 박스에 고정 ID를 부여하고, YOLO는 N프레임마다만 실행하는 경량 추적 모듈
+
+import itertools
+
+from config import (
+    DETECT_STRIDE,
+    TRACK_IOU_THRESHOLD,
+    TRACK_MAX_MISSES,
+    TRACK_MIN_CONFIDENCE,
+    TRACK_MOTION_DECAY,
+    TRACK_LANDMARK_DECAY,
+)
+from pose_extractor import points_to_bbox
+
+
+def iou(a, b):
+    """
+    두 박스 (x1, y1, x2, y2)의 IoU를 계산합니다.
+    """
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    iw, ih = ix2 - ix1, iy2 - iy1
+    if iw <= 0 or ih <= 0:
+        return 0.0
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class Track:
+    """
+    추적 중인 사람 한 명의 상태.
+    - track_id: 고정 ID (하위 모듈이 Pose 인스턴스/분석기 키로 사용)
+    - bbox: 현재 프레임 기준 박스 (x1, y1, x2, y2)
+    - velocity: 박스 중심의 프레임당 이동량 (vx, vy)
+    - confidence: 1.0(검출 직후)에서 전파할수록 감소
+    - source: 현재 박스 출처 ('detector' | 'landmarks' | 'motion')
+    """
+    def __init__(self, track_id, bbox, frame_index):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.velocity = (0.0, 0.0)
+        self.confidence = 1.0
+        self.source = "detector"
+        self.hits = 1
+        self.misses = 0
+        self.first_frame = frame_index
+        self.last_detected = frame_index
+        # observe_landmarks()로 받은 다음 프레임용 박스
+        self._landmark_bbox = None
+        # 마지막 검출 박스 중심 (속도 추정용)
+        self._detected_center = self.center()
+
+    def center(self):
+        x1, y1, x2, y2 = self.bbox
+        return (x1 + x2) / 2, (y1 + y2) / 2
+
+    def __repr__(self):
+        return (f"Track(id={self.track_id}, bbox={self.bbox}, "
+                f"conf={self.confidence:.2f}, source={self.source})")
+
+
+class PersonTracker:
+    """
+    IoU 매칭 기반 경량 사람 추적기.
+    - detect_stride 프레임마다, 또는 트랙 신뢰도가 min_confidence 미만이면 YOLO 실행
+    - 그 사이 프레임은 직전 프레임 MediaPipe 랜드마크 박스 또는 등속 예측으로 박스 전파
+    - motion_gate가 있으면 검출 차례에 장면이 정지해 있을 때 YOLO를 생략하고 박스를 그대로 유지
+    """
+    def __init__(self,
+                 detector,
+                 detect_stride: int = DETECT_STRIDE,
+                 iou_threshold: float = TRACK_IOU_THRESHOLD,
+                 max_misses: int = TRACK_MAX_MISSES,
+                 min_confidence: float = TRACK_MIN_CONFIDENCE,
+                 motion_gate=None):
+        """
+        :param detector: detect(frame) -> [(x1, y1, x2, y2), ...] 를 제공하는 검출기 (결과를 못 얻으면 None)
+        :param detect_stride: YOLO 실행 간격(프레임, 1이면 매 프레임)
+        :param iou_threshold: 검출-트랙 매칭 최소 IoU
+        :param max_misses: 연속 미매칭 검출 횟수 초과 시 트랙 삭제
+        :param min_confidence: 이 값 미만 트랙이 있으면 stride와 관계없이 YOLO 실행
+        :param motion_gate: MotionGate (None이면 게이트 없이 항상 검출)
+        """
+        self.detector = detector
+        self.detect_stride = max(1, detect_stride)
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_confidence = min_confidence
+        self.motion_gate = motion_gate
+
+        self.tracks = {}          # track_id -> Track
+        self.removed_ids = []     # 직전 update()에서 삭제된 트랙 ID
+        self.frame_index = 0
+        self.detected = False     # 직전 update()에서 YOLO를 실행했는지
+        self.scene_static = False # 직전 update()에서 게이트가 정지 장면으로 판정했는지
+        self._gate_result = None  # needs_detection(frame)에서 미리 판정한 (frame, 검출 여부)
+        self._last_detect = None  # 마지막 YOLO 실행 프레임 번호
+        self._ids = itertools.count(1)
+
+    def get_track(self, track_id):
+        return self.tracks.get(track_id)
+
+    def observe_landmarks(self, track_id, points):
+        """
+        이번 프레임에서 추출한 랜드마크로 다음 프레임 박스를 예약합니다.
+        :param track_id: 트랙 ID
+        :param points: PoseExtractor.extract()의 frame_landmarks (프레임 픽셀 좌표)
+        """
+        track = self.tracks.get(track_id)
+        if track is None or points is None or len(points) == 0:
+            return
+        track._landmark_bbox = points_to_bbox(points)
+
+    def needs_detection(self, frame=None):
+        """
+        다음 update()에서 YOLO를 실행할 예정인지 반환합니다. (배치 검출 사전 실행용)
+        :param frame: 다음 update()에 넘길 프레임. 주면 motion_gate 판정까지 반영
+                      (판정 결과는 같은 frame 객체의 update()에서 재사용)
+        """
+        due = self._needs_detection(self.frame_index + 1)
+        if not due or frame is None or self.motion_gate is None:
+            return due
+        run = self.motion_gate.check(frame)
+        self._gate_result = (frame, run)
+        return run
+
+    def _needs_detection(self, frame_index=None):
+        if frame_index is None:
+            frame_index = self.frame_index
+        if self._last_detect is None:
+            return True
+        if frame_index - self._last_detect >= self.detect_stride:
+            return True
+        return any(t.confidence < self.min_confidence for t in self.tracks.values())
+
+    def update(self, frame, force_detect: bool = False, allow_detect: bool = True, frame_key=None):
+        """
+        프레임 한 장을 처리하고 활성 트랙 리스트를 반환합니다.
+        :param frame: BGR 이미지 (numpy.ndarray)
+        :param force_detect: True면 stride와 관계없이 YOLO 실행
+        :param allow_detect: False면 이번 프레임은 YOLO 없이 전파만 (처리 지연 시 부하 경감용)
+        :param frame_key: 검출 캐시 key. 프레임 버퍼를 재사용하는 호출자는 읽기마다 다른 값을 넘김
+        :return: [Track, ...]
+        """
+        self.frame_index += 1
+        self.removed_ids = []
+        h, w = frame.shape[:2]
+
+        due = force_detect or (allow_detect and self._needs_detection())
+        # 정지 장면이면 검출 생략. 검출 차례가 계속 유지되므로 매 프레임 게이트로 재확인
+        self.scene_static = (due and not force_detect and self.motion_gate is not None
+                             and not self._gate_check(frame))
+        self._gate_result = None
+        self.detected = due and not self.scene_static
+        if self.detected:
+            if frame_key is None:
+                boxes = self.detector.detect(frame)
+            else:
+                boxes = self.detector.detect(frame, frame_key)
+            if boxes is None:
+                # 검출 결과를 얻지 못함 (빈 리스트와 구분): 미검출로 세지 않고 전파만
+                self.detected = False
+                self._propagate()
+            else:
+                self._associate(boxes)
+                self._last_detect = self.frame_index
+        elif not self.scene_static:
+            self._propagate()
+        # 정지 장면: 직전 박스/신뢰도를 그대로 재사용
+
+        for t in self.tracks.values():
+            t.bbox = self._clip(t.bbox, w, h)
+            t._landmark_bbox = None
+        return list(self.tracks.values())
+
+    # ────────────── 내부 헬퍼 ────────────── #
+
+    def _gate_check(self, frame):
+        if self._gate_result is not None and self._gate_result[0] is frame:
+            return self._gate_result[1]
+        return self.motion_gate.check(frame)
+
+    @staticmethod
+    def _clip(bbox, w, h):
+        x1, y1, x2, y2 = bbox
+        x1 = min(max(0, int(x1)), w - 1)
+        y1 = min(max(0, int(y1)), h - 1)
+        x2 = min(max(x1 + 1, int(x2)), w)
+        y2 = min(max(y1 + 1, int(y2)), h)
+        return (x1, y1, x2, y2)
+
+    def _propagate(self):
+        """검출 없는 프레임: 랜드마크 박스 우선, 없으면 등속 예측으로 이동."""
+        for t in self.tracks.values():
+            if t._landmark_bbox is not None:
+                new_box = t._landmark_bbox
+                t.confidence *= TRACK_LANDMARK_DECAY
+                t.source = "landmarks"
+            else:
+                vx, vy = t.velocity
+                x1, y1, x2, y2 = t.bbox
+                new_box = (x1 + vx, y1 + vy, x2 + vx, y2 + vy)
+                t.confidence *= TRACK_MOTION_DECAY
+                t.source = "motion"
+
+            t.bbox = new_box
+
+    def _associate(self, boxes):
+        """검출 프레임: IoU 내림차순 greedy 매칭 후 트랙 생성/삭제."""
+        pairs = []
+        for tid, t in self.tracks.items():
+            for di, box in enumerate(boxes):
+                score = iou(t.bbox, box)
+                if score >= self.iou_threshold:
+                    pairs.append((score, tid, di))
+        pairs.sort(reverse=True)
+
+        matched_tracks, matched_dets = set(), set()
+        for _, tid, di in pairs:
+            if tid in matched_tracks or di in matched_dets:
+                continue
+            matched_tracks.add(tid)
+            matched_dets.add(di)
+
+            t = self.tracks[tid]
+            t.bbox = boxes[di]
+            # 직전 검출 박스 대비 프레임당 이동량으로 속도 갱신
+            cx0, cy0 = t._detected_center
+            cx1, cy1 = t.center()
+            elapsed = max(1, self.frame_index - t.last_detected)
+            t.velocity = (0.5 * t.velocity[0] + 0.5 * (cx1 - cx0) / elapsed,
+                          0.5 * t.velocity[1] + 0.5 * (cy1 - cy0) / elapsed)
+            t._detected_center = (cx1, cy1)
+            t.confidence = 1.0
+            t.source = "detector"
+            t.hits += 1
+            t.misses = 0
+            t.last_detected = self.frame_index
+
+        for tid in list(self.tracks):
+            if tid in matched_tracks:
+                continue
+            t = self.tracks[tid]
+            t.misses += 1
+            t.confidence *= TRACK_MOTION_DECAY
+            if t.misses > self.max_misses:
+                del self.tracks[tid]
+                self.removed_ids.append(tid)
+
+        for di, box in enumerate(boxes):
+            if di in matched_dets:
+                continue
+            tid = next(self._ids)
+            self.tracks[tid] = Track(tid, box, self.frame_index)
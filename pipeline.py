@@ -0,0 +1,536 @@
+# pipeline.py
+# InputHandler → PersonTracker(PersonDetector) → PoseExtractor → 분류/분석 을 스레드별로 동시에 돌리는 파이프라인
+
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from config import (
+    PIPELINE_QUEUE_SIZE, PIPELINE_DROP_POLICY, MOTION_GATE_ENABLED, LOAD_CONTROL_ENABLED,
+    METRICS_PORT, EVENT_STORE_ENABLED, CLIP_ENABLED, LANDMARK_RECORD_DIR,
+)
+from alert_dispatcher import AlertDispatcher
+from clip_recorder import ClipRecorder
+from event_logger import get_event_logger
+from event_store import EventStore
+from input_handler import InputHandler
+from landmark_recorder import LandmarkRecorder
+from load_controller import LoadController
+from metrics import Metrics
+from metrics_server import MetricsServer
+from motion_gate import MotionGate
+from person_detector import PersonDetector
+from person_tracker import PersonTracker
+from pose_extractor import PoseExtractor
+from track_state import TrackStateManager
+from posture_wrapper import PostureClassifierWrapper
+from roi_manager import ROIManager
+
+DROP_POLICIES = ("drop_oldest", "skip_detection")
+
+# 스테이지 사이를 오가는 프레임 단위 데이터
+# persons: [{"track_id", "bbox", "result"(extract 결과), "label"}, ...]
+#          부하 제어로 포즈·분석을 건너뛴 프레임은 None
+# state:   {track_id: 분석기 상태} (TrackStateManager.get_states())
+# events:  이 프레임에서 발생한 이벤트 (각각 "track_id" 포함)
+FramePacket = namedtuple(
+    "FramePacket",
+    ["seq", "frame", "capture_ts", "tracks", "removed_ids", "persons", "state", "events"]
+)
+
+_STOP = object()  # 스테이지 종료 신호
+
+
+class Pipeline:
+    """
+    캡처 / 검출·추적 / 포즈 / 분석 4개 스테이지를 각각 스레드로 돌리고 bounded queue로 연결합니다.
+    처리량은 스테이지 합이 아니라 가장 느린 스테이지에 수렴합니다.
+    - drop_policy='drop_oldest': 큐가 가득 차면 가장 오래된 프레임을 버림
+    - drop_policy='skip_detection': 캡처 큐만 오래된 프레임을 버리고, 검출 스테이지가 밀리면
+      YOLO 없이 추적 전파만 수행. 이후 스테이지는 대기(backpressure)해 분석 프레임을 잃지 않음
+    - headless=True면 cv2.imshow 없이 동작 (콜백으로 결과 수신)
+    - load_controller가 있으면 종단 지연에 따라 포즈 복잡도 / YOLO 간격 / 분석 빈도를 조절
+    """
+    def __init__(self,
+                 source=0,
+                 handler=None,
+                 detector=None,
+                 tracker=None,
+                 roi_manager=None,
+                 pose_extractor=None,
+                 classifier=None,
+                 track_states=None,
+                 load_controller=None,
+                 metrics=None,
+                 event_logger=None,
+                 event_store=None,
+                 clip_recorder=None,
+                 landmark_recorder=None,
+                 queue_size: int = PIPELINE_QUEUE_SIZE,
+                 drop_policy: str = PIPELINE_DROP_POLICY,
+                 headless: bool = True,
+                 on_result=None,
+                 on_event=None):
+        """
+        :param source: InputHandler 소스 (handler를 주지 않을 때만 사용)
+        :param handler/detector/tracker/roi_manager/pose_extractor/classifier:
+               각 스테이지 구성요소. None이면 기본 설정으로 생성
+        :param track_states: 트랙별 분석기/스무딩 창 관리자 (None이면 roi_manager로 새로 생성)
+        :param load_controller: LoadController. None이면 LOAD_CONTROL_ENABLED일 때 기본 설정으로 생성
+        :param metrics: 스테이지 지연/처리율을 기록할 Metrics (None이면 camera 라벨로 새로 생성)
+        :param event_logger: 자세/이벤트 CSV 로거 (None이면 프로세스 공용 EventLogger)
+        :param event_store: 이벤트 SQLite 저장소. None이면 EVENT_STORE_ENABLED일 때 생성 (close()에서 닫음)
+        :param clip_recorder: 이벤트 전후 영상 기록기. None이면 CLIP_ENABLED일 때 생성
+        :param landmark_recorder: 포즈 결과 녹화기 (LandmarkRecorder). None이면 LANDMARK_RECORD_DIR이
+               설정됐을 때 생성 (close()에서 닫음)
+        :param queue_size: 스테이지 사이 큐 최대 길이
+        :param drop_policy: 'drop_oldest' | 'skip_detection'
+        :param headless: True면 화면 출력 없음
+        :param on_result: 분석이 끝난 FramePacket마다 호출되는 콜백 (분석 스레드에서 호출)
+        :param on_event: get_events()의 이벤트 dict마다 호출되는 콜백 (분석 스레드에서 호출)
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"drop_policy must be one of {DROP_POLICIES}: {drop_policy}")
+
+        self.handler = handler if handler is not None else InputHandler(source)
+        self.roi_manager = roi_manager if roi_manager is not None else ROIManager()
+        if tracker is None:
+            tracker = PersonTracker(detector if detector is not None else PersonDetector(),
+                                    motion_gate=MotionGate() if MOTION_GATE_ENABLED else None)
+        self.tracker = tracker
+        # 화면 출력도 frame_landmarks로 그리므로 시각화용 pose_landmarks(protobuf)는 남기지 않음
+        self.pose_extractor = (pose_extractor if pose_extractor is not None
+                               else PoseExtractor(keep_pose_landmarks=False))
+        self.classifier = classifier if classifier is not None else PostureClassifierWrapper()
+        self.track_states = (track_states if track_states is not None
+                             else TrackStateManager(roi_manager=self.roi_manager))
+        if load_controller is None and LOAD_CONTROL_ENABLED:
+            load_controller = LoadController(
+                pose_extractor=self.pose_extractor,
+                tracker=self.tracker,
+                base_complexity=self.pose_extractor.model_complexity,
+                base_stride=self.tracker.detect_stride,
+            )
+        self.load_controller = load_controller
+
+        self.camera_id = str(source)
+        self.event_logger = event_logger if event_logger is not None else get_event_logger()
+        self._owns_store = event_store is None and EVENT_STORE_ENABLED
+        if self._owns_store:
+            event_store = EventStore()
+            event_store.start()
+        self.event_store = event_store
+        if clip_recorder is None and CLIP_ENABLED:
+            clip_recorder = ClipRecorder(camera_id=self.camera_id)
+        self.clip_recorder = clip_recorder
+        if landmark_recorder is None and LANDMARK_RECORD_DIR:
+            landmark_recorder = LandmarkRecorder(LANDMARK_RECORD_DIR)
+        self.landmark_recorder = landmark_recorder
+        self._recorded_rois = None  # 녹화 meta에 마지막으로 기록한 ROI 목록
+        self.drop_policy = drop_policy
+        self.headless = headless
+        self.on_result = on_result
+        self.on_event = on_event
+
+        self._q_detect = queue.Queue(maxsize=queue_size)
+        self._q_pose = queue.Queue(maxsize=queue_size)
+        self._q_analyze = queue.Queue(maxsize=queue_size)
+        self._q_display = queue.Queue(maxsize=1)
+
+        self._stop = threading.Event()
+        self._tracker_lock = threading.Lock()  # 검출 스레드 update / 포즈 스레드 observe 보호
+        self._threads = []
+        self._closed = False
+
+        # 통계
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.detections_skipped = 0
+        self.dropped = {"detect": 0, "pose": 0, "analyze": 0, "display": 0}
+
+        # 계측: 스테이지 지연 히스토그램(capture/detect/pose/classify/analyze/end_to_end),
+        # 처리율(captured/processed), 게이지(큐 길이, 드롭 수, 검출 생략 비율)
+        self.metrics = metrics if metrics is not None else Metrics(labels={"camera": self.camera_id})
+        m = self.metrics
+        m.gauge("queue_detect", self._q_detect.qsize)
+        m.gauge("queue_pose", self._q_pose.qsize)
+        m.gauge("queue_analyze", self._q_analyze.qsize)
+        for name in self.dropped:
+            m.gauge(f"dropped_{name}", lambda name=name: self.dropped[name])
+        m.gauge("camera_dropped", lambda: getattr(self.handler, "dropped_frames", 0))
+        m.gauge("detections_skipped", lambda: self.detections_skipped)
+        gate = getattr(self.tracker, "motion_gate", None)
+        if gate is not None:
+            m.gauge("detect_skip_ratio", gate.skip_ratio)
+        if self.load_controller:
+            m.gauge("load_level", lambda: self.load_controller.level)
+        if self.clip_recorder:
+            m.gauge("clip_ring_bytes", lambda: self.clip_recorder.ring_bytes)
+
+    # ────────────── 큐 헬퍼 ────────────── #
+
+    def _put(self, q, item, name, drop):
+        """
+        drop=True: 가득 차면 가장 오래된 항목을 버리고 넣음 (버린 수는 self.dropped[name])
+        drop=False: 자리가 날 때까지 대기 (중지 요청 시 포기)
+        """
+        while not self._stop.is_set():
+            try:
+                if drop:
+                    q.put_nowait(item)
+                else:
+                    q.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                if not drop:
+                    continue
+                try:
+                    old = q.get_nowait()
+                except queue.Empty:
+                    continue
+                if old is _STOP:
+                    # 종료 신호는 버리지 않음
+                    q.put(old)
+                    return False
+                self.dropped[name] += 1
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.05)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _forward_stop(self, q):
+        while not self._stop.is_set():
+            try:
+                q.put(_STOP, timeout=0.05)
+                return
+            except queue.Full:
+                continue
+
+    # ────────────── 스테이지 ────────────── #
+
+    def _capture_loop(self):
+        seq = 0
+        capture_hist = self.metrics.histogram("capture")
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            frame = self.handler.get_frame()
+            if frame is None:
+                if getattr(self.handler, "is_file", False) or not self.handler.is_opened():
+                    break
+                continue
+            capture_hist.record(time.perf_counter() - start)
+            seq += 1
+            self.frames_captured += 1
+            self.metrics.mark("captured")
+            if self.clip_recorder:
+                self.clip_recorder.push(frame, self.handler.frame_ts)
+            packet = FramePacket(seq, frame, self.handler.frame_ts, None, None, None, None, None)
+            self._put(self._q_detect, packet, "detect", drop=True)
+        self._forward_stop(self._q_detect)
+
+    def _detect_loop(self):
+        drop = self.drop_policy == "drop_oldest"
+        detect_hist = self.metrics.histogram("detect")
+        while True:
+            packet = self._get(self._q_detect)
+            if packet is _STOP:
+                break
+            # 처리할 프레임이 밀려 있으면 YOLO 생략 (skip_detection 정책)
+            allow = drop or self._q_detect.empty()
+            start = time.perf_counter()
+            with self._tracker_lock:
+                tracks = self.tracker.update(packet.frame, allow_detect=allow)
+                # 정지 장면이면 가구도 그대로이므로 ROI 갱신 생략 (검출 직후면 같은 프레임 캐시 사용)
+                if allow and not self.tracker.scene_static:
+                    self.roi_manager.auto_update(packet.frame)
+                boxes = [(t.track_id, t.bbox) for t in tracks]
+                removed = list(self.tracker.removed_ids)
+            elapsed = time.perf_counter() - start
+            detect_hist.record(elapsed)
+            if self.load_controller:
+                self.load_controller.record_stage("detect", elapsed)
+            if not allow:
+                self.detections_skipped += 1
+            packet = packet._replace(tracks=boxes, removed_ids=removed)
+            self._put(self._q_pose, packet, "pose", drop)
+        self._forward_stop(self._q_pose)
+
+    def _pose_loop(self):
+        drop = self.drop_policy == "drop_oldest"
+        pose_hist = self.metrics.histogram("pose")
+        while True:
+            packet = self._get(self._q_pose)
+            if packet is _STOP:
+                break
+            for tid in packet.removed_ids:
+                self.pose_extractor.release_track(tid)
+
+            # 부하 단계에 따라 일부 프레임은 포즈·분석 생략
+            if self.load_controller and not self.load_controller.should_analyze(packet.seq):
+                self._put(self._q_analyze, packet, "analyze", drop)
+                continue
+
+            start = time.perf_counter()
+            persons = []
+            for tid, bbox in packet.tracks:
+                res = self.pose_extractor.extract(packet.frame, bbox, track_id=tid)
+                if not res:
+                    continue
+                with self._tracker_lock:
+                    self.tracker.observe_landmarks(tid, res["frame_landmarks"])
+                persons.append({"track_id": tid, "bbox": bbox, "result": res, "label": None})
+            elapsed = time.perf_counter() - start
+            if self.landmark_recorder and persons:
+                self._record_landmarks(packet, persons)
+            pose_hist.record(elapsed)
+            if self.load_controller:
+                self.load_controller.record_stage("pose", elapsed)
+            packet = packet._replace(persons=persons)
+            self._put(self._q_analyze, packet, "analyze", drop)
+        self._forward_stop(self._q_analyze)
+
+    def _record_landmarks(self, packet, persons):
+        """포즈 결과를 녹화합니다. 시각은 캡처 시각(monotonic)을 epoch 초로 바꿔 기록합니다."""
+        rec = self.landmark_recorder
+        rois = self.roi_manager.rois
+        if rois is not self._recorded_rois:
+            # ROIManager는 갱신할 때 새 리스트를 만들므로 바뀐 경우에만 meta.json 기록
+            rec.set_rois(rois)
+            self._recorded_rois = rois
+        ts = time.time() - (time.monotonic() - packet.capture_ts)
+        for person in persons:
+            rec.record_result(ts, person["track_id"], person["result"])
+
+    def _analyze_loop(self):
+        classify_hist = self.metrics.histogram("classify")
+        analyze_hist = self.metrics.histogram("analyze")
+        while True:
+            packet = self._get(self._q_analyze)
+            if packet is _STOP:
+                break
+
+            if packet.persons is None:
+                # 포즈·분석을 건너뛴 프레임: 트랙별 분석기 상태만 조회
+                packet = packet._replace(state=self.track_states.get_states(), events=[])
+                self._finish(packet)
+                continue
+
+            # 사람마다 자기 트랙의 스무딩 창으로 분류하고 자기 트랙의 분석기에 넣음
+            start = time.perf_counter()
+            risky = False
+            events = []
+            classify_time = 0.0
+            for person in packet.persons:
+                track_id = person["track_id"]
+                landmarks = person["result"]["landmarks"]
+                t0 = time.perf_counter()
+                person["label"] = self.track_states.classify(track_id, landmarks, self.classifier)
+                t1 = time.perf_counter()
+                classify_hist.record(t1 - t0)
+                classify_time += t1 - t0
+                events.extend(self.track_states.analyze(
+                    track_id, person["label"], landmarks, person["bbox"],
+                    points=person["result"]["frame_landmarks"]))
+
+                self.event_logger.posture(person["label"], track_id=person["track_id"])
+                if self.event_store:
+                    self.event_store.posture(person["label"], self.camera_id, person["track_id"])
+                if (person["label"].startswith("lying")
+                        and not self.roi_manager.is_bbox_in_roi(person["bbox"])):
+                    risky = True
+            self.track_states.expire()
+            state = self.track_states.get_states()
+            now = time.perf_counter()
+            analyze_hist.record(now - start - classify_time)
+
+            if self.load_controller:
+                self.load_controller.record_stage("analyze", now - start)
+                if risky:
+                    self.load_controller.note_risk()
+                self.load_controller.note_events(events)
+
+            packet = packet._replace(state=state, events=events)
+            self._finish(packet)
+        self._stop.set()
+
+    def _finish(self, packet):
+        """분석 스테이지 마지막 처리: 지연 기록, 부하 단계 조정, 콜백/화면 전달."""
+        self.frames_processed += 1
+        self.metrics.mark("processed")
+        latency = time.monotonic() - packet.capture_ts
+        self.metrics.observe("end_to_end", latency)
+        if self.load_controller:
+            self.load_controller.record_latency(latency)
+            self.load_controller.update()
+        for ev in packet.events:
+            self.metrics.count_event(ev["type"])
+            self.event_logger.event(ev)
+            if self.event_store:
+                self.event_store.event(ev, camera=self.camera_id)
+            if self.clip_recorder and self.clip_recorder.should_record(ev):
+                self.clip_recorder.trigger(ev, packet.capture_ts)
+            if self.on_event:
+                self.on_event(ev)
+        if self.on_result:
+            self.on_result(packet)
+        if not self.headless:
+            self._put(self._q_display, packet, "display", drop=True)
+
+    # ────────────── 실행 / 종료 ────────────── #
+
+    def start(self):
+        """
+        스테이지 스레드를 시작합니다.
+        """
+        if self.clip_recorder:
+            self.clip_recorder.start()
+        for target, name in ((self._capture_loop, "capture"),
+                             (self._detect_loop, "detect"),
+                             (self._pose_loop, "pose"),
+                             (self._analyze_loop, "analyze")):
+            t = threading.Thread(target=target, name=f"Pipeline-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def run(self, duration=None):
+        """
+        파이프라인을 실행하고 종료(소스 끝, 'q' 입력, duration 경과, stop())까지 대기합니다.
+        화면 출력은 메인 스레드에서만 수행합니다.
+        :param duration: 최대 실행 시간(초), None이면 무제한
+        """
+        self.start()
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            if not self.headless:
+                cv2.namedWindow("AI Caregiver System", cv2.WINDOW_NORMAL)
+            while not self._stop.is_set():
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                if self.headless:
+                    self._stop.wait(0.1)
+                    continue
+                try:
+                    packet = self._q_display.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                cv2.imshow("AI Caregiver System", self.draw(packet))
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        """
+        모든 스테이지를 멈추고 카메라/Pose 리소스를 해제합니다. 여러 번 호출해도 안전합니다.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=2.0)
+        self.handler.release()
+        self.pose_extractor.close()
+        if self._owns_store:
+            self.event_store.close()
+        if self.clip_recorder:
+            self.clip_recorder.close()
+        if self.landmark_recorder:
+            self.landmark_recorder.close()
+        if not self.headless:
+            cv2.destroyAllWindows()
+
+    def stats(self):
+        """
+        처리 통계 스냅샷. motion_gate의 skip_ratio는 검출 차례 중 정지 장면으로 생략한 비율입니다.
+        """
+        gate = getattr(self.tracker, "motion_gate", None)
+        return {
+            "frames_captured": self.frames_captured,
+            "frames_processed": self.frames_processed,
+            "detections_skipped": self.detections_skipped,
+            "dropped": dict(self.dropped),
+            "motion_gate": gate.stats() if gate is not None else None,
+            "load": self.load_controller.stats() if self.load_controller else None,
+            "metrics": self.metrics.snapshot(),
+            "clips": self.clip_recorder.stats() if self.clip_recorder else None,
+            "tracks": self.track_states.stats(),
+            "queue_depth": {
+                "detect": self._q_detect.qsize(),
+                "pose": self._q_pose.qsize(),
+                "analyze": self._q_analyze.qsize(),
+            },
+        }
+
+    # ────────────── 시각화 ────────────── #
+
+    def draw(self, packet):
+        """
+        결과 프레임 위에 ROI, 사람 박스, 레이블, 랜드마크를 그립니다.
+        """
+        connections = mp.solutions.pose.POSE_CONNECTIONS
+
+        display = packet.frame.copy()
+        display = self.roi_manager.draw(display)
+        for person in packet.persons or ():
+            x1, y1, x2, y2 = person["bbox"]
+            inside = self.roi_manager.is_bbox_in_roi(person["bbox"])
+            color = (0, 255, 0) if inside else (0, 0, 255)
+            cv2.rectangle(display, (x1, y1), (x2, y2), color, 2)
+            state = (packet.state or {}).get(person["track_id"], "")
+            cv2.putText(display, f"#{person['track_id']} {person['label']} {state}", (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+
+            # 프레임 픽셀 좌표 랜드마크를 바로 그림 (크롭 창 → 프레임 변환 불필요)
+            points = person["result"]["frame_landmarks"]
+            visible = points[:, 3] >= 0.5
+            xy = points[:, :2].astype(int).tolist()
+            for a, b in connections:
+                if visible[a] and visible[b]:
+                    cv2.line(display, tuple(xy[a]), tuple(xy[b]), (255, 0, 0), 2)
+            for i in np.flatnonzero(visible):
+                cv2.circle(display, tuple(xy[i]), 2, (0, 255, 0), -1)
+
+        cv2.putText(display, f"tracks: {len(packet.state or {})}", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
+        return display
+
+
+def main():
+    # 알림 전송은 백그라운드 스레드에서 (분석 스레드는 큐에 넣기만 함)
+    dispatcher = AlertDispatcher()
+    pipeline = Pipeline(source=0, headless=False, on_event=dispatcher.submit)
+    if not pipeline.handler.is_opened():
+        print("❌ 카메라 열기 실패")
+        pipeline.close()
+        return
+    dispatcher.start()
+    server = None
+    if METRICS_PORT is not None:
+        server = MetricsServer([pipeline.metrics], port=METRICS_PORT)
+        server.start()
+    try:
+        pipeline.run()
+    finally:
+        if server is not None:
+            server.stop()
+        dispatcher.stop()
+    print(pipeline.stats())
+    print(dispatcher.stats())
+
+
+if __name__ == "__main__":
+    main()
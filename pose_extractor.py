@@ -1,80 +1,315 @@
 # pose_extractor.py
 
+import time
+from collections import OrderedDict
+
 import cv2
 import numpy as np
 import mediapipe as mp
-from config import MP_DETECT_CONFIDENCE, MP_TRACK_CONFIDENCE
+from config import (
+    MP_DETECT_CONFIDENCE,
+    MP_TRACK_CONFIDENCE,
+    MP_MODEL_COMPLEXITY,
+    POSE_POOL_SIZE,
+    POSE_IDLE_TIMEOUT,
+    POSE_CROP_QUANTUM,
+    POSE_CROP_BUFFERS,
+)
+from metrics import record_model_load
 
 
-def pad_to_square(img, pad_color=(0, 0, 0)):
-    h, w = img.shape[:2]
-    side = max(h, w)
-    dh, dw = side - h, side - w
-    top, bottom = dh // 2, dh - dh // 2
-    left, right = dw // 2, dw - dw // 2
-    return cv2.copyMakeBorder(img, top, bottom, left, right,
-                              cv2.BORDER_CONSTANT, value=pad_color)
+def crop_transform(bbox, quantum=POSE_CROP_QUANTUM):
+    """
+    bbox를 가운데에 둔 정사각형 크롭의 정규화 좌표 → 원본 프레임 픽셀 좌표 변환 계수.
+    quantum=1이면 bbox의 긴 변을 한 변으로 하고 짧은 쪽 양옆을 반씩 넓힌 정사각형입니다.
+    :param quantum: 한 변을 이 값의 배수로 올림 (SquareCropper와 같은 값이어야 함)
+    :return: (ox, oy, side) — 프레임 x = ox + x * side, y = oy + y * side
+    """
+    x1, y1, x2, y2 = bbox
+    w, h = x2 - x1, y2 - y1
+    side = max(w, h)
+    if quantum > 1:
+        side = -(-side // quantum) * quantum
+    # 늘어난 길이를 양쪽에 반씩 (홀수면 앞쪽이 1 작음)
+    return x1 - (side - w) // 2, y1 - (side - h) // 2, side
 
 
-def normalize_z_roi(landmarks, bbox):
+class SquareCropper:
     """
-    ROI 높이 기준으로 z값 정규화
+    bbox를 가운데에 둔 정사각형 창을 원본 프레임에서 잘라 RGB로 변환합니다.
+    - 검은 여백 대신 bbox 주변의 실제 픽셀을 채우고, 창이 프레임 밖으로 나간 부분만 0으로 채움
+    - BGR→RGB 변환 결과는 한 변 크기별로 재사용하는 버퍼에 바로 씀 (copyMakeBorder/cvtColor 할당 없음)
+    - 한 변은 quantum 배수로 올려 프레임마다 박스 크기가 조금씩 바뀌어도 같은 버퍼를 씀
+    - 반환된 이미지는 같은 크기의 다음 crop() 호출 때 덮어써짐
     """
-    x1, y1, x2, y2 = bbox
-    roi_height = y2 - y1 if (y2 - y1) != 0 else 1
-    return [(x, y, z / roi_height, v) for (x, y, z, v) in landmarks]
+    def __init__(self, quantum: int = POSE_CROP_QUANTUM, max_buffers: int = POSE_CROP_BUFFERS):
+        """
+        :param quantum: 한 변 올림 단위(픽셀)
+        :param max_buffers: 유지할 크기별 버퍼 최대 개수 (초과 시 가장 오래 안 쓰인 버퍼 해제)
+        """
+        self.quantum = max(1, int(quantum))
+        self.max_buffers = max(1, max_buffers)
+        self._buffers = OrderedDict()  # side -> (side, side, 3) uint8
+        self.allocations = 0
 
+    def _buffer(self, side):
+        buf = self._buffers.get(side)
+        if buf is None:
+            while len(self._buffers) >= self.max_buffers:
+                self._buffers.popitem(last=False)
+            buf = np.empty((side, side, 3), dtype=np.uint8)
+            self._buffers[side] = buf
+            self.allocations += 1
+        else:
+            self._buffers.move_to_end(side)
+        return buf
 
-def normalize_z_relative(landmarks):
+    def crop(self, frame, bbox):
+        """
+        :param frame: BGR 이미지
+        :param bbox: (x1, y1, x2, y2)
+        :return: (RGB 정사각형 이미지, (ox, oy, side)) 또는 (None, None) (bbox가 프레임과 겹치지 않음)
+        """
+        fh, fw = frame.shape[:2]
+        ox, oy, side = crop_transform(bbox, self.quantum)
+        # 창과 프레임의 교집합
+        sx1, sy1 = max(ox, 0), max(oy, 0)
+        sx2, sy2 = min(ox + side, fw), min(oy + side, fh)
+        if side <= 0 or sx1 >= sx2 or sy1 >= sy2:
+            return None, None
+
+        buf = self._buffer(side)
+        dx1, dy1 = sx1 - ox, sy1 - oy
+        dx2, dy2 = dx1 + (sx2 - sx1), dy1 + (sy2 - sy1)
+        # 프레임 밖 부분만 여백으로 채움
+        if dy1 > 0:
+            buf[:dy1] = 0
+        if dy2 < side:
+            buf[dy2:] = 0
+        if dx1 > 0:
+            buf[dy1:dy2, :dx1] = 0
+        if dx2 < side:
+            buf[dy1:dy2, dx2:] = 0
+        cv2.cvtColor(frame[sy1:sy2, sx1:sx2], cv2.COLOR_BGR2RGB, dst=buf[dy1:dy2, dx1:dx2])
+        return buf, (ox, oy, side)
+
+
+def points_to_bbox(points, min_visibility=0.5, margin=0.1):
     """
-    어깨 평균 z를 기준으로 상대값 변환
+    프레임 픽셀 좌표 랜드마크로부터 사람 박스를 계산합니다.
+    :param points: extract()의 frame_landmarks (33, 4) 배열 (x, y 픽셀, z, v)
+    :param min_visibility: 사용할 랜드마크 최소 visibility
+    :param margin: 박스 너비/높이 대비 여유 비율
+    :return: (x1, y1, x2, y2) 또는 None (보이는 랜드마크 부족)
     """
-    z_ref = (landmarks[11][2] + landmarks[12][2]) / 2
-    return [(x, y, z - z_ref, v) for (x, y, z, v) in landmarks]
+    points = np.asarray(points)
+    visible = points[points[:, 3] >= min_visibility, :2]
+    if len(visible) < 2:
+        return None
 
+    bx1, by1 = visible.min(axis=0)
+    bx2, by2 = visible.max(axis=0)
+    mx = (bx2 - bx1) * margin
+    my = (by2 - by1) * margin
+    return (int(bx1 - mx), int(by1 - my), int(bx2 + mx), int(by2 + my))
 
-class PoseExtractor:
-    def __init__(self):
+
+def landmarks_to_array(landmark_list):
+    """
+    MediaPipe NormalizedLandmarkList를 (33, 4) float32 배열 (x, y, z, visibility)로 옮깁니다.
+    (protobuf 랜드마크에서는 튜플 리스트 → np.array가 np.fromiter 생성식보다 빠름)
+    """
+    return np.array([(lm.x, lm.y, lm.z, lm.visibility) for lm in landmark_list.landmark],
+                    dtype=np.float32)
+
+
+def normalize_z(landmarks, bbox):
+    """
+    z값을 어깨 평균 z 기준 상대값으로 바꾸고 bbox 높이로 나눕니다. (33, 4) 배열에 제자리로 적용합니다.
+    (z / h) - (어깨 평균 z / h) = (z - 어깨 평균 z) / h
+    """
+    roi_height = (bbox[3] - bbox[1]) or 1
+    z = landmarks[:, 2]
+    z -= (z[11] + z[12]) / 2
+    z /= roi_height
+    return landmarks
+
+
+class PosePool:
+    """
+    사람(트랙 ID)별 MediaPipe Pose 인스턴스 풀.
+    - 인스턴스마다 한 사람만 보도록 해서 static_image_mode=False의 추적 경로가 유지되게 함
+    - max_size 초과 시 가장 오래 안 쓰인(LRU) 인스턴스를 close() 후 제거
+    - idle_timeout 초 이상 안 쓰인 인스턴스는 release_idle()에서 close()
+    - model_complexity를 바꾸면 기존 인스턴스는 다음 get() 때 새 복잡도로 다시 생성
+    """
+    def __init__(self,
+                 max_size: int = POSE_POOL_SIZE,
+                 idle_timeout: float = POSE_IDLE_TIMEOUT,
+                 model_complexity: int = MP_MODEL_COMPLEXITY):
+        """
+        :param max_size: 동시에 유지할 Pose 인스턴스 최대 개수
+        :param idle_timeout: 미사용 인스턴스 해제 시간(초)
+        :param model_complexity: MediaPipe Pose 모델 복잡도
+        """
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self.model_complexity = model_complexity
+        # key -> [Pose, 마지막 사용 시각, 생성 시 복잡도], 앞쪽이 가장 오래 안 쓰인 항목
+        self._entries = OrderedDict()
+
+    def _create(self):
+        start = time.perf_counter()
+        pose = self.mp_pose.Pose(
             static_image_mode=False,
-            model_complexity=1,
+            model_complexity=self.model_complexity,
             enable_segmentation=False,
             min_detection_confidence=MP_DETECT_CONFIDENCE,
             min_tracking_confidence=MP_TRACK_CONFIDENCE
         )
+        record_model_load(f"mediapipe_pose_c{self.model_complexity}", time.perf_counter() - start)
+        return pose
 
-    def extract(self, frame, bbox):
-        x1, y1, x2, y2 = bbox
-        roi = frame[y1:y2, x1:x2]
-        if roi.size == 0:
-            return None
+    def get(self, key):
+        """
+        key(트랙 ID)에 해당하는 Pose 인스턴스를 반환합니다. 없으면 생성합니다.
+        :param key: 사람 식별자 (None이면 공용 인스턴스)
+        :return: mp.solutions.pose.Pose
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[2] == self.model_complexity:
+                entry[1] = now
+                self._entries.move_to_end(key)
+                return entry[0]
+            # 복잡도가 바뀌었으면 다시 생성
+            del self._entries[key]
+            entry[0].close()
+
+        # 가득 찼으면 LRU 인스턴스 해제
+        while len(self._entries) >= self.max_size:
+            _, (old_pose, _, _) = self._entries.popitem(last=False)
+            old_pose.close()
+
+        pose = self._create()
+        self._entries[key] = [pose, now, self.model_complexity]
+        return pose
+
+    def release(self, key):
+        """
+        특정 key의 인스턴스를 즉시 해제합니다. (트랙 소멸 시)
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry[0].close()
+
+    def release_idle(self, now=None):
+        """
+        idle_timeout 이상 사용되지 않은 인스턴스를 해제합니다.
+        :return: 해제된 인스턴스 수
+        """
+        if now is None:
+            now = time.monotonic()
+        released = 0
+        # 앞쪽이 가장 오래된 항목이므로 최근 항목을 만나면 중단
+        while self._entries:
+            key, (pose, last_used, _) = next(iter(self._entries.items()))
+            if now - last_used < self.idle_timeout:
+                break
+            del self._entries[key]
+            pose.close()
+            released += 1
+        return released
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        for pose, _, _ in self._entries.values():
+            pose.close()
+        self._entries.clear()
 
-        # 1) 크롭된 ROI를 정사각형으로 패딩
-        square = pad_to_square(roi)
 
-        # 2) BGR→RGB 변환 후 MediaPipe에 입력
-        rgb = cv2.cvtColor(square, cv2.COLOR_BGR2RGB)
-        results = self.pose.process(rgb)
+class PoseExtractor:
+    def __init__(self,
+                 pool_size: int = POSE_POOL_SIZE,
+                 idle_timeout: float = POSE_IDLE_TIMEOUT,
+                 model_complexity: int = MP_MODEL_COMPLEXITY,
+                 keep_pose_landmarks: bool = True):
+        """
+        :param pool_size: 사람별 Pose 인스턴스 최대 개수
+        :param idle_timeout: 미사용 Pose 인스턴스 해제 시간(초)
+        :param model_complexity: MediaPipe Pose 모델 복잡도
+        :param keep_pose_landmarks: False면 결과에 시각화용 pose_landmarks(protobuf)를 담지 않음
+                                    (화면 출력이 없을 때 프레임마다 protobuf를 붙잡아 두지 않도록)
+        """
+        self.mp_pose = mp.solutions.pose
+        self.pool = PosePool(pool_size, idle_timeout, model_complexity)
+        self.keep_pose_landmarks = keep_pose_landmarks
+        self.cropper = SquareCropper()
+
+    def extract(self, frame, bbox, track_id=None):
+        """
+        :param frame: BGR 이미지
+        :param bbox: (x1, y1, x2, y2)
+        :param track_id: 사람 식별자. 같은 사람은 같은 Pose 인스턴스로 추적됨
+                         (None이면 공용 인스턴스 하나를 사용 — 한 명일 때만 권장)
+        :return: {"bbox", "crop", "landmarks", "frame_landmarks", "pose_landmarks"} 또는 None
+                 - crop: 포즈 입력 정사각형 창 (ox, oy, side) (crop_transform 참고)
+                 - landmarks: (33, 4) float32, 크롭(정사각형) 기준 정규화 x, y + 정규화 z + visibility
+                 - frame_landmarks: (33, 4) float32, 원본 프레임 픽셀 x, y + 같은 z, visibility
+                 두 배열은 호출마다 새로 만듦 (분류/분석 스레드·감독 프로세스로 넘어가므로 재사용하지 않음)
+                 - pose_landmarks: 시각화용 protobuf (keep_pose_landmarks=False면 None)
+        """
+        self.pool.release_idle()
+
+        # 1) bbox 주변 정사각형 창을 프레임에서 잘라 재사용 버퍼에 RGB로 변환
+        #    (프레임 밖으로 나간 부분만 검은 여백)
+        rgb, crop = self.cropper.crop(frame, bbox)
+        if rgb is None:
+            return None
+
+        # 2) MediaPipe에 입력
+        results = self.pool.get(track_id).process(rgb)
         if not results.pose_landmarks:
             return None
 
-        # 3) 랜드마크 리스트로 변환 (원본 z값 포함)
-        landmarks = [
-            (lm.x, lm.y, lm.z, lm.visibility)
-            for lm in results.pose_landmarks.landmark
-        ]
+        # 3) (33, 4) 배열로 변환 후 z값 정규화 두 가지를 한 번에 적용
+        landmarks = normalize_z(landmarks_to_array(results.pose_landmarks), bbox)
 
-        # 4) z값 정규화 병행 적용
-        landmarks = normalize_z_roi(landmarks, bbox)
-        landmarks = normalize_z_relative(landmarks)
+        # 4) 크롭 정규화 좌표 → 원본 프레임 픽셀 좌표
+        ox, oy, side = crop
+        frame_landmarks = landmarks.copy()
+        frame_landmarks[:, :2] *= side
+        frame_landmarks[:, :2] += (ox, oy)
 
         # 5) 결과 반환
         return {
             "bbox": bbox,
+            "crop": crop,
             "landmarks": landmarks,
-            "pose_landmarks": results.pose_landmarks  # 시각화용
+            "frame_landmarks": frame_landmarks,
+            "pose_landmarks": results.pose_landmarks if self.keep_pose_landmarks else None
         }
 
+    @property
+    def model_complexity(self):
+        return self.pool.model_complexity
+
+    def set_model_complexity(self, model_complexity):
+        """
+        MediaPipe Pose 모델 복잡도(0~2)를 바꿉니다.
+        다른 스레드에서 호출해도 되며, 각 트랙의 다음 extract()부터 적용됩니다.
+        """
+        self.pool.model_complexity = model_complexity
+
+    def release_track(self, track_id):
+        """
+        사라진 사람의 Pose 인스턴스를 해제합니다.
+        """
+        self.pool.release(track_id)
+
     def close(self):
-        self.pose.close()
+        self.pool.close()
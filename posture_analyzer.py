@@ -2,11 +2,11 @@
 
 # posture_analyzer_v4.py
 
-import time
-from collections import deque, namedtuple
+from collections import deque
 from typing import Deque, List, Dict, Optional, Tuple, Any
 
-from utils import calculate_euclidean_distance, get_timestamp
+from frame_history import FrameHistory, encode_label, decode_label
+from utils import SystemClock, get_timestamp
 from config import (
     FALL_TRANSITION_TIME,
     NO_MOVEMENT_TIME_THRESHOLD,
@@ -15,12 +15,10 @@ from config import (
     ANALYZER_TILT_THRESHOLD,
     ANALYZER_MOTION_THRESHOLD,
     ANALYZER_IRREGULAR_THRESHOLD,
+    ANALYZER_MAX_FPS,
 )
 
-AnalyzedFrame = namedtuple(
-    "AnalyzedFrame",
-    ["monotonic_ts", "wall_ts", "label", "shoulder_y", "landmarks", "in_roi"]
-)
+WINDOW_SECONDS = max(TILT_DURATION, NO_MOVEMENT_TIME_THRESHOLD)
 
 COOL_DOWN = 5.0  # 이벤트 쿨다운 시간 (초)
 
@@ -32,12 +30,30 @@ def _is_lying(label: str) -> bool:
 class PostureAnalyzerV4:
     """
     시간 기반 슬라이딩 윈도우로 posture/event 분석.
-    - 내부 타이밍: time.monotonic()
-    - 이벤트 타임스탬프: get_timestamp(time.time())
+    - 내부 타이밍: clock.monotonic() 또는 update()에 넘긴 프레임 시각
+    - 이벤트 타임스탬프: get_timestamp(최신 프레임 wall 시각)
+    - 프레임 이력: FrameHistory (float32 랜드마크 등 병렬 배열 링 버퍼)
     """
-    def __init__(self, roi_manager: Any = None):
+    def __init__(
+        self,
+        roi_manager: Any = None,
+        max_fps: float = ANALYZER_MAX_FPS,
+        clock: Any = None,
+        cool_down: float = COOL_DOWN,
+    ):
+        """
+        :param roi_manager: is_bbox_in_roi(bbox)를 제공하는 ROI 관리자
+        :param max_fps: 이력 버퍼 용량 산정용 최대 update() 빈도.
+                        이보다 자주 호출되면 윈도우가 용량만큼으로 짧아짐
+        :param clock: monotonic()/time()을 제공하는 시계 (기본 SystemClock, 재생 시 ReplayClock)
+        :param cool_down: 같은 이벤트 재발생 최소 간격(초)
+        """
         self.roi_manager = roi_manager
-        self.buffer: Deque[AnalyzedFrame] = deque()
+        self.clock = clock if clock is not None else SystemClock()
+        self.cool_down = cool_down
+        # update()에 프레임 시각을 직접 넘기면 이후 판정도 최신 프레임 시각 기준
+        self._explicit_ts = False
+        self.buffer = FrameHistory(int(WINDOW_SECONDS * max_fps) + 1)
         self.last_label: Optional[str] = None
 
         # 이벤트 쿨다운 관리
@@ -47,49 +63,136 @@ class PostureAnalyzerV4:
         self._motionless_start: Optional[float] = None
         self._tilt_start: Optional[float] = None
 
+        # 연속 프레임 쌍 이동량 누적기: (앞 프레임 monotonic_ts, 앞 프레임 seq, 이동량)
+        # update()에서 쌍마다 한 번만 계산하고, 윈도우 밖 쌍은 제거하며 합계를 갱신
+        self._motion_pairs: Deque[Tuple[float, int, float]] = deque()
+        self._motion_total = 0.0
+
+        # 어깨 y 단조 deque: (monotonic_ts, seq, shoulder_y), 앞쪽이 윈도우 최대/최소
+        # 버퍼에서 밀려난 프레임은 seq로 찾아 제거 (같은 시각 프레임이 여러 개여도 정확)
+        self._sh_max: Deque[Tuple[float, int, float]] = deque()
+        self._sh_min: Deque[Tuple[float, int, float]] = deque()
+
+        # 버퍼 내 posture 전이 횟수 (추가/제거 시 증감)
+        self._transitions = 0
+
+        # 레이블 코드 (버퍼 비교용)
+        self._standing = encode_label("standing")
+        self._sitting = encode_label("sitting")
+
+        # 프레임 일련번호와 마지막 standing / sitting 위치 (낙상 판정용)
+        self._seq = 0
+        self._last_standing_seq: Optional[int] = None
+        self._last_standing_ts = 0.0
+        self._last_sitting_seq: Optional[int] = None
+
     def update(
         self,
         label: str,
         landmarks: Optional[List[Tuple[float, float, float, float]]],
         bbox: Optional[Tuple[int,int,int,int]],
+        timestamp: Optional[float] = None,
+        wall_ts: Optional[float] = None,
+        points: Any = None,
     ) -> None:
         """
         프레임 한 장의 분석 결과를 버퍼에 추가.
         - monotonic_ts: 내부 지속판정 시 사용
         - wall_ts: 이벤트 타임스탬프(log)에 사용
+        :param timestamp: 프레임 시각(초). 주어지면 clock 대신 사용 (녹화 재생 시 실시간보다 빠르게 처리 가능)
+        :param wall_ts: 프레임 epoch 시각. 없으면 timestamp(또는 clock.time())를 사용
+        :param points: 프레임 픽셀 좌표 랜드마크 (PoseExtractor.extract()의 frame_landmarks).
+                       주면 무동작 판정 이동량을 크롭 좌표 대신 이것으로 계산
         """
-        now_mon = time.monotonic()
-        now_wall = time.time()
-
-        # 어깨 y 평균
-        sh_y = None
-        if landmarks:
-            sh_y = (landmarks[11][1] + landmarks[12][1]) / 2
+        if timestamp is not None:
+            self._explicit_ts = True
+            now_mon = timestamp
+            now_wall = wall_ts if wall_ts is not None else timestamp
+        else:
+            now_mon = self.clock.monotonic()
+            now_wall = wall_ts if wall_ts is not None else self.clock.time()
 
         # ROI 안/밖 판정
         in_roi = True
         if self.roi_manager and bbox:
             in_roi = self.roi_manager.is_bbox_in_roi(bbox)
 
-        # 슬라이딩 윈도우: 오래된 프레임 제거
-        cutoff = now_mon - max(TILT_DURATION, NO_MOVEMENT_TIME_THRESHOLD)
-        while self.buffer and self.buffer[0].monotonic_ts < cutoff:
-            self.buffer.popleft()
+        # 슬라이딩 윈도우: 오래된 프레임 제거 (용량이 찼으면 가장 오래된 프레임도 제거)
+        buf = self.buffer
+        cutoff = now_mon - WINDOW_SECONDS
+        while buf.size and (buf.monotonic_ts[buf.head] < cutoff or buf.is_full()):
+            self._evict_oldest()
+
+        # 추가 (배열 슬롯에 복사)
+        code = encode_label(label)
+        prev = buf.slot(-1) if buf.size else None
+        curr = buf.append(now_mon, now_wall, code, landmarks, in_roi, points)
+        self._seq += 1
+        seq = self._seq
+
+        if prev is not None:
+            # 직전 프레임과의 이동량은 여기서 한 번만 계산
+            if buf.has_landmarks[prev] and buf.has_landmarks[curr]:
+                motion = buf.motion_between(prev, curr)
+                self._motion_pairs.append((float(buf.monotonic_ts[prev]), seq - 1, motion))
+                self._motion_total += motion
+            # 전이 횟수
+            if buf.label[prev] != code:
+                self._transitions += 1
+
+        # 마지막 standing·sitting 위치 갱신
+        if code == self._standing:
+            self._last_standing_seq = self._seq
+            self._last_standing_ts = now_mon
+        elif code == self._sitting:
+            self._last_sitting_seq = self._seq
+
+        # 어깨 y 단조 deque 갱신 (뒤쪽에서 지배되는 값 제거)
+        if buf.has_landmarks[curr]:
+            sh_y = float(buf.shoulder_y[curr])
+            while self._sh_max and self._sh_max[-1][2] <= sh_y:
+                self._sh_max.pop()
+            self._sh_max.append((now_mon, seq, sh_y))
+            while self._sh_min and self._sh_min[-1][2] >= sh_y:
+                self._sh_min.pop()
+            self._sh_min.append((now_mon, seq, sh_y))
 
-        # 추가
-        self.buffer.append(
-            AnalyzedFrame(now_mon, now_wall, label, sh_y, landmarks, in_roi)
-        )
         self.last_label = label
 
-    def get_state(self) -> str:
+    def _evict_oldest(self) -> None:
+        """가장 오래된 프레임 제거 + 전이 카운터/누적기 보정."""
+        buf = self.buffer
+        # 버퍼 맨 앞 프레임의 일련번호 (마지막 프레임이 self._seq)
+        old_seq = self._seq - buf.size + 1
+        old = buf.popleft()
+        if buf.size and buf.label[buf.head] != buf.label[old]:
+            self._transitions -= 1
+
+        # 제거된 프레임(또는 그 이전)의 항목은 누적기에서도 제거 (용량 초과로 밀려난 경우 대비)
+        while self._motion_pairs and self._motion_pairs[0][1] <= old_seq:
+            self._motion_total -= self._motion_pairs.popleft()[2]
+        while self._sh_max and self._sh_max[0][1] <= old_seq:
+            self._sh_max.popleft()
+        while self._sh_min and self._sh_min[0][1] <= old_seq:
+            self._sh_min.popleft()
+
+    def _now(self, now: Optional[float] = None) -> float:
+        """판정 기준 시각: 명시값 > (프레임 시각 모드면) 최신 프레임 시각 > clock."""
+        if now is not None:
+            return now
+        if self._explicit_ts and self.buffer.size:
+            return float(self.buffer.monotonic_ts[self.buffer.slot(-1)])
+        return self.clock.monotonic()
+
+    def get_state(self, now: Optional[float] = None) -> str:
         """
         통일된 기준으로 현재 상태 반환.
         - 연속 TILT_DURATION 이상 tilting → 'tilting'
         - 연속 NO_MOVEMENT_TIME_THRESHOLD 이상 motionless → 'motionless'
         - 그 외에는 마지막 posture 레이블
+        :param now: 판정 기준 시각 (기본값은 _now())
         """
-        now = time.monotonic()
+        now = self._now(now)
 
         # 1) tilt 지속 판정
         if self._check_tilt(now):
@@ -105,17 +208,16 @@ class PostureAnalyzerV4:
 
     def _check_tilt(self, now: float) -> bool:
         """현재 윈도우 안에 연속으로 기울임이 TILT_DURATION 이상인지."""
-        # 최신 프레임부터 역순으로 시간 차이 < TILT_DURATION인 부분만 검사
-        ys = []
-        for f in reversed(self.buffer):
-            if now - f.monotonic_ts > TILT_DURATION:
-                break
-            if f.shoulder_y is not None:
-                ys.append(f.shoulder_y)
-        if not ys:
+        # 단조 deque 앞쪽에서 TILT_DURATION 밖 항목 제거 → 앞쪽 값이 윈도우 최대/최소
+        cutoff = now - TILT_DURATION
+        while self._sh_max and self._sh_max[0][0] < cutoff:
+            self._sh_max.popleft()
+        while self._sh_min and self._sh_min[0][0] < cutoff:
+            self._sh_min.popleft()
+        if not self._sh_max:
             self._tilt_start = None
             return False
-        if (max(ys) - min(ys)) > ANALYZER_TILT_THRESHOLD:
+        if (self._sh_max[0][2] - self._sh_min[0][2]) > ANALYZER_TILT_THRESHOLD:
             # 지속 시작 타임스탬프 설정
             if self._tilt_start is None:
                 self._tilt_start = now
@@ -126,21 +228,17 @@ class PostureAnalyzerV4:
 
     def _check_motionless(self, now: float) -> bool:
         """현재 윈도우 안에 연속으로 무동작이 NO_MOVEMENT_TIME_THRESHOLD 이상인지."""
-        # 윈도우 안 프레임 추출
-        frames = [f for f in self.buffer if now - f.monotonic_ts <= NO_MOVEMENT_TIME_THRESHOLD]
-        if len(frames) < 2:
-            self._motionless_start = None
-            return False
-
-        # 이동량 평균 계산
-        total, count = 0.0, 0
-        for prev, curr in zip(frames, frames[1:]):
-            if not prev.landmarks or not curr.landmarks:
-                continue
-            for a, b in zip(prev.landmarks, curr.landmarks):
-                total += calculate_euclidean_distance(a, b)
-            count += 1
-        if count == 0 or (total / count) >= ANALYZER_MOTION_THRESHOLD:
+        # 윈도우 밖으로 나간 쌍 제거 (앞 프레임이 윈도우 안이면 뒤 프레임도 윈도우 안)
+        cutoff = now - NO_MOVEMENT_TIME_THRESHOLD
+        while self._motion_pairs and self._motion_pairs[0][0] < cutoff:
+            self._motion_total -= self._motion_pairs.popleft()[2]
+        if not self._motion_pairs:
+            # 부동소수 누적 오차 초기화
+            self._motion_total = 0.0
+
+        # 이동량 평균 (누적 합계 / 쌍 개수)
+        count = len(self._motion_pairs)
+        if count == 0 or (self._motion_total / count) >= ANALYZER_MOTION_THRESHOLD:
             self._motionless_start = None
             return False
 
@@ -153,11 +251,12 @@ class PostureAnalyzerV4:
         """
         직전 프레임부터 즉시 발생한 레이블 전이 판단 (1-frame).
         """
-        if len(self.buffer) < 2:
+        buf = self.buffer
+        if len(buf) < 2:
             return False
         return (
-            self.buffer[-2].label == from_label and
-            self.buffer[-1].label == to_label
+            decode_label(buf.label[buf.slot(-2)]) == from_label and
+            decode_label(buf.label[buf.slot(-1)]) == to_label
         )
 
     # ────────────── 이벤트 판단 메서드 ────────────── #
@@ -168,29 +267,25 @@ class PostureAnalyzerV4:
           • 마지막 프레임이 lying 계열 & ROI 밖
           • FALL_TRANSITION_TIME 이내 'standing'→'lying' 전이 (중간 'sitting' 無)
         """
-        if not self.buffer:
+        buf = self.buffer
+        if not buf.size:
             return False
-        last = self.buffer[-1]
-        if not _is_lying(last.label) or last.in_roi:
+        last = buf.slot(-1)
+        if not _is_lying(decode_label(buf.label[last])) or buf.in_roi[last]:
             return False
 
-        # standing 인덱스 찾기
-        stand_idx = None
-        for i in range(len(self.buffer)-2, -1, -1):
-            if self.buffer[i].label == "standing":
-                stand_idx = i
-                break
-        if stand_idx is None:
+        # 마지막 standing 프레임이 아직 버퍼 안에 있는지
+        first_seq = self._seq - len(self.buffer) + 1
+        if self._last_standing_seq is None or self._last_standing_seq < first_seq:
             return False
 
         # 전이 시간
-        if (last.monotonic_ts - self.buffer[stand_idx].monotonic_ts) > FALL_TRANSITION_TIME:
+        if (buf.monotonic_ts[last] - self._last_standing_ts) > FALL_TRANSITION_TIME:
             return False
 
-        # 중간 sitting 체크
-        for f in list(self.buffer)[stand_idx+1:]:
-            if f.label == "sitting":
-                return False
+        # 중간 sitting 체크 (standing 이후 sitting이 있었는지)
+        if self._last_sitting_seq is not None and self._last_sitting_seq > self._last_standing_seq:
+            return False
         return True
 
     def is_prone_warning(self) -> bool:
@@ -199,28 +294,24 @@ class PostureAnalyzerV4:
           • lying 계열
           • nose.z – hip.z < POSE_Z_PRONE_THRESHOLD
         """
-        if not self.buffer:
+        buf = self.buffer
+        if not buf.size:
             return False
-        last = self.buffer[-1]
-        if not _is_lying(last.label):
+        last = buf.slot(-1)
+        if not _is_lying(decode_label(buf.label[last])) or not buf.has_landmarks[last]:
             return False
-        lm = last.landmarks
-        nose_z = lm[0][2]
-        hip_z  = (lm[23][2] + lm[24][2]) / 2
-        return (nose_z - hip_z) < POSE_Z_PRONE_THRESHOLD
+        lm = buf.landmarks[last]
+        nose_z = lm[0, 2]
+        hip_z  = (lm[23, 2] + lm[24, 2]) / 2
+        return bool((nose_z - hip_z) < POSE_Z_PRONE_THRESHOLD)
 
     def is_irregular_movement(self) -> bool:
         """
         비정상적 움직임:
           • 윈도우 전체 posture 전이 횟수 ≥ ANALYZER_IRREGULAR_THRESHOLD
         """
-        changes = 0
-        prev = None
-        for f in self.buffer:
-            if prev is not None and f.label != prev:
-                changes += 1
-            prev = f.label
-        return changes >= ANALYZER_IRREGULAR_THRESHOLD
+        # update()/제거 시 증감하는 전이 카운터 사용
+        return self._transitions >= ANALYZER_IRREGULAR_THRESHOLD
 
     # ────────────── 이벤트 수집 & 쿨다운 ────────────── #
 
@@ -228,57 +319,68 @@ class PostureAnalyzerV4:
         self,
         ev_type: str,
         message: str,
-        events: List[Dict[str, str]]
+        events: List[Dict[str, Any]],
+        now: float,
     ) -> None:
         """
         동일 이벤트 중복 방지를 위해 마지막 발생 시간과 쿨다운 검사 후 events에 추가.
+        이벤트 시각은 최신 프레임의 wall 시각 (녹화 재생 시에도 녹화 당시 시각)
         """
-        now = time.monotonic()
-        last = self._last_event_ts.get(ev_type, 0.0)
-        if (now - last) >= COOL_DOWN:
+        last = self._last_event_ts.get(ev_type)
+        if last is None or (now - last) >= self.cool_down:
+            buf = self.buffer
+            wall = float(buf.wall_ts[buf.slot(-1)]) if buf.size else self.clock.time()
             events.append({
                 "type": ev_type,
-                "timestamp": get_timestamp(time.time()),
+                "timestamp": get_timestamp(wall),
+                "wall_ts": wall,
                 "message": message
             })
             self._last_event_ts[ev_type] = now
 
-    def get_events(self) -> List[Dict[str, str]]:
+    def get_events(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
         """
         감지된 이상 이벤트들을 쿨다운 적용해 리스트로 반환.
+        :param now: 판정 기준 시각 (기본값은 _now())
         """
-        events: List[Dict[str, str]] = []
+        now = self._now(now)
+        events: List[Dict[str, Any]] = []
 
         if self.is_fall_detected():
             self._append_event(
                 "fall_detected",
                 "낙상 감지: ROI 외부에서 빠른 standing→lying 전이",
-                events
+                events,
+                now
             )
         if self.is_prone_warning():
             self._append_event(
                 "prone_warning",
                 "엎드린 자세 감지: 호흡곤란 우려",
-                events
+                events,
+                now
             )
-        if self._check_motionless(time.monotonic()):
+        if self._check_motionless(now):
             self._append_event(
                 "danger_motionless",
                 f"위험 무동작: ROI 외부에서 {NO_MOVEMENT_TIME_THRESHOLD:.0f}초 이상 움직임 없음",
-                events
+                events,
+                now
             )
         if self.is_irregular_movement():
             self._append_event(
                 "irregular_movement",
                 "비정상적 자세 변화 빈번",
-                events
+                events,
+                now
             )
         # tilt 지속 이벤트
-        if self._check_tilt(time.monotonic()):
+        if self._check_tilt(now):
             self._append_event(
                 "tilt_sustained",
                 f"기울임 상태 {TILT_DURATION:.0f}초 이상 지속",
-                events
+                events,
+                now
             )
 
         return events
@@ -1,11 +1,28 @@
 # 자세 분류
 # posture_classifier_v6.py
 
+import numpy as np
 from utils import calculate_angle, distance
 from collections import namedtuple
 
 Point = namedtuple("Point", ["x", "y"])
 
+
+def batch_angle(lms, a, b, c):
+    """
+    calculate_angle의 벡터화 버전. N개 스켈레톤의 각 ABC를 한 번에 계산합니다.
+    :param lms: float64 배열 [N, 33, 4]
+    :param a, b, c: 랜드마크 인덱스
+    :return: 도(degree) 단위 배열 [N] (길이 0인 벡터가 있으면 0.0)
+    """
+    ba = lms[:, a, :2] - lms[:, b, :2]
+    bc = lms[:, c, :2] - lms[:, b, :2]
+    dot = ba[:, 0] * bc[:, 0] + ba[:, 1] * bc[:, 1]
+    mag = np.hypot(ba[:, 0], ba[:, 1]) * np.hypot(bc[:, 0], bc[:, 1])
+    zero = mag == 0
+    cos = np.clip(dot / np.where(zero, 1.0, mag), -1.0, 1.0)
+    return np.where(zero, 0.0, np.degrees(np.arccos(cos)))
+
 class PostureClassifierV6:
     def __init__(self):
         # Kneeling thresholds
@@ -96,14 +113,6 @@ class PostureClassifierV6:
             return vis_l > 0.6 and vis_r > 0.6
         front_view = is_front_view(landmarks)
 
-        torso_alt_l = calculate_angle(
-            Point(*landmarks[11][:2]), Point(*landmarks[23][:2]), Point(*landmarks[27][:2])
-        )
-        torso_alt_r = calculate_angle(
-            Point(*landmarks[12][:2]), Point(*landmarks[24][:2]), Point(*landmarks[28][:2])
-        )
-        torso_alt_avg = (torso_alt_l + torso_alt_r) / 2
-
         dy_sh_hip = y_vals['hip_avg'] - y_vals['shoulder_avg']
         dy_hip_knee = y_vals['knee_avg'] - y_vals['hip_avg']
         dy_ratio = dy_sh_hip / (dy_hip_knee + 1e-6)
@@ -132,6 +141,75 @@ class PostureClassifierV6:
             return False
         return True
 
+    def classify_batch(self, landmarks):
+        """
+        classify()의 벡터화 버전. 여러 스켈레톤을 NumPy 마스크로 한 번에 분류합니다.
+        규칙·순서(sitting → lying → kneeling → standing → irregular)는 classify()와 동일합니다.
+        :param landmarks: [N, 33, 4] 배열 (x, y, z, visibility)
+        :return: 레이블 리스트 (길이 N)
+        """
+        lms = np.asarray(landmarks, dtype=np.float64).reshape(-1, 33, 4)
+        n = lms.shape[0]
+        x, y, z, vis = lms[:, :, 0], lms[:, :, 1], lms[:, :, 2], lms[:, :, 3]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # get_angles
+            leg = (batch_angle(lms, 23, 25, 27) + batch_angle(lms, 24, 26, 28)) / 2
+            torso = (batch_angle(lms, 11, 23, 25) + batch_angle(lms, 12, 24, 26)) / 2
+
+            # get_y_values
+            nose_y = y[:, 0]
+            shoulder_y = (y[:, 11] + y[:, 12]) / 2
+            hip_y = (y[:, 23] + y[:, 24]) / 2
+            knee_y = (y[:, 25] + y[:, 26]) / 2
+            ankle_y = (y[:, 27] + y[:, 28]) / 2
+
+            # is_sitting (조건 실패 시 False를 반환하는 형태를 그대로 부정)
+            dy_ratio = (hip_y - shoulder_y) / ((knee_y - hip_y) + 1e-6)
+            y_cond = (((shoulder_y < hip_y) & (hip_y < knee_y))
+                      | (np.abs(hip_y - knee_y) < 0.05))
+            sitting = ~(dy_ratio < 1.6) & y_cond
+
+            # is_lying
+            prone = ((z[:, 0] - (z[:, 23] + z[:, 24]) / 2) < self.Z_PRONE_THRESHOLD)
+            x_idxs = [11, 12, 23, 24, 25, 26, 27, 28]
+            x_sel, x_vis = x[:, x_idxs], vis[:, x_idxs] > 0.5
+            x_any = x_vis.any(axis=1)
+            x_range = np.where(
+                x_any,
+                np.where(x_vis, x_sel, -np.inf).max(axis=1)
+                - np.where(x_vis, x_sel, np.inf).min(axis=1),
+                0.0
+            )
+            wide = x_range > self.X_RANGE_LYING
+
+            y_sel, y_vis = y[:, 11:29], vis[:, 11:29] > 0.5
+            y_count = y_vis.sum(axis=1)
+            y_range = (np.where(y_vis, y_sel, -np.inf).max(axis=1)
+                       - np.where(y_vis, y_sel, np.inf).min(axis=1))
+            flat = (~((y_count < 5) | (y_range > self.Y_RANGE_LYING))
+                    & ~(np.abs(nose_y - ankle_y) > 0.15))
+            lying = wide | flat
+
+            # is_kneeling
+            kneeling = ((self.KNEE_KNEEL_MIN <= leg) & (leg <= self.KNEE_KNEEL_MAX)
+                        & (self.TORSO_KNEEL_MIN <= torso) & (torso <= self.TORSO_KNEEL_MAX)
+                        & ~(hip_y <= knee_y)
+                        & ~(np.abs(ankle_y - knee_y) > 0.1))
+
+            # is_standing
+            standing = (~(leg < 155) & ~(torso < 150)
+                        & ~(hip_y >= knee_y + 0.02) & ~(nose_y >= hip_y))
+
+        # 우선순위가 높은 규칙부터 채우기 위해 역순으로 덮어씀
+        labels = np.full(n, "irregular", dtype=object)
+        labels[standing] = "standing"
+        labels[kneeling] = "kneeling"
+        labels[lying & ~prone] = "lying_supine"
+        labels[lying & prone] = "lying_prone"
+        labels[sitting] = "sitting"
+        return labels.tolist()
+
     def classify(self, landmarks):
         angles = self.get_angles(landmarks)
         y_vals = self.get_y_values(landmarks)
@@ -2,7 +2,10 @@
 # posture_classifier 보완 코드(측면 자세, 정확도 등)
 
 from collections import deque, Counter, namedtuple
+
+import numpy as np
 from posture_classifier import PostureClassifierV6  # ✅ V6 분류기 사용
+from event_logger import get_event_logger
 from utils import calculate_angle
 
 Point = namedtuple("Point", ["x", "y"])
@@ -24,12 +27,18 @@ class SlidingWindow:
         return count.most_common(1)[0][0]
 
 class PostureClassifierWrapper:
-    def __init__(self, window_size=5, visibility_threshold=0.5):
+    def __init__(self, window_size=5, visibility_threshold=0.5, logger=None):
+        """
+        :param logger: 진단 출력용 EventLogger (None이면 프로세스 공용 로거)
+        """
         self.primary = PostureClassifierV6()  # ✅ V6 적용
         self.window = SlidingWindow(window_size)
         self.visibility_threshold = visibility_threshold
+        self.logger = logger if logger is not None else get_event_logger()
 
     def average_visibility(self, landmarks):
+        if isinstance(landmarks, np.ndarray):
+            return float(landmarks[:, 3].mean()) if len(landmarks) else 0.0
         return sum([lm[3] for lm in landmarks]) / len(landmarks) if landmarks else 0.0
 
     def determine_view_side(self, landmarks):
@@ -68,20 +77,58 @@ class PostureClassifierWrapper:
             pass
         return "irregular"
 
-    def classify(self, landmarks):
+    def classify(self, landmarks, window=None):
+        """
+        :param landmarks: (33, 4) 배열 또는 [(x, y, z, v), ...]
+        :param window: 다수결 스무딩에 쓸 SlidingWindow (None이면 self.window).
+                       여러 사람을 분류할 때는 사람별 창을 넘겨야 레이블이 섞이지 않음
+        """
         avg_vis = self.average_visibility(landmarks)
+        if isinstance(landmarks, np.ndarray):
+            # 규칙 분류는 원소 단위 접근이 많아 NumPy 스칼라보다 파이썬 리스트가 2배 이상 빠름
+            landmarks = landmarks.tolist()
         view = self.determine_view_side(landmarks)
-        print(f"[view]: {view} | avg_vis: {avg_vis:.2f}")
+        # 매 프레임 print 대신 버퍼에 넣고 로거 스레드가 주기적으로 최신값만 출력
+        self.logger.debug("view", "%s | avg_vis: %.2f", view, avg_vis)
 
         if avg_vis < self.visibility_threshold:
-            if view == "right_side_view":
-                label = self.side_posture(landmarks, side="right")
-            elif view == "left_side_view":
-                label = self.side_posture(landmarks, side="left")
-            else:
-                label = "irregular"
+            label = self._low_visibility_posture(landmarks, view)
         else:
             label = self.primary.classify(landmarks)
 
-        self.window.add(label)
-        return self.window.get_majority()
+        window = window if window is not None else self.window
+        window.add(label)
+        return window.get_majority()
+
+    def _low_visibility_posture(self, landmarks, view):
+        if view == "right_side_view":
+            return self.side_posture(landmarks, side="right")
+        if view == "left_side_view":
+            return self.side_posture(landmarks, side="left")
+        return "irregular"
+
+    def classify_batch(self, landmarks, window=None):
+        """
+        classify()의 배치 버전 (한 사람의 연속 프레임용, 녹화 재생 등).
+        가시성이 충분한 프레임은 PostureClassifierV6.classify_batch()로 한 번에 분류하고,
+        나머지는 classify()와 같은 측면 규칙을 적용한 뒤 프레임 순서대로 스무딩 창에 넣습니다.
+        :param landmarks: [N, 33, 4] 배열 또는 스켈레톤 리스트
+        :param window: 다수결 스무딩에 쓸 SlidingWindow (None이면 self.window)
+        :return: 스무딩된 레이블 리스트 (길이 N, classify()를 N번 호출한 결과와 같음)
+        """
+        lms = np.asarray(landmarks, dtype=np.float64).reshape(-1, 33, 4)
+        raw = [None] * len(lms)
+        visible = lms[:, :, 3].mean(axis=1) >= self.visibility_threshold
+        if visible.any():
+            for i, label in zip(np.flatnonzero(visible), self.primary.classify_batch(lms[visible])):
+                raw[i] = label
+        for i in np.flatnonzero(~visible):
+            lm = lms[i].tolist()
+            raw[i] = self._low_visibility_posture(lm, self.determine_view_side(lm))
+
+        window = window if window is not None else self.window
+        labels = []
+        for label in raw:
+            window.add(label)
+            labels.append(window.get_majority())
+        return labels
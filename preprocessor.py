@@ -1,34 +1,58 @@
 # preprocessor.py
 
 import cv2
+import numpy as np
 from config import FRAME_WIDTH, FRAME_HEIGHT
 
 class Preprocessor:
     """
     공통 전처리 모듈: 전체 프레임 리사이즈, BGR->RGB 변환, 노이즈 제거 등을 수행합니다.
     ROI 크롭은 이 모듈이 아닌 ROIManager에서 처리합니다.
+    - 리사이즈/컬러 변환 중간 결과는 내부 버퍼 하나를 재사용 (변환은 제자리)
+    - 출력은 dst(호출자 제공) → reuse_output이면 내부 출력 버퍼 → 아니면 새 배열 순으로 결정
     """
-    def __init__(self, blur_kernel=(5,5), interp=cv2.INTER_AREA):
+    def __init__(self, blur_kernel=(5,5), interp=cv2.INTER_AREA, size=(FRAME_WIDTH, FRAME_HEIGHT),
+                 reuse_output=False):
+        """
+        :param blur_kernel: Gaussian Blur 커널 크기
+        :param interp: 리사이즈 보간 방식
+        :param size: 출력 크기 (W, H). 움직임 감지 등은 축소 크기로 사용
+        :param reuse_output: True면 dst 없이 호출해도 내부 출력 버퍼를 반환
+                             (다음 preprocess() 호출 때 덮어써지므로 결과를 보관하지 않는 호출자만)
+        """
         self.blur_kernel = blur_kernel
         self.interp      = interp
+        self.size        = size
+        self.reuse_output = reuse_output
+        self._work = None   # 리사이즈 + 컬러 변환 버퍼
+        self._out = None    # reuse_output용 출력 버퍼
+
+    def _buffer(self, buf):
+        w, h = self.size
+        if buf is None or buf.shape != (h, w, 3):
+            buf = np.empty((h, w, 3), dtype=np.uint8)
+        return buf
 
-    def preprocess(self, frame):
+    def preprocess(self, frame, dst=None):
         """
         프레임 전처리 수행:
-          1. 리사이즈 (FRAME_WIDTH x FRAME_HEIGHT)
+          1. 리사이즈 (size, 기본 FRAME_WIDTH x FRAME_HEIGHT)
           2. BGR -> RGB 변환
           3. 노이즈 제거 (Gaussian Blur)
 
         :param frame: 원본 BGR 이미지 (np.ndarray)
+        :param dst: 결과를 쓸 (H, W, 3) uint8 배열 (None이면 reuse_output 설정을 따름)
         :return: 전처리된 전체 프레임 (RGB, np.ndarray)
         """
+        self._work = self._buffer(self._work)
+
         # 1. 리사이즈
-        resized = cv2.resize(frame, (FRAME_WIDTH, FRAME_HEIGHT), interpolation=self.interp)
+        work = cv2.resize(frame, self.size, dst=self._work, interpolation=self.interp)
 
-        # 2. 컬러 변환 (BGR -> RGB)
-        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        # 2. 컬러 변환 (BGR -> RGB, 제자리)
+        cv2.cvtColor(work, cv2.COLOR_BGR2RGB, dst=work)
 
         # 3. 노이즈 제거 (Gaussian Blur)
-        denoised = cv2.GaussianBlur(rgb, self.blur_kernel, 0)
-
-        return denoised
+        if dst is None and self.reuse_output:
+            dst = self._out = self._buffer(self._out)
+        return cv2.GaussianBlur(work, self.blur_kernel, 0, dst=dst)
@@ -0,0 +1,142 @@
+# replay.py
+# 녹화된 랜드마크를 실시간보다 빠르게 분류·이벤트 판정에 통과시키는 재생 모듈
+
+import time
+from collections import Counter
+
+from posture_wrapper import PostureClassifierWrapper
+from track_state import TrackStateManager
+from utils import bbox_in_rois
+
+
+class ReplayClock:
+    """
+    재생용 수동 시계. TrackStateManager(clock=...), PostureAnalyzerV4(clock=...) 등에 넣고
+    set()/advance()로 시각을 진행합니다.
+    monotonic()과 time()은 같은 값(녹화 당시 epoch 초)을 반환합니다.
+    """
+    def __init__(self, start: float = 0.0):
+        self.now = start
+
+    def set(self, ts: float):
+        self.now = ts
+
+    def advance(self, dt: float):
+        self.now += dt
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+class StaticROI:
+    """고정 ROI 목록으로 is_bbox_in_roi()를 제공하는 재생용 ROI 관리자."""
+    def __init__(self, rois=None):
+        self.rois = [tuple(r) for r in rois or []]
+
+    def is_bbox_in_roi(self, bbox):
+        return bbox_in_rois(bbox, self.rois)
+
+
+def replay(records, classifier=None, track_states=None, rois=None, clock=None, chunk_size=256):
+    """
+    녹화 레코드를 순서대로 분류 → 분석기 → 이벤트 판정에 통과시킵니다.
+    분석기에는 프레임 시각을 직접 넘기고 clock도 프레임 시각으로 맞추므로 대기 없이 CPU 속도로 진행됩니다.
+    실시간 실행과 같이 트랙 ID마다 스무딩 창과 분석기를 따로 두므로 여러 사람 녹화도 섞이지 않습니다.
+    classifier에 classify_batch가 있으면 chunk_size 단위로 묶어 트랙별로 벡터화 분류합니다.
+
+    :param records: (timestamp, landmarks, bbox[, points[, track_id]]) 반복자 (LandmarkReader.records()).
+        timestamp는 녹화 당시 epoch 초, points는 프레임 픽셀 좌표 랜드마크 (무동작 판정용),
+        track_id가 없거나 None이면 모두 한 사람(-1)으로 처리
+    :param classifier: classify(landmarks, window=...) / classify_batch(landmarks, window=...)를
+        제공하는 분류기. 기본 PostureClassifierWrapper (실시간과 같은 가시성/측면 보정과 스무딩)
+    :param track_states: TrackStateManager (기본: rois와 clock을 쓰는 새 인스턴스)
+    :param rois: 가구 ROI 목록 [(x1, y1, x2, y2), ...]. 녹화본이면 LandmarkReader.rois.
+        None이면 ROI 없음 (모든 위치가 ROI 밖이므로 누운 자세는 낙상 판정 대상)
+    :param clock: 재생 시계 (기본 ReplayClock). 프레임마다 레코드 시각으로 set()
+    :param chunk_size: 배치 분류 단위
+    :return: (timestamp, track_id, label, events) 를 순서대로 내보내는 제너레이터
+        (events의 각 dict에도 "track_id" 포함)
+    """
+    if clock is None:
+        clock = ReplayClock()
+    if classifier is None:
+        classifier = PostureClassifierWrapper()
+    if track_states is None:
+        track_states = TrackStateManager(roi_manager=StaticROI(rois), clock=clock)
+
+    chunk = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= chunk_size:
+            yield from _replay_chunk(chunk, classifier, track_states, clock)
+            chunk = []
+    if chunk:
+        yield from _replay_chunk(chunk, classifier, track_states, clock)
+
+
+def _track_of(rec):
+    tid = rec[4] if len(rec) > 4 else None
+    return -1 if tid is None else int(tid)
+
+
+def _replay_chunk(chunk, classifier, track_states, clock):
+    batch = getattr(classifier, "classify_batch", None)
+    labels = [None] * len(chunk)
+    if batch is not None:
+        # 트랙별로 모아 그 트랙의 스무딩 창으로 한 번에 분류 (트랙 안 순서는 유지)
+        by_track = {}
+        for i, rec in enumerate(chunk):
+            by_track.setdefault(_track_of(rec), []).append(i)
+        for tid, idxs in by_track.items():
+            state = track_states.get(tid, chunk[idxs[0]][0])
+            for i, label in zip(idxs, batch([chunk[i][1] for i in idxs], window=state.window)):
+                labels[i] = label
+
+    for i, rec in enumerate(chunk):
+        ts, lm, bbox = rec[:3]
+        points = rec[3] if len(rec) > 3 else None
+        tid = _track_of(rec)
+        clock.set(ts)
+        label = labels[i]
+        if label is None:
+            label = track_states.classify(tid, lm, classifier, now=ts)
+        events = track_states.analyze(tid, label, lm, bbox, timestamp=ts, points=points)
+        track_states.expire(ts)
+        yield ts, tid, label, events
+
+
+def replay_summary(records, classifier=None, track_states=None, rois=None):
+    """
+    replay()를 끝까지 돌리고 레이블/이벤트 집계와 재생 속도를 반환합니다.
+    회귀 테스트에서 녹화 세션 단위 결과 비교에 사용합니다.
+    :return: dict(frames, tracks, labels, events, recorded_sec, elapsed_sec, speedup)
+    """
+    labels, events = Counter(), Counter()
+    tracks = set()
+    frames = 0
+    first_ts = last_ts = None
+    start = time.perf_counter()
+    for ts, tid, label, evs in replay(records, classifier, track_states, rois=rois):
+        frames += 1
+        tracks.add(tid)
+        labels[label] += 1
+        for ev in evs:
+            events[ev["type"]] += 1
+        if first_ts is None:
+            first_ts = ts
+        last_ts = ts
+    elapsed = time.perf_counter() - start
+
+    recorded = (last_ts - first_ts) if frames else 0.0
+    return {
+        "frames": frames,
+        "tracks": len(tracks),
+        "labels": dict(labels),
+        "events": dict(events),
+        "recorded_sec": recorded,
+        "elapsed_sec": elapsed,
+        "speedup": recorded / elapsed if elapsed > 0 else 0.0,
+    }
@@ -2,27 +2,32 @@
 
 import time
 import cv2
-from ultralytics import YOLO
-from config import YOLO_MODEL_PATH, YOLO_FURNITURE_CLASSES, YOLO_CONF_THRESHOLD  # 설정 값 불러오기 :contentReference[oaicite:0]{index=0}
+from config import YOLO_MODEL_PATH, YOLO_CONF_THRESHOLD  # 설정 값 불러오기 :contentReference[oaicite:0]{index=0}
+from detection_service import get_shared_service
+from utils import bbox_in_rois
+
 
 class ROIManager:
     """
     침대(bed), 의자(chair) 등 관심 영역(ROI)을 자동 검출·관리하는 모듈입니다.
-    - update_interval 초마다 YOLO로 가구만 검출하여 self.rois 갱신
+    - update_interval 초마다 공유 DetectionService의 가구 검출 결과로 self.rois 갱신
+      (PersonDetector와 같은 프레임이면 추가 추론 없이 캐시된 결과 사용)
     - 가구 미검출 시 빈 리스트로 유지 → draw()/is_bbox_in_roi() 모두 스킵
     """
 
-    def __init__(self, update_interval: float = 10.0):
+    def __init__(self, update_interval: float = 10.0, service=None):
         """
         :param update_interval: ROI 자동 갱신 주기(초)
+        :param service: 공유할 DetectionService (None이면 YOLO_MODEL_PATH 기준 공유 인스턴스 사용)
         """
         # 자동 검출 전까지는 ROI가 없는 상태
         self.rois = []  
         self.update_interval = update_interval
         self._last_update = 0.0
 
-        # COCO 사전학습된 YOLO 모델 로드
-        self.model = YOLO(YOLO_MODEL_PATH)
+        # COCO 사전학습된 YOLO 모델은 PersonDetector와 공유
+        self.service = service if service is not None else get_shared_service(YOLO_MODEL_PATH)
+        self.model = self.service.model
 
     def get_rois(self):
         """
@@ -38,10 +43,11 @@ class ROIManager:
         """
         self.rois = [roi]
 
-    def auto_update(self, frame):
+    def auto_update(self, frame, key=None):
         """
         update_interval 주기마다 frame에서 'bed'와 'chair' 클래스만 검출해 ROI를 갱신합니다.
         :param frame: BGR 이미지 (np.ndarray)
+        :param key: DetectionService 캐시 key (재사용 버퍼면 읽기마다 다른 값)
         """
         now = time.time()
         if now - self._last_update < self.update_interval:
@@ -49,16 +55,14 @@ class ROIManager:
 
         self._last_update = now
 
-        # verbose=False로 로그 억제, classes 옵션으로 침대·의자만 필터링
-        results = self.model(frame, classes=YOLO_FURNITURE_CLASSES, verbose=False)[0]
+        # 사람+가구 한 번에 추론된 결과 중 침대·의자만 사용 (같은 프레임이면 캐시)
+        detections = self.service.detect(frame, key)
 
         detected = []
-        # results.boxes.xyxy: [N,4], results.boxes.conf: [N]
-        for box, conf in zip(results.boxes.xyxy, results.boxes.conf):
-            if float(conf) < YOLO_CONF_THRESHOLD:
+        for box, conf in detections.furniture:
+            if conf < YOLO_CONF_THRESHOLD:
                 continue
-            x1, y1, x2, y2 = map(int, box.tolist())
-            detected.append((x1, y1, x2, y2))
+            detected.append(box)
 
         # 검출된 가구가 있으면 갱신, 없으면 빈 리스트 유지
         self.rois = detected
@@ -69,14 +73,7 @@ class ROIManager:
         :param bbox: (x1, y1, x2, y2)
         :return: bool (하나라도 포함되면 True)
         """
-        x1, y1, x2, y2 = bbox
-        cx = (x1 + x2) // 2
-        cy = (y1 + y2) // 2
-
-        for rx1, ry1, rx2, ry2 in self.rois:
-            if rx1 <= cx <= rx2 and ry1 <= cy <= ry2:
-                return True
-        return False
+        return bbox_in_rois(bbox, self.rois)
 
     def draw(self, frame, color=(0, 0, 255), thickness=2):
         """
@@ -0,0 +1,67 @@
+# test7_clip_recorder.py
+# 카메라 없이 합성 프레임으로 ClipRecorder의 프레임 간격/늦은 트리거 클립을 확인 (pytest 또는 직접 실행)
+
+import time
+
+import numpy as np
+
+from clip_recorder import ClipRecorder
+
+FPS = 10
+INTERVAL = 1.0 / FPS
+
+
+def _make_recorder(jobs, **kwargs):
+    # 파일 대신 저장할 클립을 jobs 리스트에 모음
+    rec = ClipRecorder(fps=FPS, scale=1.0, pre_seconds=2.0, post_seconds=1.0, **kwargs)
+    rec._write_clip = jobs.append
+    rec.start()
+    return rec
+
+
+def _push(rec, ts):
+    rec.push(np.full((32, 32, 3), int(ts * 10) % 256, dtype=np.uint8), ts)
+    # 인코딩 큐가 넘쳐 프레임이 버려지지 않도록 한 장씩 처리를 기다림
+    while not rec._incoming.empty():
+        time.sleep(0.001)
+
+
+def test_push_keeps_fps_with_jitter():
+    jobs = []
+    rec = _make_recorder(jobs)
+    # 프레임 시각이 간격 주변에서 조금씩 흔들려도 (30fps 카메라 → 10fps) 프레임이 빠지지 않아야 함
+    for i in range(90):
+        _push(rec, 100.0 + i / 30 + (0.002 if i % 2 else -0.002))
+    rec.close()
+    stats = rec.stats()
+    assert stats["frames_dropped"] == 0
+    assert stats["frames_encoded"] >= 29, stats
+
+
+def test_late_trigger_has_no_gap():
+    jobs = []
+    rec = _make_recorder(jobs)
+    ts = 100.0
+    for i in range(30):
+        _push(rec, ts + i * INTERVAL)
+    # 이벤트는 1초 전(ts+2.0)에 일어났지만 트리거는 지금(ts+2.9) 처리됨
+    event_ts = ts + 2.0
+    rec.trigger({"type": "fall_detected", "timestamp": event_ts}, event_ts)
+    for i in range(30, 45):
+        _push(rec, ts + i * INTERVAL)
+    rec.close()
+
+    assert len(jobs) == 1
+    stamps = [t for t, _ in jobs[0].frames]
+    gaps = np.diff(stamps)
+    assert gaps.max() < 1.5 * INTERVAL, f"클립 공백 {gaps.max():.3f}초"
+    assert (gaps > 0).all()
+    # 링은 마지막 프레임 기준 pre_seconds만 보관하므로 늦게 처리된 만큼 앞 구간이 줄어듦
+    assert stamps[0] <= event_ts - 1.0
+    assert stamps[-1] >= event_ts + 1.0 - 1e-6
+
+
+if __name__ == "__main__":
+    test_push_keeps_fps_with_jitter()
+    test_late_trigger_has_no_gap()
+    print("ClipRecorder 테스트 통과")
@@ -0,0 +1,154 @@
+# track_state.py
+# 트랙 ID별로 PostureAnalyzerV4와 SlidingWindow를 따로 두는 다인원 분석 상태 관리 모듈
+
+from collections import OrderedDict
+
+from config import TRACK_STATE_TIMEOUT, TRACK_STATE_MAX
+from posture_analyzer import PostureAnalyzerV4
+from posture_wrapper import SlidingWindow
+from utils import SystemClock
+
+
+class TrackState:
+    """
+    한 사람의 분석 상태: 분석기, 레이블 스무딩 창, 마지막 관측 시각, 최근 레이블.
+    """
+    def __init__(self, track_id, analyzer, window, now):
+        self.track_id = track_id
+        self.analyzer = analyzer
+        self.window = window
+        self.first_seen = now
+        self.last_seen = now
+        self.label = None
+
+
+class TrackStateManager:
+    """
+    트랙 ID → TrackState.
+    - 처음 보는 트랙은 classify()/analyze()/get() 시점에 분석기·스무딩 창을 생성
+    - timeout초 이상 관측되지 않은 트랙은 expire()에서 삭제
+    - max_tracks를 넘으면 가장 오래 관측되지 않은 트랙부터 삭제 (메모리 상한)
+    - analyze()가 반환하는 이벤트에는 "track_id"가 붙음
+    """
+    def __init__(self,
+                 roi_manager=None,
+                 timeout: float = TRACK_STATE_TIMEOUT,
+                 max_tracks: int = TRACK_STATE_MAX,
+                 window_size: int = 5,
+                 clock=None,
+                 analyzer_factory=None):
+        """
+        :param roi_manager: 분석기에 넘길 ROI 관리자 (is_bbox_in_roi 제공)
+        :param timeout: 미관측 트랙 삭제 시간(초)
+        :param max_tracks: 최대 트랙 수
+        :param window_size: 트랙별 SlidingWindow 크기
+        :param clock: monotonic()/time()을 제공하는 시계 (분석기와 공유)
+        :param analyzer_factory: () -> 분석기. None이면 PostureAnalyzerV4(roi_manager, clock=clock)
+        """
+        self.roi_manager = roi_manager
+        self.timeout = timeout
+        self.max_tracks = max(1, max_tracks)
+        self.window_size = window_size
+        self.clock = clock if clock is not None else SystemClock()
+        self.analyzer_factory = analyzer_factory
+
+        # 앞쪽이 가장 오래 관측되지 않은 트랙
+        self._states = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, track_id):
+        return track_id in self._states
+
+    def track_ids(self):
+        return list(self._states)
+
+    def _new_analyzer(self):
+        if self.analyzer_factory is not None:
+            return self.analyzer_factory()
+        return PostureAnalyzerV4(roi_manager=self.roi_manager, clock=self.clock)
+
+    def get(self, track_id, now=None):
+        """
+        트랙 상태를 반환합니다. 없으면 생성합니다. (관측 시각 갱신)
+        """
+        now = self.clock.monotonic() if now is None else now
+        state = self._states.get(track_id)
+        if state is None:
+            while len(self._states) >= self.max_tracks:
+                old_id, _ = self._states.popitem(last=False)
+                self.evicted += 1
+                print(f"[TrackStateManager] 트랙 수 상한 초과로 #{old_id} 상태 삭제")
+            state = TrackState(track_id, self._new_analyzer(),
+                               SlidingWindow(self.window_size), now)
+            self._states[track_id] = state
+            self.created += 1
+        else:
+            state.last_seen = now
+            self._states.move_to_end(track_id)
+        return state
+
+    def classify(self, track_id, landmarks, classifier, now=None):
+        """
+        트랙별 스무딩 창으로 자세를 분류합니다. (트랙이 없으면 생성, 관측 시각 갱신)
+        :param classifier: classify(landmarks, window=...)를 제공하는 PostureClassifierWrapper
+        :return: 레이블
+        """
+        state = self.get(track_id, now)
+        state.label = classifier.classify(landmarks, window=state.window)
+        return state.label
+
+    def analyze(self, track_id, label, landmarks, bbox, timestamp=None, wall_ts=None, points=None):
+        """
+        트랙별 분석기에 한 프레임을 넣고 새 이벤트를 반환합니다.
+        :param timestamp/wall_ts/points: PostureAnalyzerV4.update()에 그대로 전달
+        :return: 이벤트 dict 리스트 (각각 "track_id" 포함)
+        """
+        state = self.get(track_id, timestamp)
+        state.analyzer.update(label, landmarks, bbox, timestamp=timestamp, wall_ts=wall_ts,
+                              points=points)
+        events = state.analyzer.get_events()
+        for ev in events:
+            ev["track_id"] = track_id
+        return events
+
+    def get_state(self, track_id):
+        state = self._states.get(track_id)
+        return state.analyzer.get_state() if state is not None else "unknown"
+
+    def get_states(self):
+        """
+        :return: {track_id: 분석기 상태 문자열}
+        """
+        return {tid: s.analyzer.get_state() for tid, s in self._states.items()}
+
+    def remove(self, track_id):
+        return self._states.pop(track_id, None) is not None
+
+    def expire(self, now=None):
+        """
+        timeout초 이상 관측되지 않은 트랙을 삭제합니다.
+        :return: 삭제된 트랙 ID 리스트
+        """
+        now = self.clock.monotonic() if now is None else now
+        removed = []
+        while self._states:
+            tid, state = next(iter(self._states.items()))
+            if now - state.last_seen < self.timeout:
+                break
+            del self._states[tid]
+            removed.append(tid)
+        self.expired += len(removed)
+        return removed
+
+    def stats(self):
+        return {
+            "tracks": len(self._states),
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
@@ -6,11 +6,25 @@ import math
 from config import FRAME_WIDTH, FRAME_HEIGHT
 
 
-def get_timestamp():
+def get_timestamp(ts=None):
     """
-    현재 시스템 시간에 기반한 타임스탬프를 문자열로 반환합니다.
+    시스템 시간(ts, 기본값은 현재 시각)에 기반한 타임스탬프를 문자열로 반환합니다.
+    :param ts: time.time() 형식의 epoch 초 (녹화 재생 시 프레임 시각)
     """
-    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+
+
+class SystemClock:
+    """
+    실시간 시계. 분석기 등 시간에 의존하는 모듈의 기본 clock입니다.
+    - monotonic(): 지속시간 판정용
+    - time(): epoch 초 (이벤트 타임스탬프용)
+    """
+    def monotonic(self):
+        return time.monotonic()
+
+    def time(self):
+        return time.time()
 
 
 def calculate_euclidean_distance(point1, point2):
@@ -83,3 +97,20 @@ def distance(p1, p2):
     posture_classifier_v6에서 segment 길이 비교에 사용됨.
     """
     return math.sqrt((p1.x - p2.x) ** 2 + (p1.y - p2.y) ** 2)
+
+
+def bbox_in_rois(bbox, rois):
+    """
+    바운딩 박스 중심이 rois 중 하나라도 안에 있는지 판정합니다.
+    :param bbox: (x1, y1, x2, y2)
+    :param rois: [(x1, y1, x2, y2), ...]
+    :return: bool
+    """
+    x1, y1, x2, y2 = bbox
+    cx = (x1 + x2) // 2
+    cy = (y1 + y2) // 2
+
+    for rx1, ry1, rx2, ry2 in rois:
+        if rx1 <= cx <= rx2 and ry1 <= cy <= ry2:
+            return True
+    return False